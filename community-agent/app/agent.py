@@ -22,8 +22,10 @@ from .rag.retrieve import (
 )
 from .orchestrator import JourneyOrchestrator
 from .models import Journey, JourneyStep, Intake, Consent
+from .scheduler import execute_journey, ready_steps
 from .utils.audit import log_event, log_consent
 from .utils.storage import save_artifact
+from .utils.concurrency import run_io
 
 class AgenticAssistant:
     """
@@ -34,6 +36,8 @@ class AgenticAssistant:
         self.orchestrator = JourneyOrchestrator()
         self.conversation_history = []
         self.current_journey = None
+        self.current_intake = None
+        self.current_prefills = None
         
     def start_conversation(self, user_message: str) -> Dict:
         """
@@ -220,8 +224,9 @@ class AgenticAssistant:
             'message': self._generate_natural_response(intent, entities, inclusivity)
         }
         
-        # Store the journey
+        # Store the journey; its forms are prefilled on the first step
         self.current_journey = journey
+        self.current_prefills = None
         
         return response
     
@@ -254,7 +259,8 @@ class AgenticAssistant:
         }
         
         # Create journey
-        journey = self.orchestrator.plan_journey(Intake(**intake_data))
+        self.current_intake = Intake(**intake_data)
+        journey = self.orchestrator.plan_journey(self.current_intake)
         
         return journey
     
@@ -287,7 +293,8 @@ class AgenticAssistant:
         }
         
         # Create journey with both steps
-        journey = self.orchestrator.plan_journey(Intake(**intake_data))
+        self.current_intake = Intake(**intake_data)
+        journey = self.orchestrator.plan_journey(self.current_intake)
         
         return journey
     
@@ -319,7 +326,8 @@ class AgenticAssistant:
         }
         
         # Create basic journey
-        journey = self.orchestrator.plan_journey(Intake(**intake_data))
+        self.current_intake = Intake(**intake_data)
+        journey = self.orchestrator.plan_journey(self.current_intake)
         
         return journey
     
@@ -329,12 +337,9 @@ class AgenticAssistant:
         if not self.current_journey:
             return {'error': 'No active journey'}
         
-        # Find next incomplete step
-        next_step = None
-        for step in self.current_journey.steps:
-            if step.status != 'completed':
-                next_step = step
-                break
+        # Find the next incomplete step whose dependencies are done
+        ready = ready_steps(self.current_journey)
+        next_step = ready[0] if ready else None
         
         if not next_step:
             return {
@@ -345,12 +350,8 @@ class AgenticAssistant:
         
         # Execute the step
         try:
-            if next_step.id == 'birth_reg':
-                result = self._execute_birth_registration_step(next_step, user_input)
-            elif next_step.id == 'medicare_enrolment':
-                result = self._execute_medicare_step(next_step, user_input)
-            else:
-                result = {'status': 'unknown_step', 'step_id': next_step.id}
+            self._ensure_prefills()
+            result = self._execute_step(next_step, user_input)
             
             # Mark step as completed
             next_step.status = 'completed'
@@ -358,29 +359,84 @@ class AgenticAssistant:
             return result
             
         except Exception as e:
-            log_event(
-                actor="agent",
-                action="step_execution_error",
-                why=f"Error executing step {next_step.id}",
-                metadata={'step_id': next_step.id, 'error': str(e), 'journey_id': journey_id}
-            )
+            self._log_step_error(journey_id, next_step.id, e)
             return {
                 'error': f'Error executing step: {str(e)}',
                 'step_id': next_step.id
             }
     
+    async def execute_journey(self, journey_id: str, user_input: str = None) -> Dict:
+        """
+        Execute every remaining step of the journey
+        
+        Steps run as a dependency graph, so independent steps (e.g. birth
+        registration and Medicare enrolment) are prepared concurrently. Each
+        step records its start and finish time.
+        
+        Args:
+            journey_id: ID of the active journey
+            user_input: Optional user input passed to every step
+            
+        Returns:
+            Per-step results and the journey summary
+        """
+        if not self.current_journey or self.current_journey.id != journey_id:
+            return {'error': 'No active journey'}
+        
+        await run_io(self._ensure_prefills)
+        
+        async def run_step(step: JourneyStep) -> Dict:
+            return await run_io(self._execute_step, step, user_input)
+        
+        outcomes = await execute_journey(self.current_journey, run_step)
+        
+        results = {}
+        for step_id, outcome in outcomes.items():
+            if isinstance(outcome, Exception):
+                await run_io(self._log_step_error, journey_id, step_id, outcome)
+                results[step_id] = {'error': f'Error executing step: {str(outcome)}', 'step_id': step_id}
+            else:
+                results[step_id] = outcome
+        
+        complete = all(step.status == 'completed' for step in self.current_journey.steps)
+        return {
+            'status': 'journey_complete' if complete else 'journey_incomplete',
+            'steps': results,
+            'summary': self._generate_journey_summary()
+        }
+    
+    def _ensure_prefills(self):
+        """Prefill every form of the journey in one pass, once per journey"""
+        if self.current_prefills is None:
+            self.current_prefills = self.orchestrator.prefill_journey(
+                self.current_journey, self.current_intake
+            ).prefills
+    
+    def _execute_step(self, step: JourneyStep, user_input: str) -> Dict:
+        """Dispatch a step to its handler"""
+        if step.id == 'birth_reg':
+            return self._execute_birth_registration_step(step, user_input)
+        elif step.id == 'medicare_enrolment':
+            return self._execute_medicare_step(step, user_input)
+        else:
+            return {'status': 'unknown_step', 'step_id': step.id}
+    
+    def _log_step_error(self, journey_id: str, step_id: str, error: Exception):
+        log_event(
+            actor="agent",
+            action="step_execution_error",
+            why=f"Error executing step {step_id}",
+            metadata={'step_id': step_id, 'error': str(error), 'journey_id': journey_id}
+        )
+    
     def _execute_birth_registration_step(self, step: JourneyStep, user_input: str) -> Dict:
         """Execute birth registration step"""
         
-        # Prefill the form
-        prefill_data = self.orchestrator.prefill_form(
-            self.current_journey.journey_id, 
-            step.id
-        )
+        prefill_data = self.current_prefills[step.id]
         
         # Get service locations
         services = search_services('birth registration', 
-                                 self.current_journey.intake.address.postcode)
+                                 self.current_intake.address.postcode)
         
         return {
             'status': 'step_completed',
@@ -395,11 +451,7 @@ class AgenticAssistant:
     def _execute_medicare_step(self, step: JourneyStep, user_input: str) -> Dict:
         """Execute Medicare enrolment step"""
         
-        # Prefill the form
-        prefill_data = self.orchestrator.prefill_form(
-            self.current_journey.journey_id, 
-            step.id
-        )
+        prefill_data = self.current_prefills[step.id]
         
         return {
             'status': 'step_completed',
@@ -5,6 +5,7 @@ This module provides a simple interface to the Ollama AI model
 for government service assistance without pandas dependencies.
 """
 
+import asyncio
 import json
 import subprocess
 import logging
@@ -15,11 +16,30 @@ from datetime import datetime
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Specialized prompt for government services - KEEP RESPONSES SHORT!
+GOVERNMENT_SERVICES_CONTEXT = """
+        You are a helpful AI assistant for Australian government services. 
+        
+        IMPORTANT: Keep your responses SHORT and CONCISE (max 2-3 sentences).
+        Do NOT give long explanations or overwhelming details.
+        
+        Your role is to:
+        1. Quickly identify what government service is needed
+        2. Give a brief, helpful response
+        3. Suggest next steps if relevant
+        
+        Common services: Birth registration, Medicare, unemployment benefits, emergency assistance.
+        
+        Remember: SHORT and HELPFUL responses only!
+        """
+
 class OllamaAI:
     """Simple AI integration using Ollama"""
     
-    def __init__(self, model_name: str = "qwen2.5:0.5b"):
+    def __init__(self, model_name: str = "qwen2.5:0.5b", timeout: float = 30):
         self.model_name = model_name
+        self.command = ["ollama", "run", model_name]
+        self.timeout = timeout
         self.conversation_history = []
         
     def generate_response(self, user_message: str, context: str = "") -> Dict[str, Any]:
@@ -34,70 +54,116 @@ class OllamaAI:
             Dictionary containing AI response and metadata
         """
         try:
-            # Prepare the prompt with context
-            if context:
-                full_prompt = f"Context: {context}\n\nUser: {user_message}\n\nAssistant:"
-            else:
-                full_prompt = f"User: {user_message}\n\nAssistant:"
-            
             # Call Ollama
             result = subprocess.run(
-                ["ollama", "run", self.model_name],
-                input=full_prompt,
+                self.command,
+                input=self._build_prompt(user_message, context),
                 capture_output=True,
                 text=True,
-                timeout=30
+                timeout=self.timeout
             )
             
-            if result.returncode == 0:
-                ai_response = result.stdout.strip()
-                
-                # Parse the response to extract the actual AI response
-                if "Assistant:" in ai_response:
-                    ai_response = ai_response.split("Assistant:")[-1].strip()
-                
-                # LIMIT RESPONSE LENGTH to prevent overwhelming responses
-                if len(ai_response) > 200:
-                    # Truncate long responses and add a helpful note
-                    ai_response = ai_response[:200].rsplit('.', 1)[0] + ". For more details, please ask a specific question."
-                
-                # Log the interaction
-                self.conversation_history.append({
-                    'timestamp': datetime.now().isoformat(),
-                    'user_message': user_message,
-                    'ai_response': ai_response,
-                    'context': context
-                })
-                
-                return {
-                    'success': True,
-                    'response': ai_response,
-                    'model': self.model_name,
-                    'timestamp': datetime.now().isoformat()
-                }
-            else:
-                logger.error(f"Ollama error: {result.stderr}")
-                return {
-                    'success': False,
-                    'error': f"Ollama error: {result.stderr}",
-                    'fallback_response': "I'm having trouble processing your request right now. Please try again in a moment."
-                }
+            return self._handle_result(result.returncode, result.stdout, result.stderr, user_message, context)
                 
         except subprocess.TimeoutExpired:
-            logger.error("Ollama request timed out")
+            return self._timeout_response()
+        except Exception as e:
+            return self._error_response(e)
+    
+    async def generate_response_async(self, user_message: str, context: str = "") -> Dict[str, Any]:
+        """
+        Generate AI response using Ollama without blocking the event loop
+        
+        Same contract as generate_response, but the Ollama process is driven
+        through asyncio so other requests keep being served while it runs.
+        """
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *self.command,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            
+            try:
+                stdout, stderr = await asyncio.wait_for(
+                    process.communicate(self._build_prompt(user_message, context).encode()),
+                    timeout=self.timeout
+                )
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                return self._timeout_response()
+            
+            return self._handle_result(
+                process.returncode,
+                stdout.decode(errors="replace"),
+                stderr.decode(errors="replace"),
+                user_message,
+                context
+            )
+        
+        except Exception as e:
+            return self._error_response(e)
+    
+    def _build_prompt(self, user_message: str, context: str) -> str:
+        """Prepare the prompt with context"""
+        if context:
+            return f"Context: {context}\n\nUser: {user_message}\n\nAssistant:"
+        return f"User: {user_message}\n\nAssistant:"
+    
+    def _handle_result(self, returncode: int, stdout: str, stderr: str, user_message: str, context: str) -> Dict[str, Any]:
+        """Turn the Ollama process output into a response payload"""
+        if returncode == 0:
+            ai_response = stdout.strip()
+            
+            # Parse the response to extract the actual AI response
+            if "Assistant:" in ai_response:
+                ai_response = ai_response.split("Assistant:")[-1].strip()
+            
+            # LIMIT RESPONSE LENGTH to prevent overwhelming responses
+            if len(ai_response) > 200:
+                # Truncate long responses and add a helpful note
+                ai_response = ai_response[:200].rsplit('.', 1)[0] + ". For more details, please ask a specific question."
+            
+            # Log the interaction
+            self.conversation_history.append({
+                'timestamp': datetime.now().isoformat(),
+                'user_message': user_message,
+                'ai_response': ai_response,
+                'context': context
+            })
+            
             return {
-                'success': False,
-                'error': 'Request timed out',
-                'fallback_response': "I'm taking longer than expected to respond. Please try again with a simpler question."
+                'success': True,
+                'response': ai_response,
+                'model': self.model_name,
+                'timestamp': datetime.now().isoformat()
             }
-        except Exception as e:
-            logger.error(f"Unexpected error: {str(e)}")
+        else:
+            logger.error(f"Ollama error: {stderr}")
             return {
                 'success': False,
-                'error': str(e),
-                'fallback_response': "I encountered an unexpected error. Please try again."
+                'error': f"Ollama error: {stderr}",
+                'fallback_response': "I'm having trouble processing your request right now. Please try again in a moment."
             }
     
+    def _timeout_response(self) -> Dict[str, Any]:
+        logger.error("Ollama request timed out")
+        return {
+            'success': False,
+            'error': 'Request timed out',
+            'fallback_response': "I'm taking longer than expected to respond. Please try again with a simpler question."
+        }
+    
+    def _error_response(self, error: Exception) -> Dict[str, Any]:
+        logger.error(f"Unexpected error: {str(error)}")
+        return {
+            'success': False,
+            'error': str(error),
+            'fallback_response': "I encountered an unexpected error. Please try again."
+        }
+    
     def analyze_government_request(self, user_message: str) -> Dict[str, Any]:
         """
         Analyze user message to determine government service needs
@@ -108,25 +174,15 @@ class OllamaAI:
         Returns:
             Dictionary with analysis results
         """
-        # Create a specialized prompt for government services - KEEP RESPONSES SHORT!
-        context = """
-        You are a helpful AI assistant for Australian government services. 
-        
-        IMPORTANT: Keep your responses SHORT and CONCISE (max 2-3 sentences).
-        Do NOT give long explanations or overwhelming details.
-        
-        Your role is to:
-        1. Quickly identify what government service is needed
-        2. Give a brief, helpful response
-        3. Suggest next steps if relevant
-        
-        Common services: Birth registration, Medicare, unemployment benefits, emergency assistance.
-        
-        Remember: SHORT and HELPFUL responses only!
-        """
-        
-        response = self.generate_response(user_message, context)
-        
+        response = self.generate_response(user_message, GOVERNMENT_SERVICES_CONTEXT)
+        return self._add_analysis(response, user_message)
+    
+    async def analyze_government_request_async(self, user_message: str) -> Dict[str, Any]:
+        """Async variant of analyze_government_request for request handlers"""
+        response = await self.generate_response_async(user_message, GOVERNMENT_SERVICES_CONTEXT)
+        return self._add_analysis(response, user_message)
+    
+    def _add_analysis(self, response: Dict[str, Any], user_message: str) -> Dict[str, Any]:
         if response['success']:
             # Try to extract structured information from the response
             analysis = self._extract_service_info(response['response'], user_message)
@@ -0,0 +1,116 @@
+"""
+Journey templates
+
+Life events, how they are detected from an intake, and the steps each one
+needs per jurisdiction are defined in ``app/forms/journeys.yml``. The file is
+compiled once into templates so planning a journey is a couple of getter
+calls plus one validation pass over pre-checked step dicts, and new life
+events only need a YAML change.
+"""
+
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import yaml
+
+from ..models import Intake, JourneyStep
+from ..scheduler import topological_order
+from .compiler import compile_getter
+
+NATIONAL = "AU"
+
+
+@dataclass(frozen=True)
+class LifeEventTemplate:
+    id: str
+    requires: Tuple[Callable[[Any], Any], ...]
+    journey_id_fields: Tuple[Callable[[Any], Any], ...]
+    journeys: Dict[str, Tuple[Dict[str, str], ...]]
+
+    def matches(self, intake: Intake) -> bool:
+        """Whether every required intake section is present"""
+        return bool(self.requires) and all(get(intake) for get in self.requires)
+
+
+class JourneyTemplates:
+    """Compiled journey templates keyed by (life_event, jurisdiction)"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+        with open(self.path, 'r') as f:
+            config = yaml.safe_load(f)
+
+        self.life_events: Tuple[LifeEventTemplate, ...] = tuple(
+            self._compile(entry) for entry in config.get("life_events", [])
+        )
+        self._by_id: Dict[str, LifeEventTemplate] = {event.id: event for event in self.life_events}
+
+        self.default_life_event = config.get("default_life_event")
+        if self.default_life_event not in self._by_id:
+            raise ValueError(f"Unknown default_life_event: {self.default_life_event}")
+
+    def detect(self, intake: Intake) -> Tuple[str, bool]:
+        """
+        Determine the life event for an intake
+
+        Returns the life event id and whether it was detected from the intake
+        (False when the default was used).
+        """
+        for event in self.life_events:
+            if event.matches(intake):
+                return event.id, True
+        return self.default_life_event, False
+
+    def steps(self, life_event: str, jurisdiction: str) -> Tuple[Dict[str, str], ...]:
+        """
+        Get the step templates for a life event and jurisdiction
+
+        Templates are shared, read-only ``{id, title, depends_on}`` dicts. Pass them as
+        ``Journey(steps=...)`` so fresh pending steps are built in a single
+        validation pass; do not mutate them.
+        """
+        event = self._by_id.get(life_event) or self._by_id[self.default_life_event]
+        return event.journeys.get(jurisdiction.upper()) or event.journeys.get(NATIONAL, ())
+
+    def journey_id_input(self, intake: Intake, life_event: str) -> str:
+        """Concatenate the life event's identifying intake values for hashing"""
+        values = (get(intake) for get in self._by_id[life_event].journey_id_fields)
+        return "".join(str(value) for value in values if value is not None)
+
+    def _compile(self, entry: Dict[str, Any]) -> LifeEventTemplate:
+        journeys = {}
+        for jurisdiction, steps in (entry.get("journeys") or {}).items():
+            # Fail at load time on malformed steps or dependencies rather than on the first intake
+            validated = [JourneyStep(**step) for step in steps]
+            topological_order(validated)
+            journeys[jurisdiction.upper()] = tuple(
+                {"id": step.id, "title": step.title, "depends_on": tuple(step.depends_on)}
+                for step in validated
+            )
+
+        if not journeys:
+            raise ValueError(f"Life event {entry.get('id')} has no journeys")
+
+        return LifeEventTemplate(
+            id=entry["id"],
+            requires=tuple(compile_getter(source) for source in entry.get("requires", [])),
+            journey_id_fields=tuple(compile_getter(source) for source in entry.get("journey_id_fields", [])),
+            journeys=journeys
+        )
+
+
+_templates: Optional[JourneyTemplates] = None
+_templates_lock = threading.Lock()
+
+
+def get_journey_templates() -> JourneyTemplates:
+    """Get the process-wide journey templates, loading them on first use"""
+    global _templates
+    if _templates is None:
+        with _templates_lock:
+            if _templates is None:
+                _templates = JourneyTemplates(Path(__file__).parent / "journeys.yml")
+    return _templates
@@ -0,0 +1,237 @@
+"""
+Form schema registry
+
+Loads every versioned form schema (``app/forms/<name>[.<jurisdiction>].v<N>.yml``)
+once at startup, validates it into a ``FormSchema`` and indexes it by
+(step_id, jurisdiction, version). Lookups are dict hits; when a file's mtime
+changes only that file is parsed again. Each schema is also compiled into a
+prefill function as it loads, which validates its field sources.
+"""
+
+import logging
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+from ..models import FormSchema
+from .compiler import CompiledPrefill, compile_prefill
+
+logger = logging.getLogger(__name__)
+
+# Jurisdiction for Commonwealth forms (Centrelink, Medicare, ...) that apply in
+# every state; state-specific schemas take precedence over these.
+NATIONAL = "AU"
+
+FORM_FILE_PATTERN = re.compile(
+    r"^(?P<name>[a-z0-9_]+)(?:\.(?P<jurisdiction>[a-z]{2,3}))?\.v(?P<version>\d+)\.ya?ml$"
+)
+
+FormKey = Tuple[str, str, int]
+
+
+class FormRegistry:
+    """Versioned, hot-reloadable index of form schemas"""
+
+    def __init__(self, forms_dir: Path):
+        self.forms_dir = Path(forms_dir)
+        self._lock = threading.Lock()
+        self._files: Dict[Path, Tuple[int, FormKey]] = {}
+        self._index: Dict[FormKey, FormSchema] = {}
+        self._latest: Dict[Tuple[str, str], FormSchema] = {}
+        self._compiled: Dict[Tuple[FormKey, ...], CompiledPrefill] = {}
+        self._stop_event = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+        self.load_all()
+
+    def load_all(self):
+        """Load every schema file; invalid schemas raise at startup"""
+        for path in sorted(self._schema_files()):
+            self.reload_file(path, strict=True)
+
+    def get(self, step_id: str, jurisdiction: str = NATIONAL, version: Optional[int] = None) -> Optional[FormSchema]:
+        """
+        Look up the schema for a journey step
+
+        Without a version the latest one is returned. A jurisdiction without
+        its own schema falls back to the national one.
+        """
+        jurisdiction = jurisdiction.upper()
+        if version is not None:
+            return self._index.get((step_id, jurisdiction, version)) or \
+                self._index.get((step_id, NATIONAL, version))
+        return self._latest.get((step_id, jurisdiction)) or self._latest.get((step_id, NATIONAL))
+
+    def keys(self) -> List[FormKey]:
+        """All indexed (step_id, jurisdiction, version) keys"""
+        return list(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def refresh(self) -> List[Path]:
+        """Reload files whose mtime changed, pick up new ones and drop deleted ones"""
+        changed = []
+        current = set(self._schema_files())
+
+        for path in current:
+            if self.reload_file(path):
+                changed.append(path)
+
+        for path in set(self._files) - current:
+            self.remove_file(path)
+            changed.append(path)
+
+        return changed
+
+    def reload_file(self, path: Path, strict: bool = False) -> bool:
+        """
+        Parse one schema file if it is new or its mtime changed
+
+        Returns True when the index was updated. Invalid files raise when
+        ``strict`` is set; otherwise the error is logged and the previously
+        loaded version stays in service.
+        """
+        path = Path(path)
+        try:
+            mtime_ns = path.stat().st_mtime_ns
+            known = self._files.get(path)
+            if known and known[0] == mtime_ns:
+                return False
+
+            schema = self._parse(path)
+            compiled = compile_prefill([schema])
+        except Exception as e:
+            if strict:
+                raise
+            logger.error(f"Failed to load form schema {path.name}: {e}")
+            return False
+
+        key = (schema.step_id, schema.jurisdiction, schema.version)
+        with self._lock:
+            for other_path, (_, other_key) in self._files.items():
+                if other_key == key and other_path != path:
+                    message = f"{path.name} duplicates form {key} from {other_path.name}"
+                    if strict:
+                        raise ValueError(message)
+                    logger.error(message)
+                    return False
+
+            if known and known[1] != key:
+                self._index.pop(known[1], None)
+                self._update_latest(known[1][0], known[1][1])
+
+            self._files[path] = (mtime_ns, key)
+            self._index[key] = schema
+            self._update_latest(schema.step_id, schema.jurisdiction)
+            self._compiled[(key,)] = compiled
+
+        logger.info(f"Loaded form schema {path.name} as {key}")
+        return True
+
+    def remove_file(self, path: Path):
+        """Drop the schema loaded from a deleted file"""
+        with self._lock:
+            known = self._files.pop(Path(path), None)
+            if known:
+                self._index.pop(known[1], None)
+                self._update_latest(known[1][0], known[1][1])
+                self._compiled.pop((known[1],), None)
+
+    def compile(self, schemas: List[FormSchema]) -> CompiledPrefill:
+        """
+        Get the compiled prefill function for a list of registered schemas
+
+        Functions are cached per combination of forms, so prefilling a whole
+        journey reuses one function that reads each shared source once. A
+        cached function built from schemas that have since been reloaded is
+        recompiled.
+        """
+        cache_key = tuple((s.step_id, s.jurisdiction, s.version) for s in schemas)
+        compiled = self._compiled.get(cache_key)
+        if compiled is None or any(a is not b for a, b in zip(compiled.schemas, schemas)):
+            compiled = compile_prefill(schemas)
+            self._compiled[cache_key] = compiled
+        return compiled
+
+    def start_watching(self):
+        """Watch the forms directory and reload schemas as they change"""
+        if self._watcher is not None:
+            return
+
+        from watchfiles import watch, Change
+
+        def run():
+            for changes in watch(self.forms_dir, stop_event=self._stop_event):
+                for change, changed_path in changes:
+                    path = Path(changed_path)
+                    if not FORM_FILE_PATTERN.match(path.name):
+                        continue
+                    if change == Change.deleted:
+                        self.remove_file(path)
+                    else:
+                        self.reload_file(path)
+
+        self._stop_event.clear()
+        self._watcher = threading.Thread(target=run, name="form-registry-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        """Stop the background watcher started by start_watching"""
+        if self._watcher is None:
+            return
+        self._stop_event.set()
+        self._watcher.join(timeout=5)
+        self._watcher = None
+
+    def _schema_files(self) -> List[Path]:
+        return [p for p in self.forms_dir.glob("*.v*.y*ml") if FORM_FILE_PATTERN.match(p.name)]
+
+    def _parse(self, path: Path) -> FormSchema:
+        match = FORM_FILE_PATTERN.match(path.name)
+        if not match:
+            raise ValueError(f"Form schema file name not recognised: {path.name}")
+
+        with open(path, 'r') as f:
+            form_data = yaml.safe_load(f)
+
+        if not isinstance(form_data, dict):
+            raise ValueError(f"Form schema {path.name} is not a mapping")
+        if not form_data.get("step_id"):
+            raise ValueError(f"Form schema {path.name} has no step_id")
+
+        version = int(match.group("version"))
+        if form_data.get("version", version) != version:
+            raise ValueError(f"Form schema {path.name} declares version {form_data['version']}")
+
+        form_data["version"] = version
+        form_data["jurisdiction"] = (match.group("jurisdiction") or form_data.get("jurisdiction") or NATIONAL).upper()
+
+        return FormSchema(**form_data)
+
+    def _update_latest(self, step_id: str, jurisdiction: str):
+        versions = [
+            schema for (s, j, _), schema in self._index.items()
+            if s == step_id and j == jurisdiction
+        ]
+        if versions:
+            self._latest[(step_id, jurisdiction)] = max(versions, key=lambda schema: schema.version)
+        else:
+            self._latest.pop((step_id, jurisdiction), None)
+
+
+_registry: Optional[FormRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_form_registry() -> FormRegistry:
+    """Get the process-wide registry for ``app/forms``, loading it on first use"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = FormRegistry(Path(__file__).parent)
+    return _registry
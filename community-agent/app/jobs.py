@@ -0,0 +1,495 @@
+"""
+Asynchronous form submission
+
+``POST /submit`` used to generate the reference, write the receipt and append
+the audit event inline, so a slow portal would hold the request open for the
+whole submission. Submissions are now durable jobs: the request enqueues a
+job and returns straight away, and background workers claim jobs, perform the
+submission and record the receipt on the job for ``GET /submit/jobs/{id}``.
+
+Claimed jobs carry a lease. A job whose worker died mid-submission becomes
+claimable again once its lease expires, so several uvicorn workers can share
+one SQLite queue and a restart does not lose queued or running jobs. Each
+claim gets its own lease token, and only the worker holding the current
+lease can complete or fail the job: a worker whose lease expired while the
+portal was slow finds it has lost the job and records nothing.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .models import SubmissionJob, SubmissionResponse
+from .utils.concurrency import run_io
+from .utils.sqlite import ThreadLocalSQLite
+
+logger = logging.getLogger(__name__)
+
+SUBMISSION_WORKERS = int(os.getenv("SUBMISSION_WORKERS", "4"))
+SUBMISSION_MAX_ATTEMPTS = int(os.getenv("SUBMISSION_MAX_ATTEMPTS", "3"))
+# Upper bound on one submission; a portal run longer than this is retried
+SUBMISSION_LEASE_SECONDS = int(os.getenv("SUBMISSION_LEASE_SECONDS", "300"))
+
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+# The claimed job, its form data and the lease token of this claim
+ClaimedJob = Tuple[SubmissionJob, Dict[str, Any], str]
+
+
+def _new_job_id() -> str:
+    return f"job_{uuid.uuid4().hex[:16]}"
+
+
+def _new_lease() -> str:
+    return uuid.uuid4().hex
+
+
+def _abandoned(attempts: int) -> str:
+    return f"Lease expired after {attempts} attempts"
+
+
+class SubmissionJobStore(ABC):
+    """Interface for the durable submission job queue"""
+
+    @abstractmethod
+    def enqueue(self, journey_id: str, step_id: str, form_data: Dict[str, Any]) -> SubmissionJob:
+        """Record a queued job and return it"""
+
+    @abstractmethod
+    def claim(
+        self, lease_seconds: int = SUBMISSION_LEASE_SECONDS, max_attempts: int = SUBMISSION_MAX_ATTEMPTS
+    ) -> Optional[ClaimedJob]:
+        """
+        Atomically take the oldest claimable job
+
+        Queued jobs and running jobs whose lease has expired are claimable. A
+        job whose lease expired on its last attempt (``max_attempts``) is
+        marked failed instead, so a submission that keeps killing its worker
+        is not retried forever.
+
+        Returns the job (now ``running``, attempts incremented) with its form
+        data and the claim's lease token, or None when the queue is empty.
+        """
+
+    @abstractmethod
+    def complete(self, job_id: str, lease: str, receipt: SubmissionResponse) -> bool:
+        """
+        Mark a job succeeded and store its receipt
+
+        Returns False, changing nothing, if ``lease`` is no longer the job's
+        lease (it expired and another worker claimed the job).
+        """
+
+    @abstractmethod
+    def fail(self, job_id: str, lease: str, error: str, retry: bool) -> bool:
+        """Record a failed attempt, requeueing the job if ``retry``; False if the lease was lost"""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[SubmissionJob]:
+        """Return the job for ``job_id`` or None"""
+
+
+class InMemorySubmissionJobStore(SubmissionJobStore):
+    """Process-local queue for tests and single-worker development"""
+
+    def __init__(self):
+        self._jobs: Dict[str, SubmissionJob] = {}
+        self._form_data: Dict[str, Dict[str, Any]] = {}
+        # Lease token and expiry of each running job
+        self._leases: Dict[str, Tuple[str, datetime]] = {}
+        self._lock = threading.Lock()
+
+    def enqueue(self, journey_id: str, step_id: str, form_data: Dict[str, Any]) -> SubmissionJob:
+        job = SubmissionJob(job_id=_new_job_id(), journey_id=journey_id, step_id=step_id)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._form_data[job.job_id] = form_data
+        return job.model_copy()
+
+    def claim(
+        self, lease_seconds: int = SUBMISSION_LEASE_SECONDS, max_attempts: int = SUBMISSION_MAX_ATTEMPTS
+    ) -> Optional[ClaimedJob]:
+        now = datetime.utcnow()
+        with self._lock:
+            for job in sorted(self._jobs.values(), key=lambda j: j.created_at):
+                expired = job.status == "running" and self._leases[job.job_id][1] < now
+                if expired and job.attempts >= max_attempts:
+                    job.status = "failed"
+                    job.error = _abandoned(job.attempts)
+                    job.updated_at = now
+                    del self._leases[job.job_id]
+                elif job.status == "queued" or expired:
+                    job.status = "running"
+                    job.attempts += 1
+                    job.updated_at = now
+                    lease = _new_lease()
+                    self._leases[job.job_id] = (lease, now + timedelta(seconds=lease_seconds))
+                    return job.model_copy(), self._form_data[job.job_id], lease
+        return None
+
+    def complete(self, job_id: str, lease: str, receipt: SubmissionResponse) -> bool:
+        with self._lock:
+            if self._leases.get(job_id, (None,))[0] != lease:
+                return False
+            job = self._jobs[job_id]
+            job.status = "succeeded"
+            job.receipt = receipt
+            job.error = None
+            job.updated_at = datetime.utcnow()
+            del self._leases[job_id]
+            return True
+
+    def fail(self, job_id: str, lease: str, error: str, retry: bool) -> bool:
+        with self._lock:
+            if self._leases.get(job_id, (None,))[0] != lease:
+                return False
+            job = self._jobs[job_id]
+            job.status = "queued" if retry else "failed"
+            job.error = error
+            job.updated_at = datetime.utcnow()
+            del self._leases[job_id]
+            return True
+
+    def get(self, job_id: str) -> Optional[SubmissionJob]:
+        job = self._jobs.get(job_id)
+        return job.model_copy() if job else None
+
+
+class SQLiteSubmissionJobStore(SubmissionJobStore):
+    """SQLite-backed queue in WAL mode, shared by every worker process"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS submission_jobs (
+            job_id           TEXT PRIMARY KEY,
+            journey_id       TEXT NOT NULL,
+            step_id          TEXT NOT NULL,
+            form_data        TEXT NOT NULL,
+            status           TEXT NOT NULL,
+            attempts         INTEGER NOT NULL DEFAULT 0,
+            lease_expires_at TEXT,
+            lease_owner      TEXT,
+            receipt          TEXT,
+            error            TEXT,
+            created_at       TEXT NOT NULL,
+            updated_at       TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_submission_jobs_status
+            ON submission_jobs (status, created_at);
+    """
+
+    COLUMNS = "job_id, journey_id, step_id, status, attempts, created_at, updated_at, receipt, error"
+
+    def __init__(self, db_path: str, busy_timeout_ms: int = 5000):
+        self.db = ThreadLocalSQLite(db_path, busy_timeout_ms)
+        self.db_path = self.db.db_path
+
+        conn = self._connection()
+        conn.executescript(self.SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(submission_jobs)")}
+        if "lease_owner" not in columns:
+            conn.execute("ALTER TABLE submission_jobs ADD COLUMN lease_owner TEXT")
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        return self.db.connection()
+
+    def _job(self, row: tuple) -> SubmissionJob:
+        job_id, journey_id, step_id, status, attempts, created_at, updated_at, receipt, error = row
+        return SubmissionJob(
+            job_id=job_id,
+            journey_id=journey_id,
+            step_id=step_id,
+            status=status,
+            attempts=attempts,
+            created_at=created_at,
+            updated_at=updated_at,
+            receipt=SubmissionResponse.model_validate_json(receipt) if receipt else None,
+            error=error
+        )
+
+    def enqueue(self, journey_id: str, step_id: str, form_data: Dict[str, Any]) -> SubmissionJob:
+        job = SubmissionJob(job_id=_new_job_id(), journey_id=journey_id, step_id=step_id)
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO submission_jobs
+                    (job_id, journey_id, step_id, form_data, status, attempts, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, 0, ?, ?)
+                """,
+                (
+                    job.job_id, journey_id, step_id, json.dumps(form_data, default=str), job.status,
+                    job.created_at.isoformat(), job.updated_at.isoformat()
+                ),
+            )
+        return job
+
+    def claim(
+        self, lease_seconds: int = SUBMISSION_LEASE_SECONDS, max_attempts: int = SUBMISSION_MAX_ATTEMPTS
+    ) -> Optional[ClaimedJob]:
+        now = datetime.utcnow()
+        lease = _new_lease()
+        conn = self._connection()
+        # A single UPDATE ... RETURNING is atomic, so two workers never claim the same job
+        with conn:
+            conn.execute(
+                """
+                UPDATE submission_jobs
+                SET status = 'failed',
+                    error = 'Lease expired after ' || attempts || ' attempts',
+                    lease_expires_at = NULL,
+                    lease_owner = NULL,
+                    updated_at = ?
+                WHERE status = 'running' AND lease_expires_at < ? AND attempts >= ?
+                """,
+                (now.isoformat(), now.isoformat(), max_attempts),
+            )
+            row = conn.execute(
+                f"""
+                UPDATE submission_jobs
+                SET status = 'running',
+                    attempts = attempts + 1,
+                    lease_expires_at = ?,
+                    lease_owner = ?,
+                    updated_at = ?
+                WHERE job_id = (
+                    SELECT job_id FROM submission_jobs
+                    WHERE status = 'queued'
+                       OR (status = 'running' AND lease_expires_at < ?)
+                    ORDER BY created_at
+                    LIMIT 1
+                )
+                RETURNING {self.COLUMNS}, form_data
+                """,
+                (
+                    (now + timedelta(seconds=lease_seconds)).isoformat(),
+                    lease,
+                    now.isoformat(),
+                    now.isoformat(),
+                ),
+            ).fetchone()
+        if row is None:
+            return None
+        return self._job(row[:-1]), json.loads(row[-1]), lease
+
+    def complete(self, job_id: str, lease: str, receipt: SubmissionResponse) -> bool:
+        conn = self._connection()
+        with conn:
+            # No row matches once another worker has claimed the job
+            updated = conn.execute(
+                """
+                UPDATE submission_jobs
+                SET status = 'succeeded', receipt = ?, error = NULL,
+                    lease_expires_at = NULL, lease_owner = NULL, updated_at = ?
+                WHERE job_id = ? AND status = 'running' AND lease_owner = ?
+                """,
+                (receipt.model_dump_json(), datetime.utcnow().isoformat(), job_id, lease),
+            ).rowcount
+        return updated == 1
+
+    def fail(self, job_id: str, lease: str, error: str, retry: bool) -> bool:
+        conn = self._connection()
+        with conn:
+            updated = conn.execute(
+                """
+                UPDATE submission_jobs
+                SET status = ?, error = ?, lease_expires_at = NULL, lease_owner = NULL, updated_at = ?
+                WHERE job_id = ? AND status = 'running' AND lease_owner = ?
+                """,
+                ("queued" if retry else "failed", error, datetime.utcnow().isoformat(), job_id, lease),
+            ).rowcount
+        return updated == 1
+
+    def get(self, job_id: str) -> Optional[SubmissionJob]:
+        row = self._connection().execute(
+            f"SELECT {self.COLUMNS} FROM submission_jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        return self._job(row) if row else None
+
+
+def get_submission_job_store() -> SubmissionJobStore:
+    """
+    Build the job store configured by the environment
+
+    SUBMISSION_STORE selects the backend (``sqlite`` or ``memory``, defaulting
+    to JOURNEY_STORE) and SUBMISSION_DB_PATH the SQLite file.
+    """
+    backend = os.getenv("SUBMISSION_STORE", os.getenv("JOURNEY_STORE", "sqlite")).lower()
+
+    if backend == "memory":
+        return InMemorySubmissionJobStore()
+    if backend == "sqlite":
+        db_path = os.getenv("SUBMISSION_DB_PATH", str(Path("_artifacts") / "submission_jobs.db"))
+        return SQLiteSubmissionJobStore(db_path)
+
+    raise ValueError(f"Unknown SUBMISSION_STORE backend: {backend}")
+
+
+class SubmissionWorkers:
+    """
+    Background workers that drain the submission job queue
+
+    ``submit`` is a blocking ``(journey_id, step_id, form_data) ->
+    SubmissionResponse`` callable. It runs on a thread pool of the workers'
+    own, one thread per worker, so slow portals cannot take the shared I/O
+    pool away from request handlers. Failed attempts are retried up to
+    ``max_attempts`` times before the job is marked failed.
+    """
+
+    def __init__(
+        self,
+        store: SubmissionJobStore,
+        submit: Callable[[str, str, Dict[str, Any]], SubmissionResponse],
+        workers: int = SUBMISSION_WORKERS,
+        max_attempts: int = SUBMISSION_MAX_ATTEMPTS,
+        lease_seconds: int = SUBMISSION_LEASE_SECONDS,
+        poll_interval: float = 1.0
+    ):
+        self.store = store
+        self.submit = submit
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        # Idle workers and long-polls also re-check the store at this interval
+        # to pick up jobs enqueued or finished by other processes
+        self.poll_interval = poll_interval
+
+        self._tasks: List[asyncio.Task] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._waiters: Dict[str, Tuple[asyncio.Event, int]] = {}
+        self._stopping = False
+
+    def start(self):
+        """Start the workers on the running event loop"""
+        if self._tasks:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="submission")
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stop the workers, letting in-flight submissions finish"""
+        self._stopping = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def notify(self):
+        """Wake idle workers after a job has been enqueued"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run(
+        self, journey_id: str, step_id: str, form_data: Dict[str, Any], timeout: Optional[float] = None
+    ) -> SubmissionResponse:
+        """
+        Enqueue a submission and wait for its receipt
+
+        ``timeout`` defaults to every attempt using up its lease.
+
+        Raises:
+            RuntimeError: if the job failed
+            TimeoutError: if it has not finished after ``timeout`` seconds;
+                it stays queued and finishes in the background
+        """
+        job = await run_io(self.store.enqueue, journey_id, step_id, form_data)
+        self.notify()
+        if timeout is None:
+            timeout = self.lease_seconds * self.max_attempts
+        job = await self.wait(job.job_id, timeout)
+        if job.status == "succeeded":
+            return job.receipt
+        if job.status == "failed":
+            raise RuntimeError(job.error)
+        raise TimeoutError(f"Submission job {job.job_id} is still {job.status}")
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[SubmissionJob]:
+        """
+        Long-poll a job until it finishes or ``timeout`` seconds pass
+
+        Returns the latest state of the job, or None if it does not exist.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        event, count = self._waiters.get(job_id, (asyncio.Event(), 0))
+        self._waiters[job_id] = (event, count + 1)
+        try:
+            while True:
+                job = await run_io(self.store.get, job_id)
+                remaining = deadline - loop.time()
+                if job is None or job.status in TERMINAL_STATUSES or remaining <= 0:
+                    return job
+                try:
+                    await asyncio.wait_for(event.wait(), min(remaining, self.poll_interval))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            event, count = self._waiters[job_id]
+            if count > 1:
+                self._waiters[job_id] = (event, count - 1)
+            else:
+                del self._waiters[job_id]
+
+    async def _work(self):
+        while not self._stopping:
+            try:
+                self._wakeup.clear()
+                claimed = await run_io(self.store.claim, self.lease_seconds, self.max_attempts)
+                if claimed is None:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self._run(*claimed)
+            except Exception:
+                logger.exception("Submission worker error")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _run(self, job: SubmissionJob, form_data: Dict[str, Any], lease: str):
+        try:
+            receipt = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self.submit, job.journey_id, job.step_id, form_data
+            )
+        except Exception as e:
+            retry = job.attempts < self.max_attempts
+            if not await run_io(self.store.fail, job.job_id, lease, str(e), retry):
+                self._lost_lease(job)
+                return
+            logger.warning(
+                "Submission %s attempt %d failed%s: %s",
+                job.job_id, job.attempts, ", retrying" if retry else "", e
+            )
+            if retry:
+                return
+        else:
+            if not await run_io(self.store.complete, job.job_id, lease, receipt):
+                self._lost_lease(job)
+                return
+
+        waiter = self._waiters.get(job.job_id)
+        if waiter is not None:
+            waiter[0].set()
+
+    @staticmethod
+    def _lost_lease(job: SubmissionJob):
+        # The job is another worker's now; its outcome is the one recorded
+        logger.warning(
+            "Submission %s attempt %d outlived its lease; another worker has the job",
+            job.job_id, job.attempts
+        )
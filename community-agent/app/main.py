@@ -1,20 +1,32 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Body, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
+import asyncio
 import hashlib
+import json
+import os
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
 
+from pydantic import ValidationError
+
 from .models import (
-    Intake, Journey, PrefillResponse, ConsentRequest, 
-    SubmissionResponse, IntakeResponse
+    Intake, Journey, PrefillResponse, JourneyPrefillResponse, BulkPrefillResponse, ConsentRequest, 
+    SubmissionResponse, SubmissionJob, IntakeResponse, JourneyExecutionResponse
 )
-from .orchestrator import JourneyOrchestrator
+from .orchestrator import JourneyOrchestrator, UnknownStepError
+from .jobs import SubmissionWorkers, get_submission_job_store
+from .retention import RetentionSweeper
+from .repository import get_journey_repository
 from .utils.audit import log_consent, verify_consent, get_audit_trail, get_consent_summary
-from .utils.storage import list_artifacts, get_artifact_stats, cleanup_expired_artifacts, save_artifact
+from .utils.storage import list_artifacts, get_artifact_stats, set_journey_retention, save_artifact
+from .utils.concurrency import run_io, shutdown_io_executor
+from .utils.writer import shutdown_vault_writer
+from .utils.audit_writer import shutdown_audit_writer
+from .utils.audit_chain import verify_audit_log
 from .ai_integration import ollama_ai
 
 app = FastAPI(
@@ -35,9 +47,122 @@ app.add_middleware(
 # Initialize orchestrator
 orchestrator = JourneyOrchestrator()
 
-# In-memory storage for demo (in production, use proper database)
-journey_store: Dict[str, Journey] = {}
-intake_store: Dict[str, Journey] = {}
+# Durable journey/intake storage shared by all workers
+journey_repository = get_journey_repository()
+
+# Form submissions are queued as durable jobs and performed in the background
+submission_jobs = SubmissionWorkers(get_submission_job_store(), orchestrator.submit_form)
+
+# Longest GET /submit/jobs/{job_id}?wait= long-poll, in seconds
+SUBMISSION_MAX_WAIT = 30
+
+
+def _delete_expired_journeys(journey_ids: List[str]):
+    """Drop swept journeys from the repository (blocking, run on the I/O pool)"""
+    for journey_id in journey_ids:
+        journey_repository.delete(journey_id)
+
+
+# Journeys past their retention are removed in the background
+retention_sweeper = RetentionSweeper(_delete_expired_journeys)
+
+
+# Reload edited form schemas without restarting the worker
+FORMS_HOT_RELOAD = os.getenv("FORMS_HOT_RELOAD", "true").lower() == "true"
+
+
+@app.on_event("startup")
+async def startup_event():
+    """Start watching form schemas for changes and start background workers"""
+    if FORMS_HOT_RELOAD:
+        orchestrator.form_registry.start_watching()
+    submission_jobs.start()
+    retention_sweeper.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background workers and let queued vault/audit writes finish"""
+    orchestrator.form_registry.stop_watching()
+    await submission_jobs.stop()
+    await retention_sweeper.stop()
+    shutdown_io_executor(wait=True)
+    shutdown_vault_writer()
+    shutdown_audit_writer()
+
+
+def _create_journey(intake: Intake) -> Journey:
+    """Plan and persist a journey (blocking, run on the I/O pool)"""
+    journey = orchestrator.plan_journey(intake)
+    journey_repository.save(journey, intake)
+    return journey
+
+
+# Intakes planned per I/O pool task by POST /intake/batch; each chunk shares
+# one group-committed vault write, audit append and repository transaction.
+BATCH_CHUNK_SIZE = 100
+
+
+def _parse_intake_batch(body: bytes, content_type: str) -> List[Any]:
+    """
+    Parse a JSON array or NDJSON request body into raw records
+    
+    An NDJSON line that is not valid JSON becomes its ``ValueError``, so it is
+    reported with its index instead of rejecting the whole batch.
+    """
+    text = body.decode("utf-8").strip()
+    if not text:
+        return []
+    
+    if "ndjson" not in content_type and text.startswith("["):
+        records = json.loads(text)
+        if not isinstance(records, list):
+            raise ValueError("Expected a JSON array of intakes")
+        return records
+    
+    records = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except ValueError as e:
+            records.append(e)
+    return records
+
+
+def _validate_intake_batch(records: List[Any]) -> Tuple[List[Tuple[int, Intake]], List[Dict[str, Any]]]:
+    """Validate every record up front, separating valid intakes from errors"""
+    intakes = []
+    errors = []
+    for index, record in enumerate(records):
+        if isinstance(record, ValueError):
+            errors.append({"index": index, "error": f"Invalid JSON: {record}"})
+            continue
+        try:
+            intakes.append((index, Intake.model_validate(record)))
+        except ValidationError as e:
+            errors.append({"index": index, "error": e.errors(include_url=False)})
+    return intakes, errors
+
+
+def _create_journey_batch(chunk: List[Tuple[int, Intake]]) -> List[Dict[str, Any]]:
+    """Plan and persist a chunk of journeys, returning NDJSON result records"""
+    intakes = [intake for _, intake in chunk]
+    journeys = orchestrator.plan_journeys(intakes)
+    journey_repository.save_many(zip(journeys, intakes))
+    return [
+        {"index": index, "journey_id": journey.id, "plan": journey.model_dump(mode="json")}
+        for (index, _), journey in zip(chunk, journeys)
+    ]
+
+
+async def _plan_chunk(chunk: List[Tuple[int, Intake]]) -> List[Dict[str, Any]]:
+    """Plan a chunk on the I/O pool, turning a failure into per-record errors"""
+    try:
+        return await run_io(_create_journey_batch, chunk)
+    except Exception as e:
+        return [{"index": index, "error": str(e)} for index, _ in chunk]
 
 # Mount static files
 static_dir = Path(__file__).parent / "static"
@@ -62,8 +187,11 @@ async def root():
                 "intake": "POST /intake - Start a new journey",
                 "plan": "GET /plan/{journey_id} - Get journey plan",
                 "prefill": "POST /prefill/{journey_id}/{step} - Prefill form",
+                "prefill_journey": "POST /prefill/{journey_id} - Prefill every step of a journey",
                 "consent": "POST /consent/{journey_id} - Grant consent",
-                "submit": "POST /submit/{journey_id}/{step} - Submit form",
+                "consent_summary": "GET /consent/summary - Consent counts",
+                "submit": "POST /submit/{journey_id}/{step} - Queue a form submission",
+                "submission_job": "GET /submit/jobs/{job_id}?wait=30 - Poll a submission for its receipt",
                 "artifacts": "GET /artifacts - List artifacts",
                 "audit": "GET /audit - Get audit trail",
                 "ai_chat": "POST /ai/chat - Chat with AI assistant"
@@ -83,15 +211,8 @@ async def create_intake(intake: Intake):
     4. Returns journey plan
     """
     try:
-        # Plan the journey
-        journey = orchestrator.plan_journey(intake)
-        
-        # Store in memory for demo (in production, use database)
-        journey_store[journey.id] = journey
-        intake_store[journey.id] = intake
-        
-        # Log intake creation
-        user_hash = hashlib.sha256(intake.parent1.full_name.encode()).hexdigest()[:8]
+        # Plan and persist the journey off the event loop
+        journey = await run_io(_create_journey, intake)
         
         return IntakeResponse(
             journey_id=journey.id,
@@ -102,15 +223,89 @@ async def create_intake(intake: Intake):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/intake/batch")
+async def create_intake_batch(request: Request):
+    """
+    Create journeys for many intakes in one request
+    
+    Accepts a JSON array or NDJSON (one intake per line). All records are
+    validated first; valid intakes are then planned in parallel chunks and
+    each result is streamed back as an NDJSON line as soon as its chunk
+    finishes, so line order does not follow input order. Each line carries
+    the input ``index``; invalid records produce ``{index, error}`` lines.
+    """
+    body = await request.body()
+    try:
+        records = await run_io(_parse_intake_batch, body, request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch body: {str(e)}")
+    
+    intakes, errors = await run_io(_validate_intake_batch, records)
+    
+    async def stream_results():
+        for error in errors:
+            yield json.dumps(error, default=str) + "\n"
+        
+        chunks = [intakes[i:i + BATCH_CHUNK_SIZE] for i in range(0, len(intakes), BATCH_CHUNK_SIZE)]
+        
+        for finished in asyncio.as_completed([_plan_chunk(chunk) for chunk in chunks]):
+            for result in await finished:
+                yield json.dumps(result) + "\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
 @app.get("/plan/{journey_id}")
 async def get_journey_plan(journey_id: str):
     """Get the journey plan for a specific journey ID"""
     try:
-        if journey_id not in journey_store:
+        journey = await run_io(journey_repository.get_journey, journey_id)
+        if journey is None:
+            raise HTTPException(status_code=404, detail="Journey not found")
+        
+        return journey
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/bulk/prefill/{step_id}", response_model=BulkPrefillResponse)
+async def bulk_prefill_form(step_id: str, intakes: List[Dict[str, Any]] = Body(...), jurisdiction: str = "NSW"):
+    """
+    Prefill one form for many applicants (grant rounds, disaster declarations)
+    
+    Takes a JSON array of intake records and writes all prefilled rows, with
+    per-row missing-required-field flags, to one compressed batch file.
+    Records carrying a ``journey_id`` use it as their row id.
+    """
+    try:
+        row_ids = [record.get("journey_id", index) for index, record in enumerate(intakes)]
+        return await run_io(orchestrator.bulk_prefill, step_id, intakes, jurisdiction, row_ids)
+    
+    except UnknownStepError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (ValueError, TypeError) as e:
+        # The records could not be read into columns
+        raise HTTPException(status_code=422, detail=f"Invalid intake data: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/prefill/{journey_id}", response_model=JourneyPrefillResponse)
+async def prefill_journey(journey_id: str):
+    """Prefill the forms for every step of a journey in one call"""
+    try:
+        journey = await run_io(journey_repository.get_journey, journey_id)
+        intake = await run_io(journey_repository.get_intake, journey_id) if journey else None
+        if journey is None or intake is None:
             raise HTTPException(status_code=404, detail="Journey not found")
         
-        return journey_store[journey_id]
+        return await run_io(orchestrator.prefill_journey, journey, intake)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -119,14 +314,50 @@ async def get_journey_plan(journey_id: str):
 async def prefill_form(journey_id: str, step_id: str):
     """Prefill a form for a specific journey step"""
     try:
-        if journey_id not in journey_store:
+        journey = await run_io(journey_repository.get_journey, journey_id)
+        intake = await run_io(journey_repository.get_intake, journey_id) if journey else None
+        if journey is None or intake is None:
             raise HTTPException(status_code=404, detail="Journey not found")
         
         # Get the form schema and prefill data
-        prefill_data = orchestrator.prefill_form(journey_id, step_id, intake_store[journey_id])
+        prefill_data = await run_io(orchestrator.prefill_form, journey_id, step_id, intake, journey.jurisdiction)
         
         return prefill_data
     
+    except HTTPException:
+        raise
+    except UnknownStepError as e:
+        # No form schema for this step
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/execute/{journey_id}", response_model=JourneyExecutionResponse)
+async def execute_journey(journey_id: str):
+    """
+    Prefill and submit every remaining step of a journey, independent steps in parallel
+    
+    Each step is a job on the submission queue, so it gets the queue's leases
+    and retries; a step is submitted once the jobs of its dependencies succeed.
+    """
+    try:
+        journey = await run_io(journey_repository.get_journey, journey_id)
+        intake = await run_io(journey_repository.get_intake, journey_id) if journey else None
+        if journey is None or intake is None:
+            raise HTTPException(status_code=404, detail="Journey not found")
+        
+        results = await orchestrator.execute_journey(journey, intake, submit_form=submission_jobs.run)
+        await run_io(journey_repository.save, journey)
+        
+        return JourneyExecutionResponse(
+            journey=journey,
+            submissions={step_id: r for step_id, r in results.items() if isinstance(r, SubmissionResponse)},
+            errors={step_id: str(r) for step_id, r in results.items() if isinstance(r, Exception)}
+        )
+    
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -135,69 +366,172 @@ async def prefill_form(journey_id: str, step_id: str):
 async def grant_consent(journey_id: str, consent_request: ConsentRequest):
     """Grant consent for a journey"""
     try:
-        if journey_id not in journey_store:
+        if not await run_io(journey_repository.exists, journey_id):
             raise HTTPException(status_code=404, detail="Journey not found")
         
-        # Log consent
-        log_consent(
+        consent = consent_request.consent
+        
+        # Log consent; there are no user accounts, so the user is identified
+        # by a hash of their journey
+        consent_id = await run_io(
+            log_consent,
             journey_id=journey_id,
-            consent=consent_request,
-            actor="user"
+            consent_scope=consent.scope,
+            user_identifier=hashlib.sha256(journey_id.encode()).hexdigest()[:16],
+            signature=consent.signature,
+            ttl_days=consent.ttl_days
         )
+        # The journey's artifacts are kept for as long as the consent lasts
+        await run_io(set_journey_retention, journey_id, consent.ttl_days, consent.granted_at)
         
-        return {"status": "consent_granted", "journey_id": journey_id}
+        return {"status": "consent_granted", "journey_id": journey_id, "consent_id": consent_id}
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/submit/{journey_id}/{step_id}")
-async def submit_form(journey_id: str, step_id: str):
-    """Submit a form for a specific journey step"""
+@app.get("/consent/summary")
+async def consent_summary():
+    """
+    Get consent counts for the caseworker dashboard
+    
+    Total, active and expired consents and consents per scope, kept up to
+    date as consents are granted and expire.
+    """
+    try:
+        return await run_io(get_consent_summary)
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/submit/{journey_id}/{step_id}", status_code=202, response_model=SubmissionJob)
+async def submit_form(journey_id: str, step_id: str, form_data: Optional[Dict[str, Any]] = Body(default=None)):
+    """
+    Queue a form submission for a specific journey step
+    
+    Returns 202 with the queued job straight away; poll
+    ``GET /submit/jobs/{job_id}`` for the receipt.
+    """
     try:
-        if journey_id not in journey_store:
+        if not await run_io(journey_repository.exists, journey_id):
             raise HTTPException(status_code=404, detail="Journey not found")
         
-        # Submit the form
-        submission = orchestrator.submit_form(journey_id, step_id)
+        job = await run_io(submission_jobs.store.enqueue, journey_id, step_id, form_data or {})
+        submission_jobs.notify()
         
-        return submission
+        return JSONResponse(
+            status_code=202,
+            content=job.model_dump(mode="json"),
+            headers={"Location": f"/submit/jobs/{job.job_id}"}
+        )
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/artifacts")
-async def list_journey_artifacts(journey_id: str = None):
-    """List artifacts for journeys"""
+@app.get("/submit/jobs/{job_id}", response_model=SubmissionJob)
+async def get_submission_job(job_id: str, wait: float = Query(default=0, ge=0, le=SUBMISSION_MAX_WAIT)):
+    """
+    Get a submission job and, once it has succeeded, its receipt
+    
+    Args:
+        job_id: Job id returned by POST /submit
+        wait: Seconds to long-poll for the job to finish before returning
+    """
     try:
-        if journey_id:
-            artifacts = list_artifacts(journey_id=journey_id)
+        if wait:
+            job = await submission_jobs.wait(job_id, wait)
         else:
-            artifacts = list_artifacts()
+            job = await run_io(submission_jobs.store.get, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Submission job not found")
+        
+        return job
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/artifacts")
+async def list_journey_artifacts(
+    journey_id: str = None,
+    type: str = None,
+    step_id: str = None,
+    cursor: str = None,
+    limit: int = Query(default=100, ge=1, le=1000)
+):
+    """
+    List artifact metadata from the artifact index
+    
+    Filter by journey, artifact type or step; pass ``next_cursor`` from the
+    response as ``cursor`` to get the next page.
+    """
+    try:
+        if cursor is not None and not cursor.isdigit():
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        
+        artifacts = await run_io(
+            list_artifacts,
+            journey_id=journey_id,
+            artifact_type=type,
+            step_id=step_id,
+            cursor=cursor,
+            limit=limit
+        )
         
         return artifacts
     
+    except HTTPException:
+        raise
+    
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/audit")
-async def get_audit_trail():
-    """Get the audit trail"""
+async def audit_trail(
+    journey_id: Optional[str] = None,
+    action: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: Optional[int] = Query(default=None, ge=1)
+):
+    """Get the audit trail, newest first, optionally for one journey, action or time range"""
     try:
-        audit_trail = get_audit_trail()
+        audit_trail = await run_io(get_audit_trail, journey_id, action, start, end, limit)
         return audit_trail
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/audit/verify")
+async def verify_audit_trail(start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """
+    Verify the audit log's hash chain and Merkle checkpoints
+    
+    With ``start``/``end`` only the checkpoint groups in that time range
+    are read; without them the whole log is checked.
+    """
+    try:
+        return await run_io(verify_audit_log, start, end)
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/stats")
-async def get_artifact_stats():
+async def artifact_stats():
     """Get artifact statistics"""
     try:
-        stats = get_artifact_stats()
+        stats = await run_io(get_artifact_stats)
         return stats
     
     except Exception as e:
@@ -214,7 +548,7 @@ async def ai_chat(request: Dict[str, Any]):
             raise HTTPException(status_code=400, detail="Message is required")
         
         # Use the Ollama AI to analyze the request
-        ai_response = ollama_ai.analyze_government_request(user_message)
+        ai_response = await ollama_ai.analyze_government_request_async(user_message)
         
         # Create a journey if one was identified
         journey_id = None
@@ -230,7 +564,7 @@ async def ai_chat(request: Dict[str, Any]):
             )
             
             # Store the journey
-            journey_store[journey_id] = journey
+            await run_io(journey_repository.save, journey)
             
             # Add journey info to response
             ai_response['journey_id'] = journey_id
@@ -253,11 +587,11 @@ async def ai_continue(request: Dict[str, Any]):
             raise HTTPException(status_code=400, detail="Message is required")
         
         # Generate AI response
-        ai_response = ollama_ai.generate_response(user_message)
+        ai_response = await ollama_ai.generate_response_async(user_message)
         
         # Add journey context if available
-        if journey_id and journey_id in journey_store:
-            journey = journey_store[journey_id]
+        journey = await run_io(journey_repository.get_journey, journey_id) if journey_id else None
+        if journey is not None:
             ai_response['journey_id'] = journey_id
             ai_response['current_journey'] = journey.dict()
         
@@ -294,14 +628,16 @@ async def cleanup_expired_data():
     """
     Clean up expired artifacts and data
     
-    This endpoint removes data that has exceeded its TTL.
+    Runs one bounded retention sweep now instead of waiting for the
+    background sweeper. ``more`` is true when expired journeys remain.
     """
     try:
-        cleanup_expired_artifacts(ttl_days=30)
+        result = await retention_sweeper.sweep()
         
         return {
             "status": "success",
             "message": "Cleanup completed",
+            **result,
             "timestamp": datetime.utcnow().isoformat()
         }
     
@@ -1,3 +1,4 @@
+import datetime as dt
 from datetime import datetime, date
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
@@ -23,6 +24,8 @@ class Person(BaseModel):
     email: Optional[str] = None
     phone: Optional[str] = None
     address: Optional[Address] = None
+    medicare_number: Optional[str] = None
+    medicare_irn: Optional[str] = None
 
 
 class Baby(BaseModel):
@@ -52,7 +55,8 @@ class Banking(BaseModel):
 
 class Disaster(BaseModel):
     type: Optional[str] = None
-    date: Optional[date] = None
+    # Qualified so the annotation isn't shadowed by the field name
+    date: Optional[dt.date] = None
     location: Optional[str] = None
     property_damage: Optional[str] = None
 
@@ -84,6 +88,9 @@ class JourneyStep(BaseModel):
     title: str
     status: str = Field(default="pending", description="pending, in_progress, completed, failed")
     artifacts: List[Artifact] = Field(default_factory=list)
+    depends_on: List[str] = Field(default_factory=list, description="Ids of steps that must complete first")
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
 
 
 class Journey(BaseModel):
@@ -124,6 +131,9 @@ class FormField(BaseModel):
 
 class FormSchema(BaseModel):
     id: str
+    step_id: Optional[str] = Field(default=None, description="Journey step this form completes")
+    jurisdiction: str = Field(default="AU", description="State code, or AU for national forms")
+    version: int = 1
     title: str
     description: str
     fields: List[FormField]
@@ -138,6 +148,21 @@ class PrefillResponse(BaseModel):
     review_text: str
 
 
+class JourneyPrefillResponse(BaseModel):
+    journey_id: str
+    prefills: Dict[str, PrefillResponse] = Field(description="Prefilled forms keyed by step id")
+    unavailable_steps: List[str] = Field(default_factory=list, description="Steps without a form schema")
+
+
+class BulkPrefillResponse(BaseModel):
+    batch_id: str
+    form_id: str
+    step_id: str
+    rows: int
+    incomplete_rows: int = Field(description="Rows missing at least one required field")
+    path: str = Field(description="Compressed JSONL file holding the prefilled rows")
+
+
 class ConsentRequest(BaseModel):
     journey_id: str
     consent: Consent
@@ -150,6 +175,24 @@ class SubmissionResponse(BaseModel):
     receipt_url: Optional[str] = None
 
 
+class SubmissionJob(BaseModel):
+    job_id: str
+    journey_id: str
+    step_id: str
+    status: str = Field(default="queued", description="queued, running, succeeded, failed")
+    attempts: int = 0
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    receipt: Optional[SubmissionResponse] = None
+    error: Optional[str] = None
+
+
+class JourneyExecutionResponse(BaseModel):
+    journey: Journey = Field(description="Journey with updated step status and timings")
+    submissions: Dict[str, SubmissionResponse] = Field(default_factory=dict, description="Submissions keyed by step id")
+    errors: Dict[str, str] = Field(default_factory=dict, description="Steps that failed or were blocked, keyed by step id")
+
+
 class IntakeResponse(BaseModel):
     journey_id: str
     plan: Journey
@@ -1,177 +1,183 @@
-import yaml
 import json
 import hashlib
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Tuple
 from pathlib import Path
 
 from .models import (
     Journey, JourneyStep, Intake, FormSchema, 
-    PrefillResponse, SubmissionResponse, Artifact
+    PrefillResponse, JourneyPrefillResponse, BulkPrefillResponse, SubmissionResponse, Artifact
 )
-from .utils.storage import save_artifact, get_vault_path
-from .utils.audit import log_event
+from .forms.bulk import BulkInput, bulk_prefill
+from .forms.journeys import JourneyTemplates, get_journey_templates
+from .forms.registry import FormRegistry, get_form_registry
+from .scheduler import execute_journey
+from .utils.storage import save_artifact, save_artifacts, get_vault_path
+from .utils.audit import log_event, log_events
+from .utils.concurrency import run_io
+
+
+class UnknownStepError(ValueError):
+    """No form schema exists for a journey step in the requested jurisdiction"""
 
 
 class JourneyOrchestrator:
     """Orchestrates the journey through life events with form automation"""
     
-    def __init__(self):
-        self.forms_dir = Path(__file__).parent / "forms"
+    def __init__(
+        self,
+        form_registry: Optional[FormRegistry] = None,
+        journey_templates: Optional[JourneyTemplates] = None
+    ):
+        self.form_registry = form_registry or get_form_registry()
+        self.journey_templates = journey_templates or get_journey_templates()
+        self.forms_dir = self.form_registry.forms_dir
         self.artifacts_dir = Path("_artifacts")
         self.artifacts_dir.mkdir(exist_ok=True)
     
     def plan_journey(self, intake: Intake, jurisdiction: str = "NSW") -> Journey:
         """Create a journey plan based on the life event type"""
-        journey_id = self._generate_journey_id(intake)
-        life_event = self._determine_life_event(intake)
-        
-        # Define journey steps based on life event and jurisdiction
-        if life_event == "baby_just_born":
-            steps = self._get_birth_journey_steps(jurisdiction)
-        elif life_event == "job_loss":
-            steps = self._get_unemployment_journey_steps(jurisdiction)
-        elif life_event == "disaster_recovery":
-            steps = self._get_disaster_journey_steps(jurisdiction)
-        elif life_event == "carer_support":
-            steps = self._get_carer_journey_steps(jurisdiction)
-        else:
-            # Default to birth journey for backward compatibility
-            steps = self._get_birth_journey_steps(jurisdiction)
-        
-        journey = Journey(
-            id=journey_id,
-            life_event=life_event,
-            jurisdiction=jurisdiction,
-            steps=steps
-        )
+        journey = self._build_journey(intake, jurisdiction)
         
         # Save intake to vault
-        self._save_intake_to_vault(journey_id, intake)
+        self._save_intake_to_vault(journey, intake)
         
         # Log journey creation
-        log_event(
-            actor="system",
-            action="journey_created",
-            why=f"New {life_event} journey initiated",
-            consent_id=None,
-            metadata={"journey_id": journey_id, "jurisdiction": jurisdiction, "life_event": life_event}
-        )
+        log_event(**self._journey_created_event(journey))
         
         return journey
     
-    def _determine_life_event(self, intake: Intake) -> str:
-        """Determine the life event type based on intake data"""
-        if intake.baby and intake.parent1:
-            return "baby_just_born"
-        elif intake.employment and intake.applicant:
-            return "job_loss"
-        elif intake.disaster and intake.applicant:
-            return "disaster_recovery"
-        elif intake.applicant and hasattr(intake, 'carer_info') and intake.carer_info:
-            return "carer_support"
-        else:
-            # Default to birth event for backward compatibility
-            return "baby_just_born"
-    
-    def _get_birth_journey_steps(self, jurisdiction: str) -> List[JourneyStep]:
-        """Get journey steps for birth of a baby"""
-        if jurisdiction == "NSW":
-            return [
-                JourneyStep(
-                    id="birth_reg",
-                    title="Birth Registration (NSW)",
-                    status="pending"
-                ),
-                JourneyStep(
-                    id="medicare_enrolment",
-                    title="Medicare Newborn Enrolment",
-                    status="pending"
-                )
-            ]
-        else:
-            return [
-                JourneyStep(
-                    id="birth_reg",
-                    title="Birth Registration",
-                    status="pending"
-                ),
-                JourneyStep(
-                    id="medicare_enrolment",
-                    title="Medicare Newborn Enrolment",
-                    status="pending"
-                )
-            ]
-    
-    def _get_unemployment_journey_steps(self, jurisdiction: str) -> List[JourneyStep]:
-        """Get journey steps for unemployment/job loss"""
-        return [
-            JourneyStep(
-                id="unemployment_centrelink",
-                title="Centrelink JobSeeker Payment",
-                status="pending"
-            ),
-            JourneyStep(
-                id="job_service_provider",
-                title="Job Service Provider Registration",
-                status="pending"
-            )
-        ]
+    def plan_journeys(self, intakes: List[Intake], jurisdiction: str = "NSW") -> List[Journey]:
+        """
+        Plan journeys for many intakes at once
+        
+        Intake vault writes and journey_created audit events are group-committed
+        rather than written one journey at a time.
+        """
+        journeys = [self._build_journey(intake, jurisdiction) for intake in intakes]
+        
+        save_artifacts(
+            self._intake_artifact(journey, intake)
+            for journey, intake in zip(journeys, intakes)
+        )
+        log_events([self._journey_created_event(journey) for journey in journeys])
+        
+        return journeys
     
-    def _get_disaster_journey_steps(self, jurisdiction: str) -> List[JourneyStep]:
-        """Get journey steps for disaster recovery"""
-        return [
-            JourneyStep(
-                id="emergency_disaster_payment",
-                title="Emergency Disaster Payment",
-                status="pending"
-            ),
-            JourneyStep(
-                id="emergency_housing_assistance",
-                title="Emergency Housing Assistance",
-                status="pending"
-            )
-        ]
+    def _build_journey(self, intake: Intake, jurisdiction: str) -> Journey:
+        """Build the journey plan without persisting anything"""
+        life_event, detected = self.journey_templates.detect(intake)
+        
+        return Journey(
+            id=self._generate_journey_id(intake, life_event, detected),
+            life_event=life_event,
+            jurisdiction=jurisdiction,
+            steps=self.journey_templates.steps(life_event, jurisdiction)
+        )
     
-    def _get_carer_journey_steps(self, jurisdiction: str) -> List[JourneyStep]:
-        """Get journey steps for carer support"""
-        return [
-            JourneyStep(
-                id="carer_payment",
-                title="Carer Payment Application",
-                status="pending"
-            ),
-            JourneyStep(
-                id="carer_allowance",
-                title="Carer Allowance Application",
-                status="pending"
-            )
-        ]
+    def _journey_created_event(self, journey: Journey) -> Dict[str, Any]:
+        return {
+            "actor": "system",
+            "action": "journey_created",
+            "why": f"New {journey.life_event} journey initiated",
+            "consent_id": None,
+            "metadata": {
+                "journey_id": journey.id,
+                "jurisdiction": journey.jurisdiction,
+                "life_event": journey.life_event
+            }
+        }
     
-    def prefill_form(self, journey_id: str, step_id: str, intake: Intake) -> PrefillResponse:
+    def prefill_form(self, journey_id: str, step_id: str, intake: Intake, jurisdiction: str = "NSW") -> PrefillResponse:
         """Prefill a form based on the step and intake data"""
-        # Load form schema
-        form_schema = self._load_form_schema(step_id)
+        # Load the form schema of the journey's jurisdiction
+        form_schema = self._load_form_schema(step_id, jurisdiction)
         
         # Map intake data to form fields
-        form_data = {}
-        for field in form_schema.fields:
-            value = self._get_value_from_path(intake, field.source)
-            if value is not None:
-                form_data[field.id] = value
-        
-        # Create review payload
-        review = {
-            "form_id": form_schema.id,
-            "step_id": step_id,
-            "fields": form_data,
-            "review_text": form_schema.review_text
-        }
+        (form_data,) = self.form_registry.compile([form_schema])(intake)
         
         # Save prefill artifact
+        save_artifact(*self._prefill_artifact(journey_id, step_id, form_data))
+        
+        return self._prefill_response(form_schema, step_id, form_data)
+    
+    def prefill_journey(self, journey: Journey, intake: Intake) -> JourneyPrefillResponse:
+        """
+        Prefill every step of a journey in one pass
+        
+        The journey's forms are compiled into one prefill function that reads
+        each intake source once and shares it between forms (e.g.
+        applicant.full_name), and all prefill artifacts are written as one
+        batch. Steps without a form schema are reported in ``unavailable_steps``.
+        """
+        schemas: List[FormSchema] = []
+        unavailable_steps: List[str] = []
+        
+        for step in journey.steps:
+            try:
+                schemas.append(self._load_form_schema(step.id, journey.jurisdiction))
+            except UnknownStepError:
+                unavailable_steps.append(step.id)
+        
+        forms = self.form_registry.compile(schemas)(intake) if schemas else ()
+        
+        prefills: Dict[str, PrefillResponse] = {}
+        artifacts = []
+        for form_schema, form_data in zip(schemas, forms):
+            prefills[form_schema.step_id] = self._prefill_response(form_schema, form_schema.step_id, form_data)
+            artifacts.append(self._prefill_artifact(journey.id, form_schema.step_id, form_data))
+        
+        save_artifacts(artifacts)
+        
+        return JourneyPrefillResponse(
+            journey_id=journey.id,
+            prefills=prefills,
+            unavailable_steps=unavailable_steps
+        )
+    
+    def bulk_prefill(
+        self,
+        step_id: str,
+        intakes: BulkInput,
+        jurisdiction: str = "NSW",
+        row_ids: Optional[List[Any]] = None
+    ) -> BulkPrefillResponse:
+        """
+        Prefill one form for a whole batch of applicants
+        
+        Rows are prefilled column by column and written to a single
+        compressed file rather than one prefill artifact per applicant.
+        """
+        form_schema = self._load_form_schema(step_id, jurisdiction)
+        result = bulk_prefill(form_schema, intakes, row_ids=row_ids)
+        
+        log_event(
+            actor="system",
+            action="bulk_prefill_completed",
+            why=f"Bulk prefill of {form_schema.id} for {result.rows} applicants",
+            consent_id=None,
+            metadata={
+                "batch_id": result.batch_id,
+                "step_id": step_id,
+                "rows": result.rows,
+                "incomplete_rows": result.incomplete_rows
+            }
+        )
+        
+        return BulkPrefillResponse(
+            batch_id=result.batch_id,
+            form_id=result.form_id,
+            step_id=step_id,
+            rows=result.rows,
+            incomplete_rows=result.incomplete_rows,
+            path=result.path
+        )
+    
+    def _prefill_artifact(self, journey_id: str, step_id: str, form_data: Dict[str, Any]) -> Tuple[str, Dict[str, Any], str]:
+        """Build the (path, data, type) triple for a prefill artifact"""
         prefill_artifact = Artifact(
             type="prefill",
-            path=f"vault/{journey_id}/prefill/{step_id}_prefill.json",
+            path=str(get_vault_path(journey_id) / "prefill" / f"{step_id}_prefill.json"),
             step_id=step_id
         )
         
@@ -182,11 +188,16 @@ class JourneyOrchestrator:
             "created_at": datetime.utcnow().isoformat()
         }
         
-        save_artifact(
-            prefill_artifact.path,
-            prefill_data,
-            "prefill"
-        )
+        return prefill_artifact.path, prefill_data, "prefill"
+    
+    def _prefill_response(self, form_schema: FormSchema, step_id: str, form_data: Dict[str, Any]) -> PrefillResponse:
+        # Create review payload
+        review = {
+            "form_id": form_schema.id,
+            "step_id": step_id,
+            "fields": form_data,
+            "review_text": form_schema.review_text
+        }
         
         return PrefillResponse(
             form_id=form_schema.id,
@@ -210,7 +221,7 @@ class JourneyOrchestrator:
         # Save submission artifact
         submission_artifact = Artifact(
             type="submission",
-            path=f"vault/{journey_id}/submissions/{step_id}_submission.json",
+            path=str(get_vault_path(journey_id) / "submissions" / f"{step_id}_submission.json"),
             step_id=step_id
         )
         
@@ -244,28 +255,11 @@ class JourneyOrchestrator:
         
         return submission_response
     
-    def _generate_journey_id(self, intake: Intake) -> str:
+    def _generate_journey_id(self, intake: Intake, life_event: str, detected: bool = True) -> str:
         """Generate a unique journey ID based on intake data and life event"""
-        life_event = self._determine_life_event(intake)
-        
-        if life_event == "baby_just_born" and intake.baby and intake.parent1:
-            # Create a hash from baby's DOB and parent names
-            hash_input = f"{intake.baby.dob}{intake.parent1.full_name}"
-            if intake.parent2:
-                hash_input += intake.parent2.full_name
-        elif life_event == "job_loss" and intake.applicant:
-            # Create a hash from applicant's DOB and name
-            hash_input = f"{intake.applicant.dob}{intake.applicant.full_name}"
-            if intake.employment and intake.employment.last_work_date:
-                hash_input += str(intake.employment.last_work_date)
-        elif life_event == "disaster_recovery" and intake.applicant:
-            # Create a hash from applicant's DOB and disaster details
-            hash_input = f"{intake.applicant.dob}{intake.applicant.full_name}"
-            if intake.disaster and intake.disaster.date:
-                hash_input += str(intake.disaster.date)
-        elif life_event == "carer_support" and intake.applicant:
-            # Create a hash from applicant's DOB and name
-            hash_input = f"{intake.applicant.dob}{intake.applicant.full_name}"
+        if detected:
+            # Hash the life event's identifying fields (e.g. baby's DOB and parent names)
+            hash_input = self.journey_templates.journey_id_input(intake, life_event)
         else:
             # Fallback hash from timestamp and random data
             hash_input = f"{datetime.utcnow().isoformat()}{life_event}"
@@ -273,139 +267,69 @@ class JourneyOrchestrator:
         hash_obj = hashlib.sha256(hash_input.encode())
         return f"journey_{hash_obj.hexdigest()[:12]}"
     
+    async def execute_journey(
+        self,
+        journey: Journey,
+        intake: Intake,
+        max_concurrency: Optional[int] = None,
+        submit_form: Optional[Callable[[str, str, Dict[str, Any]], Awaitable[SubmissionResponse]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Prefill and submit every incomplete step of a journey
+        
+        All forms are prefilled in one pass, then steps are submitted as a
+        dependency graph: independent steps are submitted concurrently and a
+        step waits only for its ``depends_on`` steps. Step status and timings
+        are updated on ``journey`` in place.
+        
+        ``submit_form(journey_id, step_id, form_data)`` performs a submission,
+        such as a job on the submission queue; by default ``submit_form`` runs
+        inline on the I/O pool.
+        
+        Returns:
+            Mapping of step id to its SubmissionResponse, or to the exception
+            that stopped it
+        """
+        prefills = (await run_io(self.prefill_journey, journey, intake)).prefills
+        
+        async def submit(step: JourneyStep) -> SubmissionResponse:
+            if step.id not in prefills:
+                raise UnknownStepError(f"Unknown step_id: {step.id}")
+            if submit_form is not None:
+                return await submit_form(journey.id, step.id, prefills[step.id].data)
+            return await run_io(self.submit_form, journey.id, step.id, prefills[step.id].data)
+        
+        return await execute_journey(journey, submit, max_concurrency)
+    
     def _generate_reference(self, step_id: str, journey_id: str) -> str:
         """Generate a reference number for form submission"""
         timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
         hash_obj = hashlib.sha256(f"{step_id}{journey_id}{timestamp}".encode())
         return f"{step_id.upper()[:2]}-{hash_obj.hexdigest()[:8]}"
     
-    def _save_intake_to_vault(self, journey_id: str, intake: Intake):
+    def _save_intake_to_vault(self, journey: Journey, intake: Intake):
         """Save intake data to the vault directory"""
-        vault_path = get_vault_path(journey_id)
+        save_artifact(*self._intake_artifact(journey, intake))
+    
+    def _intake_artifact(self, journey: Journey, intake: Intake) -> Tuple[str, Dict[str, Any], str]:
+        """Build the (path, data, type) triple for an intake artifact"""
+        vault_path = get_vault_path(journey.id)
         intake_path = vault_path / "intake" / "intake.json"
-        intake_path.parent.mkdir(parents=True, exist_ok=True)
         
         # Convert to dict for JSON serialization
         intake_dict = intake.dict()
         intake_dict["created_at"] = datetime.utcnow().isoformat()
+        # Lets the artifact index break stats down by life event
+        intake_dict["journey_id"] = journey.id
+        intake_dict["life_event"] = journey.life_event
         
-        save_artifact(
-            str(intake_path),
-            intake_dict,
-            "intake"
-        )
+        return str(intake_path), intake_dict, "intake"
     
-    def _load_form_schema(self, step_id: str) -> FormSchema:
-        """Load form schema from YAML file"""
-        form_file = self.forms_dir / f"{step_id}.yml"
+    def _load_form_schema(self, step_id: str, jurisdiction: str = "NSW") -> FormSchema:
+        """Look up the form schema for a step in the form registry"""
+        form_schema = self.form_registry.get(step_id, jurisdiction)
         
-        if not form_file.exists():
-            # Fallback to default schema
-            return self._get_default_schema(step_id)
+        if form_schema is None:
+            raise UnknownStepError(f"Unknown step_id: {step_id}")
         
-        with open(form_file, 'r') as f:
-            form_data = yaml.safe_load(f)
-        
-        return FormSchema(**form_data)
-    
-    def _get_default_schema(self, step_id: str) -> FormSchema:
-        """Get default form schema if YAML file doesn't exist"""
-        if step_id == "birth_reg":
-            return FormSchema(
-                id="birth_registry_nsw",
-                title="Birth Registration (NSW)",
-                description="Register the birth of your baby with NSW Registry of Births, Deaths and Marriages",
-                fields=[
-                    {"id": "parent1_full_name", "label": "Parent 1 Full Name", "required": True, "source": "parent1.full_name"},
-                    {"id": "parent1_dob", "label": "Parent 1 Date of Birth", "required": True, "source": "parent1.dob"},
-                    {"id": "baby_name", "label": "Baby's Name", "required": False, "source": "baby.name"},
-                    {"id": "baby_dob", "label": "Baby's Date of Birth", "required": True, "source": "baby.dob"},
-                    {"id": "place_of_birth", "label": "Place of Birth", "required": False, "source": "baby.place_of_birth"}
-                ],
-                review_text="Please review the birth registration details above. All required fields have been completed based on your intake information.",
-                receipt_expected=True
-            )
-        elif step_id == "medicare_enrolment":
-            return FormSchema(
-                id="medicare_newborn",
-                title="Medicare Newborn Enrolment",
-                description="Enrol your newborn baby for Medicare coverage",
-                fields=[
-                    {"id": "parent1_full_name", "label": "Parent 1 Full Name", "required": True, "source": "parent1.full_name"},
-                    {"id": "baby_name", "label": "Baby's Name", "required": False, "source": "baby.name"},
-                    {"id": "baby_dob", "label": "Baby's Date of Birth", "required": True, "source": "baby.dob"}
-                ],
-                review_text="Please review the Medicare enrolment details above. All required fields have been completed based on your intake information.",
-                receipt_expected=True
-            )
-        elif step_id == "unemployment_centrelink":
-            return FormSchema(
-                id="unemployment_centrelink",
-                title="Centrelink JobSeeker Payment",
-                description="Apply for unemployment benefits through Centrelink",
-                fields=[
-                    {"id": "applicant_full_name", "label": "Full Name", "required": True, "source": "applicant.full_name"},
-                    {"id": "applicant_dob", "label": "Date of Birth", "required": True, "source": "applicant.dob"},
-                    {"id": "last_employer", "label": "Last Employer Name", "required": False, "source": "employment.last_employer"},
-                    {"id": "last_work_date", "label": "Last Day of Work", "required": False, "source": "employment.last_work_date"}
-                ],
-                review_text="Please review your JobSeeker Payment application details above. All required fields have been completed based on your intake information.",
-                receipt_expected=True
-            )
-        elif step_id == "job_service_provider":
-            return FormSchema(
-                id="job_service_provider",
-                title="Job Service Provider Registration",
-                description="Register with a job service provider for employment assistance",
-                fields=[
-                    {"id": "applicant_full_name", "label": "Full Name", "required": True, "source": "applicant.full_name"},
-                    {"id": "applicant_dob", "label": "Date of Birth", "required": True, "source": "applicant.dob"},
-                    {"id": "skills_assessment", "label": "Skills Assessment Required", "required": False, "source": "employment.skills_assessment"}
-                ],
-                review_text="Please review your Job Service Provider registration details above. All required fields have been completed based on your intake information.",
-                receipt_expected=True
-            )
-        elif step_id == "emergency_disaster_payment":
-            return FormSchema(
-                id="emergency_disaster_payment",
-                title="Emergency Disaster Payment",
-                description="Apply for emergency financial assistance after a disaster",
-                fields=[
-                    {"id": "applicant_full_name", "label": "Full Name", "required": True, "source": "applicant.full_name"},
-                    {"id": "applicant_dob", "label": "Date of Birth", "required": True, "source": "applicant.dob"},
-                    {"id": "disaster_type", "label": "Type of Disaster", "required": False, "source": "disaster.type"},
-                    {"id": "disaster_date", "label": "Date of Disaster", "required": False, "source": "disaster.date"}
-                ],
-                review_text="Please review your Emergency Disaster Payment application details above. All required fields have been completed based on your intake information.",
-                receipt_expected=True
-            )
-        elif step_id == "emergency_housing_assistance":
-            return FormSchema(
-                id="emergency_housing_assistance",
-                title="Emergency Housing Assistance",
-                description="Apply for emergency housing support after a disaster",
-                fields=[
-                    {"id": "applicant_full_name", "label": "Full Name", "required": True, "source": "applicant.full_name"},
-                    {"id": "applicant_dob", "label": "Date of Birth", "required": True, "source": "applicant.dob"},
-                    {"id": "disaster_type", "label": "Type of Disaster", "required": False, "source": "disaster.type"},
-                    {"id": "housing_status", "label": "Current Housing Status", "required": False, "source": "housing.status"}
-                ],
-                review_text="Please review your Emergency Housing Assistance application details above. All required fields have been completed based on your intake information.",
-                receipt_expected=True
-            )
-        else:
-            raise ValueError(f"Unknown step_id: {step_id}")
-    
-    def _get_value_from_path(self, obj: Any, path: str) -> Any:
-        """Get value from object using dotted path notation"""
-        try:
-            for key in path.split('.'):
-                if hasattr(obj, key):
-                    obj = getattr(obj, key)
-                elif isinstance(obj, dict):
-                    obj = obj[key]
-                else:
-                    return None
-            return obj
-        except (AttributeError, KeyError, TypeError):
-            return None
+        return form_schema
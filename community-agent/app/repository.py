@@ -0,0 +1,226 @@
+"""
+Journey persistence
+
+Journeys and their intakes used to live in module-level dicts inside
+``app/main.py``. This module provides a pluggable ``JourneyRepository`` so the
+API can run several uvicorn workers against the same store and survive
+restarts without losing journeys.
+"""
+
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .models import Intake, Journey
+from .utils.sqlite import ThreadLocalSQLite
+
+
+class JourneyRepository(ABC):
+    """Interface for journey and intake storage"""
+
+    def save(self, journey: Journey, intake: Optional[Intake] = None) -> None:
+        """Insert or update a journey (and optionally its intake)"""
+        self.save_many([(journey, intake)])
+
+    @abstractmethod
+    def save_many(self, items: Iterable[Tuple[Journey, Optional[Intake]]]) -> None:
+        """Insert or update several journeys in one operation"""
+
+    @abstractmethod
+    def get_journey(self, journey_id: str) -> Optional[Journey]:
+        """Return the journey for ``journey_id`` or None"""
+
+    @abstractmethod
+    def get_intake(self, journey_id: str) -> Optional[Intake]:
+        """Return the intake recorded for ``journey_id`` or None"""
+
+    def exists(self, journey_id: str) -> bool:
+        """Check whether a journey is stored"""
+        return self.get_journey(journey_id) is not None
+
+    @abstractmethod
+    def list_by_life_event(self, life_event: str, limit: int = 100) -> List[Journey]:
+        """Return the most recent journeys for a life event"""
+
+    @abstractmethod
+    def delete(self, journey_id: str) -> None:
+        """Remove a journey and its intake"""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of stored journeys"""
+
+
+class InMemoryJourneyRepository(JourneyRepository):
+    """
+    Process-local repository, useful for demos and tests
+
+    Journeys and intakes are copied in and out, so like the SQLite
+    repository a change is only stored when it is saved.
+    """
+
+    def __init__(self):
+        self._journeys: Dict[str, Journey] = {}
+        self._intakes: Dict[str, Intake] = {}
+        self._lock = threading.Lock()
+
+    def save_many(self, items: Iterable[Tuple[Journey, Optional[Intake]]]) -> None:
+        with self._lock:
+            for journey, intake in items:
+                self._journeys[journey.id] = journey.model_copy(deep=True)
+                if intake is not None:
+                    self._intakes[journey.id] = intake.model_copy(deep=True)
+
+    def get_journey(self, journey_id: str) -> Optional[Journey]:
+        journey = self._journeys.get(journey_id)
+        return journey.model_copy(deep=True) if journey else None
+
+    def get_intake(self, journey_id: str) -> Optional[Intake]:
+        intake = self._intakes.get(journey_id)
+        return intake.model_copy(deep=True) if intake else None
+
+    def exists(self, journey_id: str) -> bool:
+        return journey_id in self._journeys
+
+    def list_by_life_event(self, life_event: str, limit: int = 100) -> List[Journey]:
+        journeys = [j for j in self._journeys.values() if j.life_event == life_event]
+        journeys.sort(key=lambda j: j.created_at, reverse=True)
+        return [journey.model_copy(deep=True) for journey in journeys[:limit]]
+
+    def delete(self, journey_id: str) -> None:
+        with self._lock:
+            self._journeys.pop(journey_id, None)
+            self._intakes.pop(journey_id, None)
+
+    def count(self) -> int:
+        return len(self._journeys)
+
+
+class SQLiteJourneyRepository(JourneyRepository):
+    """
+    SQLite-backed repository in WAL mode
+
+    WAL lets any number of worker processes read while one writes, so several
+    uvicorn workers on the same box can share a single database file.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS journeys (
+            journey_id   TEXT PRIMARY KEY,
+            life_event   TEXT NOT NULL,
+            jurisdiction TEXT NOT NULL,
+            journey      TEXT NOT NULL,
+            intake       TEXT,
+            created_at   TEXT NOT NULL,
+            updated_at   TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_journeys_life_event
+            ON journeys (life_event, created_at);
+    """
+
+    def __init__(self, db_path: str, busy_timeout_ms: int = 5000):
+        self.db = ThreadLocalSQLite(db_path, busy_timeout_ms)
+        self.db_path = self.db.db_path
+
+        conn = self._connection()
+        conn.executescript(self.SCHEMA)
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        return self.db.connection()
+
+    def save_many(self, items: Iterable[Tuple[Journey, Optional[Intake]]]) -> None:
+        now = datetime.utcnow().isoformat()
+        rows = [
+            (
+                journey.id,
+                journey.life_event,
+                journey.jurisdiction,
+                journey.model_dump_json(),
+                intake.model_dump_json() if intake is not None else None,
+                journey.created_at.isoformat(),
+                now,
+            )
+            for journey, intake in items
+        ]
+        if not rows:
+            return
+
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                """
+                INSERT INTO journeys
+                    (journey_id, life_event, jurisdiction, journey, intake, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (journey_id) DO UPDATE SET
+                    life_event   = excluded.life_event,
+                    jurisdiction = excluded.jurisdiction,
+                    journey      = excluded.journey,
+                    intake       = COALESCE(excluded.intake, journeys.intake),
+                    updated_at   = excluded.updated_at
+                """,
+                rows,
+            )
+
+    def get_journey(self, journey_id: str) -> Optional[Journey]:
+        row = self._connection().execute(
+            "SELECT journey FROM journeys WHERE journey_id = ?", (journey_id,)
+        ).fetchone()
+        return Journey.model_validate_json(row[0]) if row else None
+
+    def get_intake(self, journey_id: str) -> Optional[Intake]:
+        row = self._connection().execute(
+            "SELECT intake FROM journeys WHERE journey_id = ?", (journey_id,)
+        ).fetchone()
+        if not row or row[0] is None:
+            return None
+        return Intake.model_validate_json(row[0])
+
+    def exists(self, journey_id: str) -> bool:
+        row = self._connection().execute(
+            "SELECT 1 FROM journeys WHERE journey_id = ?", (journey_id,)
+        ).fetchone()
+        return row is not None
+
+    def list_by_life_event(self, life_event: str, limit: int = 100) -> List[Journey]:
+        rows = self._connection().execute(
+            """
+            SELECT journey FROM journeys
+            WHERE life_event = ?
+            ORDER BY created_at DESC
+            LIMIT ?
+            """,
+            (life_event, limit),
+        ).fetchall()
+        return [Journey.model_validate_json(row[0]) for row in rows]
+
+    def delete(self, journey_id: str) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM journeys WHERE journey_id = ?", (journey_id,))
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM journeys").fetchone()[0]
+
+
+def get_journey_repository() -> JourneyRepository:
+    """
+    Build the repository configured by the environment
+
+    JOURNEY_STORE selects the backend (``sqlite`` by default, or ``memory``)
+    and JOURNEY_DB_PATH the SQLite file.
+    """
+    backend = os.getenv("JOURNEY_STORE", "sqlite").lower()
+
+    if backend == "memory":
+        return InMemoryJourneyRepository()
+    if backend == "sqlite":
+        db_path = os.getenv("JOURNEY_DB_PATH", str(Path("_artifacts") / "journeys.db"))
+        return SQLiteJourneyRepository(db_path)
+
+    raise ValueError(f"Unknown JOURNEY_STORE backend: {backend}")
@@ -0,0 +1,130 @@
+"""
+Retention sweeper
+
+``POST /cleanup`` used to list every journey directory and parse each
+``intake/intake.json`` for its ``created_at``, inline in the request. Journey
+expiry now lives in the artifact index (``journey_expiry``, ordered by
+expiry time and set from consent ``ttl_days``), and this sweeper removes
+expired journeys in the background in bounded batches, each batch on the I/O
+pool, so sweeping never holds up request handling. With the pack backend a
+sweep also compacts the segments the removed journeys left mostly dead, and
+every complete sweep deletes the blobs no remaining artifact refers to and
+the audit log segments past ``AUDIT_RETENTION_DAYS``.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+from .utils.concurrency import run_io
+from .utils import storage
+from .utils.audit_chain import drop_audit_segments
+from .utils.storage import cleanup_expired_artifacts, collect_blobs, compact_packs
+
+logger = logging.getLogger(__name__)
+
+# Seconds between sweeps; 0 disables the background sweeper
+RETENTION_SWEEP_SECONDS = float(os.getenv("RETENTION_SWEEP_SECONDS", "3600"))
+RETENTION_SWEEP_BATCH = int(os.getenv("RETENTION_SWEEP_BATCH", "100"))
+# Batches per sweep; whatever is left waits for the next sweep
+RETENTION_SWEEP_MAX_BATCHES = int(os.getenv("RETENTION_SWEEP_MAX_BATCHES", "10"))
+
+
+class RetentionSweeper:
+    """
+    Periodically delete journeys whose retention has ended
+
+    ``on_expired`` is a blocking callable run on the I/O pool with each
+    batch of removed journey IDs, to drop records kept outside the vault
+    (the journey repository).
+    """
+
+    def __init__(
+        self,
+        on_expired: Optional[Callable[[List[str]], None]] = None,
+        interval: float = RETENTION_SWEEP_SECONDS,
+        batch_size: int = RETENTION_SWEEP_BATCH,
+        max_batches: int = RETENTION_SWEEP_MAX_BATCHES
+    ):
+        self.on_expired = on_expired
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+
+        self._task: Optional[asyncio.Task] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    def start(self):
+        """Start sweeping on the running event loop; the first sweep runs after one interval"""
+        if self._task is not None or self.interval <= 0:
+            return
+        self._stop = asyncio.Event()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Stop the sweeper, letting the batch in progress finish"""
+        if self._task is None:
+            return
+        self._stop.set()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def sweep(self) -> Dict[str, Any]:
+        """
+        Remove up to ``max_batches`` batches of expired journeys
+
+        Returns:
+            Number of journeys removed and whether expired journeys remain
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # One sweep at a time per process; a /cleanup during a background
+        # sweep waits for it rather than racing it for the same journeys
+        async with self._lock:
+            removed = 0
+            for _ in range(self.max_batches):
+                journey_ids = await run_io(cleanup_expired_artifacts, self.batch_size)
+                if journey_ids and self.on_expired is not None:
+                    await run_io(self.on_expired, journey_ids)
+                removed += len(journey_ids)
+                if len(journey_ids) < self.batch_size:
+                    break
+            else:
+                return {"removed_journeys": removed, "more": True}
+
+            if storage.ARTIFACT_BACKEND == "pack":
+                compacted = await run_io(compact_packs)
+                if compacted["compacted_segments"]:
+                    logger.info(
+                        "Compacted %d pack segments, reclaiming %d bytes",
+                        compacted["compacted_segments"], compacted["reclaimed_bytes"]
+                    )
+            collected = await run_io(collect_blobs)
+            if collected["removed_blobs"]:
+                logger.info(
+                    "Deleted %d unreferenced blobs, reclaiming %d bytes",
+                    collected["removed_blobs"], collected["reclaimed_bytes"]
+                )
+            dropped = await run_io(drop_audit_segments)
+            if dropped["dropped_segments"]:
+                logger.info(
+                    "Dropped %d audit log segments, reclaiming %d bytes",
+                    dropped["dropped_segments"], dropped["reclaimed_bytes"]
+                )
+            return {"removed_journeys": removed, "more": False}
+
+    async def _loop(self):
+        while not self._stop.is_set():
+            try:
+                await asyncio.wait_for(self._stop.wait(), self.interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                result = await self.sweep()
+                if result["removed_journeys"]:
+                    logger.info("Retention sweep removed %d journeys", result["removed_journeys"])
+            except Exception:
+                logger.exception("Retention sweep failed")
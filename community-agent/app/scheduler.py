@@ -0,0 +1,121 @@
+"""
+Journey step scheduler
+
+Runs the steps of a journey as a dependency graph instead of a list. Each
+step waits only for the steps named in its ``depends_on``, so independent
+steps (birth registration and Medicare enrolment, disaster payment and
+housing assistance) run concurrently and a journey takes as long as its
+longest dependency chain rather than the sum of its steps.
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from .models import Journey, JourneyStep
+
+
+class StepDependencyError(Exception):
+    """A step was not run because a step it depends on did not complete"""
+
+
+def topological_order(steps: Sequence[JourneyStep]) -> List[JourneyStep]:
+    """
+    Order steps so every step comes after the steps it depends on
+
+    Steps keep their declared order wherever dependencies allow it.
+
+    Raises:
+        ValueError: If a step depends on an unknown step or the steps form a cycle
+    """
+    by_id = {step.id: step for step in steps}
+    for step in steps:
+        for dependency in step.depends_on:
+            if dependency not in by_id:
+                raise ValueError(f"Step {step.id} depends on unknown step {dependency}")
+
+    ordered: List[JourneyStep] = []
+    placed = set()
+    remaining = list(steps)
+    while remaining:
+        ready = [step for step in remaining if all(d in placed for d in step.depends_on)]
+        if not ready:
+            raise ValueError(f"Dependency cycle between steps: {', '.join(step.id for step in remaining)}")
+        for step in ready:
+            ordered.append(step)
+            placed.add(step.id)
+        remaining = [step for step in remaining if step.id not in placed]
+    return ordered
+
+
+def ready_steps(journey: Journey) -> List[JourneyStep]:
+    """Pending steps whose dependencies have all completed"""
+    completed = {step.id for step in journey.steps if step.status == "completed"}
+    return [
+        step for step in topological_order(journey.steps)
+        if step.status != "completed" and all(d in completed for d in step.depends_on)
+    ]
+
+
+async def execute_journey(
+    journey: Journey,
+    run_step: Callable[[JourneyStep], Awaitable[Any]],
+    max_concurrency: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Run every incomplete step of a journey, concurrently where dependencies allow
+
+    Each step is marked ``in_progress`` with ``started_at`` set when it starts,
+    then ``completed`` or ``failed`` with ``finished_at`` set. Steps that are
+    already completed are not run again. A step whose dependency fails stays
+    ``pending``.
+
+    Args:
+        journey: Journey whose steps are updated in place
+        run_step: Coroutine function that performs one step
+        max_concurrency: Optional cap on steps running at the same time
+
+    Returns:
+        Mapping of step id to the step's result, or to the exception it raised
+        (StepDependencyError for steps that were never started)
+    """
+    semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def run(step: JourneyStep) -> Any:
+        # Dependencies completed before this run have no task
+        dependencies = [d for d in step.depends_on if d in tasks]
+        if dependencies:
+            outcomes = await asyncio.gather(*(tasks[d] for d in dependencies), return_exceptions=True)
+            failed = [d for d, outcome in zip(dependencies, outcomes) if isinstance(outcome, BaseException)]
+            if failed:
+                raise StepDependencyError(f"Step {step.id} is blocked by {', '.join(failed)}")
+
+        if semaphore is not None:
+            async with semaphore:
+                return await _run_timed(step, run_step)
+        return await _run_timed(step, run_step)
+
+    # Topological order guarantees a step's dependencies have tasks before it does
+    for step in topological_order(journey.steps):
+        if step.status != "completed":
+            tasks[step.id] = asyncio.create_task(run(step))
+
+    outcomes = await asyncio.gather(*tasks.values(), return_exceptions=True)
+    return dict(zip(tasks.keys(), outcomes))
+
+
+async def _run_timed(step: JourneyStep, run_step: Callable[[JourneyStep], Awaitable[Any]]) -> Any:
+    step.status = "in_progress"
+    step.started_at = datetime.utcnow()
+    step.finished_at = None
+    try:
+        result = await run_step(step)
+    except Exception:
+        step.status = "failed"
+        raise
+    else:
+        step.status = "completed"
+        return result
+    finally:
+        step.finished_at = datetime.utcnow()
@@ -2,6 +2,7 @@
 class CommunityAssistant {
   constructor() {
     this.currentJourney = null;
+    this.journeyPrefills = null;
     this.currentStep = 0;
     this.apiBase = "http://localhost:8000";
     this.conversationHistory = [];
@@ -65,6 +66,7 @@ class CommunityAssistant {
       // Handle journey creation if present
       if (response.journey_id) {
         this.currentJourney = response;
+        this.journeyPrefills = null;
         this.showJourneyProgress(response);
       }
 
@@ -319,17 +321,24 @@ class CommunityAssistant {
     if (!this.currentJourney) return;
 
     try {
-      // Prefill the form for this step
-      const prefillResponse = await fetch(
-        `${this.apiBase}/prefill/${this.currentJourney.journey_id}/${stepId}`,
-        { method: "POST" }
-      );
+      // Prefill every step of the journey once, then reuse the results
+      if (!this.journeyPrefills) {
+        const prefillResponse = await fetch(
+          `${this.apiBase}/prefill/${this.currentJourney.journey_id}`,
+          { method: "POST" }
+        );
+
+        if (!prefillResponse.ok) {
+          throw new Error(`HTTP error! status: ${prefillResponse.status}`);
+        }
 
-      if (!prefillResponse.ok) {
-        throw new Error(`HTTP error! status: ${prefillResponse.status}`);
+        this.journeyPrefills = (await prefillResponse.json()).prefills;
       }
 
-      const prefillData = await prefillResponse.json();
+      const prefillData = this.journeyPrefills[stepId];
+      if (!prefillData) {
+        throw new Error(`No form available for step ${stepId}`);
+      }
 
       // Show the form for review
       this.showStepForm(stepId, prefillData);
@@ -439,7 +448,7 @@ class CommunityAssistant {
     try {
       const currentStep = this.currentJourney.plan.steps[this.currentStep];
 
-      // Submit the form
+      // Queue the submission, then long-poll the job for its receipt
       const submitResponse = await fetch(
         `${this.apiBase}/submit/${this.currentJourney.journey_id}/${currentStep.id}`,
         { method: "POST" }
@@ -449,7 +458,7 @@ class CommunityAssistant {
         throw new Error(`HTTP error! status: ${submitResponse.status}`);
       }
 
-      const submitData = await submitResponse.json();
+      const submitData = await this.waitForSubmission(await submitResponse.json());
 
       // Mark step as completed
       currentStep.status = "completed";
@@ -482,6 +491,23 @@ class CommunityAssistant {
     }
   }
 
+  async waitForSubmission(job) {
+    while (job.status === "queued" || job.status === "running") {
+      const jobResponse = await fetch(
+        `${this.apiBase}/submit/jobs/${job.job_id}?wait=30`
+      );
+      if (!jobResponse.ok) {
+        throw new Error(`HTTP error! status: ${jobResponse.status}`);
+      }
+      job = await jobResponse.json();
+    }
+
+    if (job.status !== "succeeded") {
+      throw new Error(`Submission failed: ${job.error}`);
+    }
+    return job.receipt;
+  }
+
   updateJourneyProgress() {
     const stepsContainer = document.getElementById("journey-steps");
     stepsContainer.innerHTML = this.currentJourney.plan.steps
@@ -531,6 +557,7 @@ class CommunityAssistant {
   startNewChat() {
     // Reset everything
     this.currentJourney = null;
+    this.journeyPrefills = null;
     this.currentStep = 0;
     this.conversationHistory = [];
 
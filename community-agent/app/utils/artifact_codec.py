@@ -0,0 +1,131 @@
+"""
+Artifact encoding
+
+Artifacts used to be written as ``json.dump(..., indent=2)``. They are now
+encoded by an ``ArtifactCodec``: compact JSON (or MessagePack, if installed)
+and, above a size threshold, gzip or lzma compression.
+
+Plain JSON is written as-is so small artifacts stay readable. Anything else
+starts with a 6 byte header, ``MAGIC`` followed by one format byte and one
+compression byte, so ``decode`` reads every format, including artifacts
+written before this module, without being told how they were written.
+"""
+
+import gzip
+import json
+import lzma
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import msgpack
+except ImportError:  # optional: only needed for ARTIFACT_FORMAT=msgpack
+    msgpack = None
+
+MAGIC = b"\x00ART"
+
+FORMATS: Dict[str, int] = {"json": 1, "msgpack": 2}
+COMPRESSIONS: Dict[str, int] = {"none": 0, "gzip": 1, "lzma": 2}
+
+ARTIFACT_FORMAT = os.getenv("ARTIFACT_FORMAT", "json")
+ARTIFACT_COMPRESSION = os.getenv("ARTIFACT_COMPRESSION", "gzip")
+# Artifacts smaller than this are not worth compressing
+ARTIFACT_COMPRESS_MIN_BYTES = int(os.getenv("ARTIFACT_COMPRESS_MIN_BYTES", "1024"))
+
+
+@dataclass(frozen=True)
+class ArtifactCodec:
+    """
+    How artifacts are serialised and compressed
+
+    Raises:
+        ValueError: If the format or compression is unknown, or msgpack is
+            requested but not installed
+    """
+
+    format: str = "json"
+    compression: str = "none"
+    compress_min_bytes: int = ARTIFACT_COMPRESS_MIN_BYTES
+
+    def __post_init__(self):
+        if self.format not in FORMATS:
+            raise ValueError(f"Unknown artifact format: {self.format}")
+        if self.compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown artifact compression: {self.compression}")
+        if self.format == "msgpack" and msgpack is None:
+            raise ValueError("Artifact format msgpack requires the msgpack package")
+
+    @property
+    def name(self) -> str:
+        return self.format if self.compression == "none" else f"{self.format}+{self.compression}"
+
+    def encode(self, obj: Any) -> bytes:
+        """Serialise an artifact, compressing it if it reaches ``compress_min_bytes``"""
+        if self.format == "msgpack":
+            payload = msgpack.packb(obj, default=str)
+        else:
+            payload = json.dumps(obj, separators=(",", ":"), default=str).encode()
+
+        compression = self.compression if len(payload) >= self.compress_min_bytes else "none"
+        if compression == "gzip":
+            payload = gzip.compress(payload, compresslevel=6, mtime=0)
+        elif compression == "lzma":
+            payload = lzma.compress(payload)
+
+        if self.format == "json" and compression == "none":
+            return payload
+        return MAGIC + bytes((FORMATS[self.format], COMPRESSIONS[compression])) + payload
+
+
+def describe(raw: bytes) -> Tuple[str, str]:
+    """Return the (format, compression) an encoded artifact was written with"""
+    if not raw.startswith(MAGIC):
+        return "json", "none"
+    formats = {value: key for key, value in FORMATS.items()}
+    compressions = {value: key for key, value in COMPRESSIONS.items()}
+    try:
+        return formats[raw[len(MAGIC)]], compressions[raw[len(MAGIC) + 1]]
+    except (IndexError, KeyError):
+        raise ValueError("Unknown artifact header") from None
+
+
+def decode(raw: bytes) -> Any:
+    """
+    Decode an artifact written by any codec
+
+    Raises:
+        ValueError: If the header is unknown or the payload cannot be decoded
+    """
+    return decode_sized(raw)[0]
+
+
+def decode_sized(raw: bytes) -> Tuple[Any, int]:
+    """Decode an artifact and also return its uncompressed size in bytes"""
+    artifact_format, compression = describe(raw)
+    payload = raw[len(MAGIC) + 2:] if raw.startswith(MAGIC) else raw
+
+    try:
+        if compression == "gzip":
+            payload = gzip.decompress(payload)
+        elif compression == "lzma":
+            payload = lzma.decompress(payload)
+    except (OSError, EOFError, lzma.LZMAError) as e:
+        raise ValueError(f"Corrupt {compression} artifact: {e}") from e
+
+    if artifact_format == "msgpack":
+        if msgpack is None:
+            raise ValueError("Artifact is msgpack-encoded but the msgpack package is not installed")
+        return msgpack.unpackb(payload), len(payload)
+    return json.loads(payload), len(payload)
+
+
+_default_codec: Optional[ArtifactCodec] = None
+
+
+def get_artifact_codec() -> ArtifactCodec:
+    """Get the codec new artifacts are written with (ARTIFACT_FORMAT / ARTIFACT_COMPRESSION)"""
+    global _default_codec
+    if _default_codec is None:
+        _default_codec = ArtifactCodec(ARTIFACT_FORMAT, ARTIFACT_COMPRESSION)
+    return _default_codec
@@ -1,8 +1,14 @@
-import json
 import hashlib
-from datetime import datetime, timedelta
-from pathlib import Path
-from typing import Any, Dict, Optional
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .audit_chain import get_audit_chain
+from .audit_index import get_audit_index, timestamp_key
+from .consent_ledger import get_consent_ledger
+
+logger = logging.getLogger(__name__)
 
 
 def log_event(
@@ -10,26 +16,66 @@ def log_event(
     action: str,
     why: str,
     consent_id: Optional[str] = None,
-    metadata: Optional[Dict[str, Any]] = None
+    metadata: Optional[Dict[str, Any]] = None,
+    durable: bool = False
 ) -> str:
     """
     Log an audit event with SHA-256 hash for integrity
     
+    The event is queued for the audit writer and its ID returned without
+    waiting for the disk; the writer gives it its place in the chain.
+    
     Args:
         actor: Who performed the action (user, system, admin)
         action: What action was performed
         why: Reason for the action
         consent_id: Optional consent identifier
         metadata: Additional metadata about the event
+        durable: Wait until the event is on disk before returning
+    
+    Returns:
+        SHA-256 hash of the event's content, recorded as its ``event_id``
+    """
+    event = _build_event(actor, action, why, consent_id, metadata)
+    _append_events([event], durable)
+    
+    logger.debug("Audit event logged: %s by %s - ID: %s...", action, actor, event["event_id"][:8])
+    
+    return event["event_id"]
+
+
+def log_events(events: List[Dict[str, Any]], durable: bool = False) -> List[str]:
+    """
+    Log several audit events with a single append to the audit log
+    
+    Args:
+        events: Dicts with the keyword arguments accepted by log_event
+        durable: Wait until the events are on disk before returning
     
     Returns:
-        SHA-256 hash of the logged event
+        Event IDs (SHA-256 hashes of the events' content), in order
     """
-    # Create artifacts directory if it doesn't exist
-    artifacts_dir = Path("_artifacts")
-    artifacts_dir.mkdir(exist_ok=True)
+    built = [
+        _build_event(
+            e["actor"], e["action"], e["why"], e.get("consent_id"), e.get("metadata")
+        )
+        for e in events
+    ]
+    _append_events(built, durable)
     
-    # Create audit log entry
+    logger.debug("Audit events logged: %d events", len(built))
+    
+    return [event["event_id"] for event in built]
+
+
+def _build_event(
+    actor: str,
+    action: str,
+    why: str,
+    consent_id: Optional[str],
+    metadata: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Create an audit log entry; its chain position and hash are added when it is written"""
     event = {
         "timestamp": datetime.utcnow().isoformat(),
         "actor": actor,
@@ -38,30 +84,31 @@ def log_event(
         "consent_id": consent_id,
         "metadata": metadata or {}
     }
+    event["event_id"] = hashlib.sha256(json.dumps(event, sort_keys=True, default=str).encode()).hexdigest()
+    return event
+
+
+def _append_events(events: List[Dict[str, Any]], durable: bool = False):
+    """
+    Queue events for the audit log (JSONL format) as one append
     
-    # Generate SHA-256 hash of the event
-    event_json = json.dumps(event, sort_keys=True, default=str)
-    event_hash = hashlib.sha256(event_json.encode()).hexdigest()
-    
-    # Add hash to the event
-    event["hash"] = event_hash
-    
-    # Append to audit log (JSONL format)
-    audit_log_path = artifacts_dir / "audit.log"
-    
-    with open(audit_log_path, 'a') as f:
-        f.write(json.dumps(event) + '\n')
-    
-    print(f"Audit event logged: {action} by {actor} - Hash: {event_hash[:8]}...")
+    As they are written, each event gets its sequence number, the previous
+    event's hash and its own SHA-256 hash covering both.
+    """
+    if not events:
+        return
     
-    return event_hash
+    written = get_audit_chain().append(events, durable)
+    if durable:
+        written.result()
 
 
 def log_consent(
     journey_id: str,
     consent_scope: list,
     user_identifier: str,
-    signature: Optional[str] = None
+    signature: Optional[str] = None,
+    ttl_days: int = 30
 ) -> str:
     """
     Log a consent event and return consent ID
@@ -71,6 +118,7 @@ def log_consent(
         consent_scope: List of consent scopes
         user_identifier: User identifier (hashed)
         signature: Optional digital signature
+        ttl_days: Days the consent (and the journey's data) is retained
     
     Returns:
         Consent ID (hash)
@@ -79,7 +127,7 @@ def log_consent(
     consent_data = f"{journey_id}{datetime.utcnow().isoformat()}"
     consent_id = hashlib.sha256(consent_data.encode()).hexdigest()[:16]
     
-    # Log consent event
+    # Log consent event; a grant must never outlive its audit record
     log_event(
         actor="user",
         action="consent_granted",
@@ -90,7 +138,8 @@ def log_consent(
             "consent_scope": consent_scope,
             "user_identifier": user_identifier,
             "has_signature": signature is not None
-        }
+        },
+        durable=True
     )
     
     # Save consent details to vault
@@ -101,22 +150,11 @@ def log_consent(
         "user_identifier": user_identifier,
         "signature": signature,
         "granted_at": datetime.utcnow().isoformat(),
-        "ttl_days": 30
+        "ttl_days": ttl_days
     }
     
-    # Save to consent ledger
-    consent_ledger_path = Path("_artifacts") / "consent_ledger.json"
-    
-    if consent_ledger_path.exists():
-        with open(consent_ledger_path, 'r') as f:
-            ledger = json.load(f)
-    else:
-        ledger = {"consents": []}
-    
-    ledger["consents"].append(consent_data)
-    
-    with open(consent_ledger_path, 'w') as f:
-        json.dump(ledger, f, indent=2, default=str)
+    # Append to the consent ledger and its index
+    get_consent_ledger().grant(consent_data)
     
     return consent_id
 
@@ -125,6 +163,9 @@ def verify_consent(consent_id: str, required_scope: str) -> bool:
     """
     Verify if consent exists and covers required scope
     
+    A lookup in the consent ledger's in-memory index; the ledger file is
+    not read.
+    
     Args:
         consent_id: Consent identifier to verify
         required_scope: Required consent scope
@@ -132,143 +173,69 @@ def verify_consent(consent_id: str, required_scope: str) -> bool:
     Returns:
         True if consent is valid and covers required scope
     """
-    consent_ledger_path = Path("_artifacts") / "consent_ledger.json"
-    
-    if not consent_ledger_path.exists():
-        return False
+    return get_consent_ledger().verify(consent_id, required_scope)
+
+
+def verify_journey_consent(journey_id: str, required_scope: str) -> bool:
+    """
+    Verify if any consent of a journey covers required scope
     
-    try:
-        with open(consent_ledger_path, 'r') as f:
-            ledger = json.load(f)
-        
-        for consent in ledger.get("consents", []):
-            if consent.get("consent_id") == consent_id:
-                # Check if consent covers required scope
-                consent_scope = consent.get("consent_scope", [])
-                if required_scope in consent_scope:
-                    # Check if consent is still valid (not expired)
-                    granted_at = datetime.fromisoformat(consent["granted_at"].replace('Z', '+00:00'))
-                    ttl_days = consent.get("ttl_days", 30)
-                    expiry_date = granted_at + timedelta(days=ttl_days)
-                    
-                    if datetime.utcnow() < expiry_date:
-                        return True
-        
-        return False
+    Args:
+        journey_id: Journey identifier
+        required_scope: Required consent scope
     
-    except (json.JSONDecodeError, ValueError, KeyError):
-        return False
+    Returns:
+        True if an unexpired consent of the journey covers required scope
+    """
+    return get_consent_ledger().verify_journey(journey_id, required_scope)
 
 
 def get_audit_trail(
     journey_id: Optional[str] = None,
     action: Optional[str] = None,
     start_date: Optional[datetime] = None,
-    end_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None,
+    limit: Optional[int] = None
 ) -> list:
     """
     Get audit trail with optional filtering
     
+    Matching events are looked up in the audit index and read straight from
+    their offsets in the log, newest first, followed by matches from rotated
+    segments that overlap the time range.
+    
     Args:
         journey_id: Filter by journey ID
         action: Filter by action type
         start_date: Filter events after this date
         end_date: Filter events before this date
+        limit: Return at most this many (the newest) events
     
     Returns:
         List of filtered audit events
     """
-    audit_log_path = Path("_artifacts") / "audit.log"
-    
-    if not audit_log_path.exists():
-        return []
-    
-    events = []
+    index = get_audit_index()
     
-    with open(audit_log_path, 'r') as f:
-        for line in f:
-            try:
-                event = json.loads(line.strip())
-                
-                # Apply filters
-                if journey_id and event.get("metadata", {}).get("journey_id") != journey_id:
-                    continue
-                
-                if action and event.get("action") != action:
-                    continue
-                
-                if start_date:
-                    event_time = datetime.fromisoformat(event["timestamp"].replace('Z', '+00:00'))
-                    if event_time < start_date:
-                        continue
-                
-                if end_date:
-                    event_time = datetime.fromisoformat(event["timestamp"].replace('Z', '+00:00'))
-                    if event_time > end_date:
-                        continue
-                
-                events.append(event)
-            
-            except json.JSONDecodeError:
-                continue
+    # Include events still queued in the audit writer
+    index.writer.flush()
     
-    # Sort by timestamp (newest first)
-    events.sort(key=lambda x: x["timestamp"], reverse=True)
-    
-    return events
+    return index.query(
+        journey_id,
+        action,
+        timestamp_key(start_date) if start_date else None,
+        timestamp_key(end_date) if end_date else None,
+        limit
+    )
 
 
 def get_consent_summary() -> Dict[str, Any]:
     """
     Get summary of consent activities
     
+    The counts are kept by the consent ledger as consents are granted and
+    expire, so this does not read the ledger.
+    
     Returns:
         Dictionary with consent statistics
     """
-    consent_ledger_path = Path("_artifacts") / "consent_ledger.json"
-    
-    if not consent_ledger_path.exists():
-        return {
-            "total_consents": 0,
-            "active_consents": 0,
-            "expired_consents": 0,
-            "scope_breakdown": {}
-        }
-    
-    try:
-        with open(consent_ledger_path, 'r') as f:
-            ledger = json.load(f)
-        
-        total_consents = len(ledger.get("consents", []))
-        active_consents = 0
-        expired_consents = 0
-        scope_breakdown = {}
-        
-        for consent in ledger.get("consents", []):
-            granted_at = datetime.fromisoformat(consent["granted_at"].replace('Z', '+00:00'))
-            ttl_days = consent.get("ttl_days", 30)
-            expiry_date = granted_at + timedelta(days=ttl_days)
-            
-            if datetime.utcnow() < expiry_date:
-                active_consents += 1
-            else:
-                expired_consents += 1
-            
-            # Count scope usage
-            for scope in consent.get("consent_scope", []):
-                scope_breakdown[scope] = scope_breakdown.get(scope, 0) + 1
-        
-        return {
-            "total_consents": total_consents,
-            "active_consents": active_consents,
-            "expired_consents": expired_consents,
-            "scope_breakdown": scope_breakdown
-        }
-    
-    except (json.JSONDecodeError, ValueError, KeyError):
-        return {
-            "total_consents": 0,
-            "active_consents": 0,
-            "expired_consents": 0,
-            "scope_breakdown": {}
-        }
+    return get_consent_ledger().summary()
@@ -0,0 +1,877 @@
+"""
+Hash-chained audit log with Merkle checkpoints
+
+Every audit event used to be hashed on its own, so checking the log meant
+re-hashing all of it, and a deleted line went unnoticed. Each event now also
+carries its sequence number and the hash of the event before it
+(``prev_hash``), so removing, reordering or editing any event breaks the
+chain. Every ``AUDIT_CHECKPOINT_EVERY`` events a checkpoint record is
+appended with the Merkle root of the events since the previous checkpoint,
+chained to that checkpoint in turn.
+
+A sidecar file next to the log (``audit.log.checkpoints``) lists every
+checkpoint with the byte range of its group of events. With it, verifying a
+time range only reads the groups in that range, and proving that one event
+is in the log takes one group and a Merkle path of O(log n) hashes. A full
+verification splits the log into byte ranges checked by a process pool.
+
+The chain also rotates the log into compressed segments (see
+``audit_segments``); verification and proofs read them along with the active
+log, and the manifest carries the chain across segments that retention has
+dropped.
+
+Events written before the chain existed keep their standalone hash and are
+reported as unchained; the first chained event links to the last of them.
+
+Several processes may append to the log. The chain is the audit writer's
+sequencer: positions are assigned on the writer thread while it holds the
+log's lock file, after it has followed what other processes appended, so
+their events and ours form one chain.
+"""
+
+import bisect
+import gzip
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .audit_segments import AUDIT_RETENTION_DAYS, SegmentStore, timestamp_key
+from .audit_writer import AuditWriter, get_audit_writer
+
+GENESIS = "0" * 64
+CHECKPOINT_PREFIX = b'{"type": "checkpoint"'
+
+AUDIT_CHECKPOINT_EVERY = int(os.getenv("AUDIT_CHECKPOINT_EVERY", "1024"))
+# Processes for a full verification; 0 uses one per CPU
+AUDIT_VERIFY_WORKERS = int(os.getenv("AUDIT_VERIFY_WORKERS", "0"))
+# Logs smaller than this are verified in-process
+AUDIT_VERIFY_PARALLEL_BYTES = int(os.getenv("AUDIT_VERIFY_PARALLEL_BYTES", str(8 * 1024 * 1024)))
+
+# Errors reported by one verification, to keep the result readable
+MAX_ERRORS = 50
+
+
+def record_hash(record: Dict[str, Any]) -> str:
+    """SHA-256 of an event or checkpoint, without its own ``hash`` field"""
+    body = {key: value for key, value in record.items() if key != "hash"}
+    return hashlib.sha256(json.dumps(body, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def encode_record(record: Dict[str, Any]) -> bytes:
+    return (json.dumps(record, default=str) + "\n").encode()
+
+
+def _leaf(event_hash: str) -> bytes:
+    return hashlib.sha256(b"\x00" + bytes.fromhex(event_hash)).digest()
+
+
+def _node(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def _next_level(level: List[bytes]) -> List[bytes]:
+    # An odd node out is promoted unchanged
+    return [
+        _node(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+        for i in range(0, len(level), 2)
+    ]
+
+
+def merkle_root(event_hashes: List[str]) -> str:
+    """Merkle root of a group of event hashes"""
+    level = [_leaf(event_hash) for event_hash in event_hashes]
+    if not level:
+        return GENESIS
+    while len(level) > 1:
+        level = _next_level(level)
+    return level[0].hex()
+
+
+def merkle_proof(event_hashes: List[str], index: int) -> List[Tuple[str, str]]:
+    """Sibling hashes from ``event_hashes[index]`` up to the root, as (side, hash) pairs"""
+    level = [_leaf(event_hash) for event_hash in event_hashes]
+    proof = []
+    while len(level) > 1:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append(("left" if sibling < index else "right", level[sibling].hex()))
+        level = _next_level(level)
+        index //= 2
+    return proof
+
+
+def verify_proof(event_hash: str, proof: List[Tuple[str, str]], root: str) -> bool:
+    """Check a Merkle path from an event hash to a checkpoint root"""
+    node = _leaf(event_hash)
+    for side, sibling in proof:
+        node = _node(bytes.fromhex(sibling), node) if side == "left" else _node(node, bytes.fromhex(sibling))
+    return node.hex() == root
+
+
+def _iter_lines(path: Path, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, bytes]]:
+    """(offset, line) of every complete line starting in [start, end)"""
+    if not path.exists():
+        return
+    with (gzip.open(path, "rb") if path.suffix == ".gz" else open(path, "rb")) as f:
+        f.seek(start)
+        offset = start
+        for line in f:
+            if end is not None and offset >= end:
+                break
+            if line.endswith(b"\n"):
+                yield offset, line
+            offset += len(line)
+
+
+class CheckpointIndex:
+    """
+    Sidecar list of checkpoints, each with the byte range of its group
+
+    An entry is the checkpoint record plus ``offset`` (where its group of
+    events starts) and ``end`` (just past the checkpoint line). Appended
+    by the audit writer thread as checkpoints reach the log, under the log's
+    lock file; every process sees every checkpoint, and only the first to
+    get to one writes it down.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries: List[Dict[str, Any]] = []
+        # Sorted keys for bisecting, kept alongside the entries
+        self.ends: List[int] = []
+        self._last_seqs: List[int] = []
+        self._first_timestamps: List[str] = []
+        self._last_timestamps: List[str] = []
+        self._group_start = 0
+        # The sidecar's size when last read or written, and where its last group ends
+        self._saved_size = 0
+        self._saved_end = 0
+
+    def load(self, log_size: int) -> int:
+        """Read the sidecar; returns the offset up to which it covers the log"""
+        entries = []
+        if self.path.exists():
+            with open(self.path, "rb") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        break
+        if entries and entries[-1]["end"] > log_size:
+            # The log was replaced; index it again from the start
+            entries = []
+            self.path.unlink()
+        self.entries, self.ends, self._last_seqs, self._first_timestamps, self._last_timestamps = [], [], [], [], []
+        for entry in entries:
+            self._remember(entry)
+        self._group_start = entries[-1]["end"] if entries else 0
+        self._saved_size = self.path.stat().st_size if entries else 0
+        self._saved_end = self._group_start
+        return self._group_start
+
+    def add(self, checkpoint: Dict[str, Any], end: int):
+        entry = {**checkpoint, "offset": self._group_start, "end": end}
+        if end > self._saved_through():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "ab") as f:
+                f.write(encode_record(entry))
+                self._saved_size = f.tell()
+            self._saved_end = end
+        self._remember(entry)
+        self._group_start = end
+
+    def _saved_through(self) -> int:
+        """Where the sidecar's last group ends, including groups other processes wrote down"""
+        size = self.path.stat().st_size if self.path.exists() else 0
+        if size != self._saved_size:
+            self._saved_size, self._saved_end = size, 0
+            with open(self.path, "rb") as f:
+                f.seek(max(0, size - 64 * 1024))
+                for line in reversed(f.read().splitlines()):
+                    try:
+                        self._saved_end = json.loads(line)["end"]
+                        break
+                    except (ValueError, KeyError):
+                        continue
+        return self._saved_end
+
+    def rotated(self, target: Optional[Path]):
+        """The sidecar moves with the rotated log (moved already if another process rotated it)"""
+        if target is not None and self.path.exists():
+            os.replace(self.path, target.with_name(target.name + ".checkpoints"))
+        self.entries, self.ends, self._last_seqs, self._first_timestamps, self._last_timestamps = [], [], [], [], []
+        self._group_start = 0
+        self._saved_size = self._saved_end = 0
+
+    def _remember(self, entry: Dict[str, Any]):
+        self.entries.append(entry)
+        self.ends.append(entry["end"])
+        self._last_seqs.append(entry["last_seq"])
+        self._first_timestamps.append(entry["first_timestamp"])
+        self._last_timestamps.append(entry["last_timestamp"])
+
+    def observe(self, offset: int, data: bytes):
+        """Audit writer listener: index the checkpoints in an append"""
+        position = offset
+        for line in data.splitlines(keepends=True):
+            position += len(line)
+            if line.startswith(CHECKPOINT_PREFIX):
+                self.add(json.loads(line), position)
+
+    def find(self, seq: int) -> Optional[Dict[str, Any]]:
+        """The checkpoint whose group holds event ``seq``"""
+        position = bisect.bisect_left(self._last_seqs, seq)
+        if position < len(self.entries) and self.entries[position]["first_seq"] <= seq:
+            return self.entries[position]
+        return None
+
+    def overlapping(self, start: Optional[str], end: Optional[str]) -> List[Dict[str, Any]]:
+        """Checkpoints whose events' timestamps overlap [start, end]"""
+        first = bisect.bisect_left(self._last_timestamps, start) if start else 0
+        last = bisect.bisect_right(self._first_timestamps, end) if end else len(self.entries)
+        return self.entries[first:last]
+
+
+class AuditChain:
+    """
+    Assigns each event its place in the chain as the writer appends it
+
+    Sequence numbers and ``prev_hash`` are assigned by the writer thread,
+    under the log's lock file, for the lines it is about to write, so the
+    log's line order is the chain order whichever process wrote them. The
+    chain's tail is read back from the segment manifest and the log on
+    first use, and followed through every append after that.
+    """
+
+    def __init__(
+        self,
+        writer: AuditWriter,
+        every: int = AUDIT_CHECKPOINT_EVERY,
+        segments: Optional[SegmentStore] = None
+    ):
+        self.writer = writer
+        self.every = every
+        self.checkpoints = CheckpointIndex(writer.path.with_name(writer.path.name + ".checkpoints"))
+        self.segments = segments if segments is not None else SegmentStore(writer.path)
+        self.lock = threading.Lock()
+
+        self._loaded = False
+        self._seq = 0
+        self._last_hash = GENESIS
+        self._last_checkpoint = GENESIS
+        self._group: List[Tuple[str, str]] = []  # (hash, timestamp) since the last checkpoint
+        # Where the chain has followed the active log to, and its first event's time, for rotation
+        self._covered = 0
+        self._active_started: Optional[datetime] = None
+        # Where the lines last sequenced end and the chain position after them,
+        # taken up once the writer reports them written
+        self._pending: Optional[Tuple[int, Tuple[int, str, str, List[Tuple[str, str]]]]] = None
+
+        writer.set_sequencer(self._sequence, self._seal)
+        writer.add_listener(self._observe)
+        writer.add_rotation_listener(self._rotated)
+
+    def append(self, events: List[Dict[str, Any]], durable: bool = False) -> Future:
+        """
+        Queue ``events`` for the log; the writer chains and hashes them in place
+
+        Returns:
+            The writer's future for the append; the events have their
+            ``seq``, ``prev_hash`` and ``hash`` once it resolves
+        """
+        return self.writer.append(events, durable)
+
+    def rotate(self, timeout: Optional[float] = None) -> Future:
+        """
+        Seal the open checkpoint group and rotate the log into a segment now
+
+        Args:
+            timeout: Seconds to wait for the log's lock before giving up
+
+        Returns:
+            The writer's future for the rotation: the rotated log's path, or
+            None if there was nothing to rotate or a verification is reading
+            the segments
+        """
+        return self.writer.rotate(timeout)
+
+    def _sequence(self, events: List[Dict[str, Any]], offset: int) -> List[bytes]:
+        """Audit writer sequencer: chain, hash and encode events to be written at ``offset``"""
+        with self.lock:
+            self._follow(offset)
+            saved = self._position()
+            self._group = list(self._group)
+            lines = []
+            for event in events:
+                event["seq"] = self._seq
+                event["prev_hash"] = self._last_hash
+                event["hash"] = record_hash(event)
+                lines.append(encode_record(event))
+
+                self._seq += 1
+                self._last_hash = event["hash"]
+                self._group.append((event["hash"], str(event.get("timestamp"))))
+                if len(self._group) >= self.every:
+                    lines.append(encode_record(self._checkpoint()))
+            self._pending = (offset + sum(len(line) for line in lines), self._position())
+            self._restore(saved)
+            return lines
+
+    def _seal(self, offset: int, force: bool) -> Tuple[List[bytes], Optional[Path]]:
+        """Audit writer sealer: the checkpoint closing the log and the segment it becomes"""
+        with self.lock:
+            self._follow(offset)
+            if not self._covered or not (force or self.segments.due(self._covered, self._active_started)):
+                return [], None
+            # Put off while a verification reads the segments; a later append retries
+            if not self.segments.pinned.acquire(blocking=False):
+                return [], None
+            self.segments.pinned.release()
+
+            lines = []
+            if self._group:
+                saved = self._position()
+                lines.append(encode_record(self._checkpoint()))
+                self._pending = (offset + len(lines[0]), self._position())
+                self._restore(saved)
+            return lines, self.segments.segment_path(self.segments.next_number(), compressed=False)
+
+    def _observe(self, offset: int, data: bytes):
+        """Audit writer listener: follow the chain through an append, ours or another process's"""
+        with self.lock:
+            self._load()
+            end = offset + len(data)
+            pending, self._pending = self._pending, None
+            if end <= self._covered:
+                # Already read back from the log by _load
+                return
+            if offset != self._covered:
+                self._loaded = False
+                self._load()
+                return
+            if pending is not None and pending[0] == end:
+                self._restore(pending[1])
+                self.checkpoints.observe(offset, data)
+            else:
+                self._read(_split_lines(offset, data))
+            if offset == 0:
+                self._active_started = _started(data)
+            self._covered = end
+
+    def _rotated(self, target: Optional[Path]):
+        """Audit writer rotation listener: the rotated log becomes a segment"""
+        with self.lock:
+            self.checkpoints.rotated(target)
+            if target is None:
+                # Sealed by the process that rotated it: pick the chain up from the manifest
+                self._loaded = False
+                return
+            self.segments.sealed(target, {
+                "last_seq": self._seq - 1,
+                "last_hash": self._last_hash,
+                "last_checkpoint": self._last_checkpoint
+            })
+            self._covered = 0
+            self._active_started = None
+
+    def _position(self) -> Tuple[int, str, str, List[Tuple[str, str]]]:
+        return self._seq, self._last_hash, self._last_checkpoint, self._group
+
+    def _restore(self, position: Tuple[int, str, str, List[Tuple[str, str]]]):
+        self._seq, self._last_hash, self._last_checkpoint, self._group = position
+
+    def _checkpoint(self) -> Dict[str, Any]:
+        hashes = [event_hash for event_hash, _ in self._group]
+        checkpoint = {
+            "type": "checkpoint",
+            "timestamp": datetime.utcnow().isoformat(),
+            "first_seq": self._seq - len(hashes),
+            "last_seq": self._seq - 1,
+            "count": len(hashes),
+            "first_timestamp": self._group[0][1],
+            "last_timestamp": self._group[-1][1],
+            "root": merkle_root(hashes),
+            "last_hash": self._last_hash,
+            "prev_checkpoint": self._last_checkpoint
+        }
+        checkpoint["hash"] = record_hash(checkpoint)
+
+        self._last_checkpoint = checkpoint["hash"]
+        self._group = []
+        return checkpoint
+
+    def _follow(self, offset: int):
+        """Make sure the chain has followed the log up to ``offset``, where the writer appends next"""
+        if self._loaded and self._covered != offset:
+            # Bytes no listener saw: a failed write, or a log the writer reopened
+            self._loaded = False
+        self._load()
+
+    def _load(self):
+        """Pick the chain up where the log ends, indexing checkpoints the sidecar missed"""
+        if self._loaded:
+            return
+        path = self.writer.path
+        size = path.stat().st_size if path.exists() else 0
+        self._seq, self._last_hash, self._last_checkpoint, self._group = 0, GENESIS, GENESIS, []
+        tail = self.segments.tail()
+        if tail is not None and tail.get("last_hash") is not None:
+            self._seq = tail["last_seq"] + 1 if tail.get("last_seq") is not None else 0
+            self._last_hash = tail["last_hash"]
+            self._last_checkpoint = tail.get("last_checkpoint") or GENESIS
+        start = self.checkpoints.load(size)
+        if self.checkpoints.entries:
+            last = self.checkpoints.entries[-1]
+            self._seq = last["last_seq"] + 1
+            self._last_hash = last["last_hash"]
+            self._last_checkpoint = last["hash"]
+
+        self._read(_iter_lines(path, start, size))
+
+        self._covered = size
+        self._active_started = None
+        if size:
+            for _, line in _iter_lines(path, 0, 1):
+                self._active_started = _started(line)
+        self._loaded = True
+
+    def _read(self, lines: Iterator[Tuple[int, bytes]]):
+        """Follow the chain through (offset, line) pairs of the log"""
+        for offset, line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("type") == "checkpoint":
+                self.checkpoints.add(record, offset + len(line))
+                self._last_checkpoint = record["hash"]
+                self._group = []
+                continue
+            self._last_hash = record.get("hash", self._last_hash)
+            if "seq" in record:
+                self._seq = record["seq"] + 1
+                self._group.append((record["hash"], str(record.get("timestamp"))))
+
+
+def _split_lines(offset: int, data: bytes) -> Iterator[Tuple[int, bytes]]:
+    """(offset, line) of every complete line in ``data``, which starts at ``offset``"""
+    for line in data.splitlines(keepends=True):
+        if line.endswith(b"\n"):
+            yield offset, line
+        offset += len(line)
+
+
+def _started(data: bytes) -> datetime:
+    """Time of the log's first event, for time-based rotation"""
+    try:
+        return datetime.fromisoformat(json.loads(data[:data.find(b"\n") + 1 or None])["timestamp"])
+    except (ValueError, KeyError, TypeError):
+        return datetime.utcnow()
+
+
+_audit_chain: Optional[AuditChain] = None
+_audit_chain_lock = threading.Lock()
+
+
+def get_audit_chain() -> AuditChain:
+    """Get the chain for the process-wide audit writer"""
+    global _audit_chain
+    writer = get_audit_writer()
+    if _audit_chain is None or _audit_chain.writer is not writer:
+        with _audit_chain_lock:
+            if _audit_chain is None or _audit_chain.writer is not writer:
+                _audit_chain = AuditChain(writer)
+    return _audit_chain
+
+
+def _verify_span(path: str, start: int, end: Optional[int]) -> Dict[str, Any]:
+    """
+    Verify the lines in [start, end) of the log on their own
+
+    Checks every hash, the links and sequence numbers inside the span and
+    every checkpoint group that lies wholly inside it. What crosses the
+    span's edges is returned for ``_merge_spans`` to check.
+    """
+    result: Dict[str, Any] = {
+        "events": 0, "chained": 0, "checkpoints": 0, "errors": [],
+        "first_link": None, "last_hash": None, "last_seq": None,
+        "leading": [], "first_checkpoint": None, "trailing": [], "last_checkpoint": None
+    }
+    errors = result["errors"]
+    previous_hash: Optional[str] = None
+    previous_seq: Optional[int] = None
+    group: List[str] = []
+
+    for offset, line in _iter_lines(Path(path), start, end):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            errors.append(f"Unreadable line at byte {offset}")
+            continue
+
+        if record.get("type") == "checkpoint":
+            result["checkpoints"] += 1
+            if record_hash(record) != record.get("hash"):
+                errors.append(f"Checkpoint at byte {offset} does not match its hash")
+            if result["first_checkpoint"] is None:
+                result["first_checkpoint"] = record
+                result["leading"] = group
+            else:
+                if record.get("prev_checkpoint") != result["last_checkpoint"]:
+                    errors.append(f"Checkpoint at byte {offset} does not follow the previous checkpoint")
+                errors.extend(_check_group(record, group))
+            result["last_checkpoint"] = record.get("hash")
+            group = []
+            continue
+
+        result["events"] += 1
+        if record_hash(record) != record.get("hash"):
+            errors.append(f"Event at byte {offset} does not match its hash")
+        if "seq" in record:
+            result["chained"] += 1
+            if previous_hash is None:
+                result["first_link"] = (record.get("prev_hash"), record["seq"])
+            elif record.get("prev_hash") != previous_hash:
+                errors.append(f"Event {record['seq']} does not follow the event before it")
+            if previous_seq is not None and record["seq"] != previous_seq + 1:
+                errors.append(f"Events {previous_seq + 1} to {record['seq'] - 1} are missing")
+            previous_seq = record["seq"]
+            group.append(record.get("hash"))
+        previous_hash = record.get("hash")
+
+    result["last_hash"] = previous_hash
+    result["last_seq"] = previous_seq
+    if result["first_checkpoint"] is None:
+        result["leading"] = group
+    else:
+        result["trailing"] = group
+    return result
+
+
+def _check_group(checkpoint: Dict[str, Any], group: List[str]) -> List[str]:
+    if len(group) != checkpoint.get("count") or merkle_root(group) != checkpoint.get("root") \
+            or (group and group[-1] != checkpoint.get("last_hash")):
+        return [f"Events {checkpoint.get('first_seq')} to {checkpoint.get('last_seq')} do not match their checkpoint"]
+    return []
+
+
+def _merge_spans(
+    results: List[Dict[str, Any]],
+    previous_hash: str = GENESIS,
+    previous_checkpoint: str = GENESIS
+) -> Dict[str, Any]:
+    """Stitch consecutive span results together, checking what crosses their edges"""
+    errors: List[str] = []
+    carry: List[str] = []
+    previous_seq: Optional[int] = None
+    events = chained = checkpoints = 0
+
+    for result in results:
+        errors.extend(result["errors"])
+        events += result["events"]
+        chained += result["chained"]
+        checkpoints += result["checkpoints"]
+
+        if result["first_link"] is not None:
+            prev_hash, seq = result["first_link"]
+            if prev_hash != previous_hash:
+                errors.append(f"Event {seq} does not follow the event before it")
+            if previous_seq is not None and seq != previous_seq + 1:
+                errors.append(f"Events {previous_seq + 1} to {seq - 1} are missing")
+
+        checkpoint = result["first_checkpoint"]
+        if checkpoint is not None:
+            if checkpoint.get("prev_checkpoint") != previous_checkpoint:
+                errors.append(f"Checkpoint for events {checkpoint.get('first_seq')} to {checkpoint.get('last_seq')} "
+                              "does not follow the previous checkpoint")
+            errors.extend(_check_group(checkpoint, carry + result["leading"]))
+            carry = result["trailing"]
+            previous_checkpoint = result["last_checkpoint"]
+        else:
+            carry = carry + result["leading"]
+
+        if result["last_hash"] is not None:
+            previous_hash = result["last_hash"]
+        if result["last_seq"] is not None:
+            previous_seq = result["last_seq"]
+
+    return {
+        "valid": not errors,
+        "events": events,
+        "chained_events": chained,
+        "unchained_events": events - chained,
+        "checkpoints": checkpoints,
+        # Chained but not yet covered by a checkpoint
+        "unsealed_events": len(carry),
+        "errors": errors[:MAX_ERRORS]
+    }
+
+
+def _spans(path: Path, size: int, workers: int) -> List[Tuple[int, int]]:
+    """Split the log into about ``workers`` byte ranges that start on line boundaries"""
+    bounds = [0]
+    if workers > 1 and size >= AUDIT_VERIFY_PARALLEL_BYTES:
+        with open(path, "rb") as f:
+            for i in range(1, workers):
+                f.seek(max(size * i // workers, bounds[-1]))
+                f.readline()
+                if bounds[-1] < f.tell() < size:
+                    bounds.append(f.tell())
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def verify_audit_log(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    workers: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Verify the audit log's hashes, chain links and checkpoints
+
+    Without a time range every segment and the active log are checked,
+    split across a process pool when there is more than one piece to read.
+    With one, only the segments and checkpoint groups overlapping the range
+    are read (plus events after the last checkpoint), and the checkpoint
+    chain and segment manifest tie them to the rest of the log. Segments
+    dropped by retention are checked through their manifest entries.
+
+    Args:
+        start: Only check events from this time on
+        end: Only check events up to this time
+        workers: Processes for a full check (default AUDIT_VERIFY_WORKERS)
+
+    Returns:
+        Whether the log is intact, what was checked and the first errors found
+    """
+    chain = get_audit_chain()
+    segments = chain.segments
+    # Segment files stay put while they are read
+    with segments.pinned:
+        # Queued events and their checkpoints are checked too
+        chain.writer.flush()
+        with chain.writer.lock, chain.lock:
+            chain._load()
+            # Only as far as the checkpoint index goes: appends after this are left for next time
+            size = chain._covered
+
+        if start is not None or end is not None:
+            verified = _verify_window(chain, start, end, size)
+        else:
+            verified = _verify_all(chain, size, workers or AUDIT_VERIFY_WORKERS or os.cpu_count() or 1)
+
+    errors = segments.check() + verified["errors"]
+    verified.update({
+        "valid": verified["valid"] and not errors,
+        "segments": len(segments.live()),
+        "dropped_segments": len(segments.entries) - len(segments.live()),
+        "errors": errors[:MAX_ERRORS]
+    })
+    return verified
+
+
+def _verify_all(chain: AuditChain, size: int, workers: int) -> Dict[str, Any]:
+    path = chain.writer.path
+    live = chain.segments.live()
+    tasks = [(str(chain.segments.path(entry)), 0, _segment_bytes(entry)) for entry in live]
+    tasks += [(str(path), span_start, span_end) for span_start, span_end in _spans(path, size, workers)]
+
+    if workers == 1 or len(tasks) == 1:
+        results = [_verify_span(*task) for task in tasks]
+        used = 1
+    else:
+        used = min(workers, len(tasks))
+        # Spawned, not forked: the caller may be a threaded server
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(used, mp_context=context) as pool:
+            results = list(pool.map(_verify_span, *zip(*tasks)))
+
+    # The chain picks up after the last dropped segment
+    previous = chain.segments.before(live[0]) if live else chain.segments.tail()
+    verified = _merge_spans(
+        results,
+        previous["last_hash"] if previous else GENESIS,
+        (previous["last_checkpoint"] if previous else None) or GENESIS
+    )
+    verified["errors"] = _check_segments(live, results) + verified["errors"]
+    verified["valid"] = not verified["errors"]
+    verified["workers"] = used
+    return verified
+
+
+def _segment_bytes(entry: Dict[str, Any]) -> Optional[int]:
+    # Not yet compressed: the raw file is read to its end
+    return entry.get("bytes") if entry.get("compressed") else None
+
+
+def _check_segments(entries: List[Dict[str, Any]], results: List[Dict[str, Any]]) -> List[str]:
+    """Check that each segment ends where its manifest entry says"""
+    return [
+        f"Segment {entry['segment']} does not end where its manifest entry says"
+        for entry, result in zip(entries, results)
+        if result["last_hash"] != entry.get("last_hash")
+        or (result["last_checkpoint"] or GENESIS) != (entry.get("last_checkpoint") or GENESIS)
+    ]
+
+
+def _verify_window(chain: AuditChain, start: Optional[datetime], end: Optional[datetime], size: int) -> Dict[str, Any]:
+    path = chain.writer.path
+    entries = chain.checkpoints.entries
+    errors: List[str] = []
+    start_key = timestamp_key(start) if start else None
+    end_key = timestamp_key(end) if end else None
+
+    results = []
+    selected = chain.segments.overlapping(start_key, end_key)
+    for entry in selected:
+        # A segment follows the one before it, dropped or not
+        previous = chain.segments.before(entry) or {"last_hash": GENESIS, "last_checkpoint": GENESIS}
+        result = _verify_span(str(chain.segments.path(entry)), 0, _segment_bytes(entry))
+        errors.extend(_check_segments([entry], [result]))
+        results.append(_merge_spans([result], previous["last_hash"], previous["last_checkpoint"] or GENESIS))
+
+    # The checkpoint chain itself is short: one entry per AUDIT_CHECKPOINT_EVERY events
+    tail = chain.segments.tail()
+    first = {"last_hash": tail["last_hash"], "hash": tail["last_checkpoint"] or GENESIS} if tail else {"last_hash": GENESIS, "hash": GENESIS}
+    previous_checkpoint = first["hash"]
+    for entry in entries:
+        if entry.get("prev_checkpoint") != previous_checkpoint or record_hash(_checkpoint_record(entry)) != entry["hash"]:
+            errors.append(f"Checkpoint for events {entry['first_seq']} to {entry['last_seq']} is broken")
+        previous_checkpoint = entry["hash"]
+
+    selected = chain.checkpoints.overlapping(start_key, end_key)
+    spans = [(entry["offset"], entry["end"]) for entry in selected]
+    active_end = entries[-1]["end"] if entries else 0
+    if active_end < size and (not entries or end is None or end_key >= entries[-1]["last_timestamp"]):
+        spans.append((active_end, size))
+
+    for span_start, span_end in spans:
+        # A group follows the previous group's last event and checkpoint
+        position = bisect.bisect_right(chain.checkpoints.ends, span_start)
+        previous = entries[position - 1] if position > 0 else first
+        result = _verify_span(str(path), span_start, span_end)
+        checkpoint = result["first_checkpoint"]
+        if checkpoint is not None and checkpoint.get("hash") != entries[position]["hash"]:
+            errors.append(f"Checkpoint at byte {span_end} differs from the checkpoint index")
+        results.append(_merge_spans([result], previous["last_hash"], previous["hash"]))
+
+    return {
+        "valid": not errors and all(result["valid"] for result in results),
+        **{
+            key: sum(result[key] for result in results)
+            for key in ("events", "chained_events", "unchained_events", "checkpoints", "unsealed_events")
+        },
+        "errors": (errors + [error for result in results for error in result["errors"]])[:MAX_ERRORS]
+    }
+
+
+def drop_audit_segments(retention_days: Optional[float] = None) -> Dict[str, int]:
+    """
+    Delete the audit segments whose newest event is past retention
+
+    Args:
+        retention_days: Days to keep (default AUDIT_RETENTION_DAYS; 0 keeps all)
+
+    Returns:
+        Number of segments dropped and bytes reclaimed
+    """
+    days = AUDIT_RETENTION_DAYS if retention_days is None else retention_days
+    if days <= 0:
+        return {"dropped_segments": 0, "reclaimed_bytes": 0}
+    return get_audit_chain().segments.drop_before(datetime.utcnow() - timedelta(days=days))
+
+
+def _checkpoint_record(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in entry.items() if key not in ("offset", "end")}
+
+
+def prove_event(seq: int) -> Optional[Dict[str, Any]]:
+    """
+    Merkle inclusion proof for event ``seq``
+
+    Returns:
+        The event, its path to the root and the checkpoint holding the
+        root, or None if the event is not (yet) covered by a checkpoint or
+        its segment was dropped
+    """
+    chain = get_audit_chain()
+    chain.writer.flush()
+    with chain.writer.lock, chain.lock:
+        chain._load()
+    path = chain.writer.path
+    entry = chain.checkpoints.find(seq)
+    if entry is None:
+        segment = next(
+            (s for s in chain.segments.live() if s.get("last_seq") is not None and seq <= s["last_seq"]),
+            None
+        )
+        if segment is None:
+            return None
+        checkpoints = CheckpointIndex(chain.segments.checkpoints_path(segment["segment"]))
+        checkpoints.load(segment.get("bytes") or float("inf"))
+        entry = checkpoints.find(seq)
+        if entry is None:
+            return None
+        path = chain.segments.path(segment)
+
+    events = []
+    for _, line in _iter_lines(path, entry["offset"], entry["end"]):
+        record = json.loads(line)
+        if "seq" in record and record.get("type") != "checkpoint":
+            events.append(record)
+    hashes = [event["hash"] for event in events]
+    index = seq - entry["first_seq"]
+
+    return {
+        "event": events[index],
+        "proof": merkle_proof(hashes, index),
+        "root": entry["root"],
+        "checkpoint": _checkpoint_record(entry)
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Verify the hash-chained audit log")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    verify = subcommands.add_parser("verify", help="check hashes, chain links and checkpoints")
+    verify.add_argument("--start", type=datetime.fromisoformat, help="only events from this ISO time on")
+    verify.add_argument("--end", type=datetime.fromisoformat, help="only events up to this ISO time")
+    verify.add_argument("--workers", type=int, help="processes for a full check")
+    rotate = subcommands.add_parser("rotate", help="seal the active log into a compressed segment now")
+    rotate.add_argument("--timeout", type=float, default=10.0,
+                        help="seconds to wait for the log's lock before giving up (default 10)")
+    drop = subcommands.add_parser("drop", help="delete segments past AUDIT_RETENTION_DAYS")
+    drop.add_argument("--days", type=float, help="retention in days instead of AUDIT_RETENTION_DAYS")
+    prove = subcommands.add_parser("prove", help="print the Merkle inclusion proof of one event")
+    prove.add_argument("seq", type=int, help="the event's sequence number")
+    args = parser.parse_args()
+
+    if args.command == "verify":
+        result = verify_audit_log(args.start, args.end, args.workers)
+        print(json.dumps(result, indent=2))
+        if not result["valid"]:
+            raise SystemExit(1)
+    elif args.command == "rotate":
+        chain = get_audit_chain()
+        try:
+            chain.rotate(args.timeout).result()
+        except TimeoutError:
+            raise SystemExit(f"{chain.writer.lock.path} stayed locked by another process; nothing was rotated")
+        chain.segments.wait()
+        print(json.dumps(chain.segments.tail(), indent=2))
+    elif args.command == "drop":
+        print(json.dumps(drop_audit_segments(args.days), indent=2))
+    else:
+        proof = prove_event(args.seq)
+        if proof is None:
+            raise SystemExit(f"Event {args.seq} is not covered by a checkpoint yet")
+        proof["valid"] = verify_proof(proof["event"]["hash"], proof["proof"], proof["root"])
+        print(json.dumps(proof, indent=2))
@@ -0,0 +1,375 @@
+"""
+Secondary indexes over the audit log
+
+``get_audit_trail`` used to read and parse every line of ``audit.log``,
+filter in Python and sort the result, on every ``GET /audit``. The audit
+writer now reports each append to an index that keeps, for every event,
+where its line starts and how long it is, plus:
+
+- the events of each journey_id and of each action, as ascending positions
+- a sparse time index: timestamp bounds for every ``AUDIT_INDEX_BLOCK``
+  events, for binary search over time ranges
+
+A query picks positions from the indexes, seeks straight to those lines and
+reads them newest first. Log order is chain order, which is the timestamp
+order of the events up to the moment between building an event and writing
+it, so no sort is needed.
+
+The index is persisted next to the log (``audit.log.index``, one short JSON
+line per event) so a restart reads it back and only indexes the log's tail.
+Worker processes share the log and the sidecar: before every append and
+every query an index takes up the sidecar lines other processes added and
+indexes the log bytes past them, and the sidecar is only written under the
+log's lock file, so it stays in log order. It covers the active log only:
+when the log is rotated into a segment the index starts over, and older
+events are found by decompressing the segments whose time span overlaps the
+query, newest first, with a byte match on the journey and action before any
+line is parsed.
+"""
+
+import bisect
+import json
+import os
+import threading
+from array import array
+from collections import deque
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from .audit_chain import CHECKPOINT_PREFIX, get_audit_chain
+from .audit_segments import SegmentStore, timestamp_key
+from .audit_writer import AuditWriter
+
+# Events per entry of the sparse time index
+AUDIT_INDEX_BLOCK = int(os.getenv("AUDIT_INDEX_BLOCK", "256"))
+
+# Events read per seek when walking the active log backwards
+_READ_RUN = 1024
+
+
+class AuditIndex:
+    """
+    Byte offsets of audit events, keyed by journey_id, action and time
+
+    Fed by the audit writer thread after each append; whatever else the log
+    holds (from before the index existed, or from other processes) is read
+    back from where the index ends before each append and query.
+    """
+
+    def __init__(self, writer: AuditWriter, segments: SegmentStore, block: int = AUDIT_INDEX_BLOCK):
+        self.writer = writer
+        self.segments = segments
+        self.block = block
+        self.path = writer.path.with_name(writer.path.name + ".index")
+        self.lock = threading.Lock()
+
+        # The log the index describes, held open so it reads the same file
+        # even once another process rotates it
+        self._log: Optional[BinaryIO] = None
+        # How much of the sidecar has been taken up
+        self._sidecar_read = 0
+        self._reset()
+
+        writer.add_listener(self.observe)
+        segments.add_listener(self.rotated)
+
+    def _reset(self):
+        self.offsets = array("q")
+        self.lengths = array("l")
+        self.journeys: Dict[str, array] = {}
+        self.actions: Dict[str, array] = {}
+        # Per block: the highest timestamp up to its end and the lowest from
+        # its start on. Both only grow along the log, so a time bound can be
+        # bisected even if a few timestamps are out of order
+        self._max_so_far: List[str] = []
+        self._min_from_here: List[str] = []
+        # Where the indexed part of the log ends
+        self.covered = 0
+
+    def observe(self, offset: int, data: bytes):
+        """Audit writer listener: index the events in an append"""
+        with self.lock:
+            # Whatever precedes it; another process's append may be in the
+            # sidecar already, put there by that process
+            self._refresh(offset)
+            end = offset + len(data)
+            if end <= self.covered:
+                return
+            covered = self.covered
+            self._index(entry for entry in self._entries(offset, data) if entry[0] >= covered)
+            self.covered = end
+
+    def rotated(self, target: Path):
+        """Segment listener: the log was rotated, so the index starts over"""
+        with self.lock:
+            self._reset()
+            self._log = None
+            self._sidecar_read = 0
+            self.path.unlink(missing_ok=True)
+
+    def _entries(self, offset: int, data: bytes) -> Iterator[Tuple[int, int, str, Optional[str], Optional[str]]]:
+        """(offset, length, timestamp, journey_id, action) of each event line"""
+        position = offset
+        for line in data.splitlines(keepends=True):
+            start, position = position, position + len(line)
+            if not line.endswith(b"\n") or line.startswith(CHECKPOINT_PREFIX):
+                continue
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if event.get("type") == "checkpoint":
+                continue
+            journey_id = (event.get("metadata") or {}).get("journey_id")
+            yield (
+                start, len(line), str(event.get("timestamp", "")),
+                journey_id if isinstance(journey_id, str) else None, event.get("action")
+            )
+
+    def _index(self, entries: Iterator[Tuple[int, int, str, Optional[str], Optional[str]]], persist: bool = True):
+        lines = []
+        end = self.covered
+        for entry in entries:
+            self._remember(*entry)
+            end = entry[0] + entry[1]
+            if persist:
+                lines.append(json.dumps(entry, separators=(",", ":")) + "\n")
+        if lines:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "ab") as f:
+                f.write("".join(lines).encode())
+                # Everything before was taken up first
+                self._sidecar_read = f.tell()
+        self.covered = max(self.covered, end)
+
+    def _remember(self, offset: int, length: int, timestamp: str, journey_id: Optional[str], action: Optional[str]):
+        position = len(self.offsets)
+        self.offsets.append(offset)
+        self.lengths.append(length)
+        if journey_id is not None:
+            self.journeys.setdefault(journey_id, array("q")).append(position)
+        if action is not None:
+            self.actions.setdefault(action, array("q")).append(position)
+
+        if position % self.block == 0:
+            self._max_so_far.append(max(timestamp, self._max_so_far[-1]) if self._max_so_far else timestamp)
+            self._min_from_here.append(timestamp)
+            return
+        if timestamp >= self._max_so_far[-1]:
+            # The usual case: timestamps arrive in order
+            self._max_so_far[-1] = timestamp
+        elif timestamp < self._min_from_here[-1]:
+            # An early timestamp lowers the bound of earlier blocks too
+            i = len(self._min_from_here) - 1
+            while i >= 0 and self._min_from_here[i] > timestamp:
+                self._min_from_here[i] = timestamp
+                i -= 1
+
+    def _refresh(self, limit: Optional[int] = None):
+        """
+        Catch up with the log up to ``limit`` (its end by default)
+
+        Takes up the sidecar's new entries, then indexes the log's bytes
+        past them. Called holding the log's lock file.
+        """
+        log = self.writer.path
+        try:
+            current = os.stat(log)
+        except FileNotFoundError:
+            current = None
+        if self._log is None or current is None or os.fstat(self._log.fileno()).st_ino != current.st_ino:
+            # First use, or a log another process rotated
+            self._reset()
+            self._sidecar_read = 0
+            self._log = open(log, "rb", buffering=0) if current is not None else None
+        if self._log is None:
+            return
+
+        self._adopt(current.st_size)
+        size = current.st_size if limit is None else min(limit, current.st_size)
+        if self.covered < size:
+            start = self.covered
+            data = os.pread(self._log.fileno(), size - start, start)
+            data = data[:data.rfind(b"\n") + 1]
+            self._index(self._entries(start, data))
+            self.covered = start + len(data)
+
+    def _adopt(self, size: int):
+        """Take up the sidecar entries added since it was last read; ``size`` is the log's"""
+        sidecar_size = self.path.stat().st_size if self.path.exists() else 0
+        if sidecar_size < self._sidecar_read:
+            # Started over by another process
+            self._sidecar_read = 0
+        if sidecar_size == self._sidecar_read:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._sidecar_read)
+            text = f.read(sidecar_size - self._sidecar_read)
+        # Whole lines only; a line cut short by a crash is dropped
+        good = text.rfind(b"\n") + 1
+        try:
+            entries = json.loads(b"[" + text[:good - 1].replace(b"\n", b",") + b"]") if good else []
+        except ValueError:
+            entries, good = [], 0
+        entries = [entry for entry in entries if entry[0] >= self.covered]
+        if entries and (entries[-1][0] + entries[-1][1] > size or (not self.offsets and not self._matches(entries[0]))):
+            # Left from a log that was rotated or replaced; index it again from the start
+            entries, good = [], 0
+            self._sidecar_read = 0
+        if self._sidecar_read + good < sidecar_size:
+            with open(self.path, "r+b") as f:
+                f.truncate(self._sidecar_read + good)
+        self._sidecar_read += good
+        self._index(iter(entries), persist=False)
+
+    def _matches(self, entry: List[Any]) -> bool:
+        """Whether a sidecar entry points at an event line of the open log with its timestamp"""
+        offset, length, timestamp = entry[:3]
+        line = os.pread(self._log.fileno(), length, offset)
+        return line.endswith(b"\n") and f'"timestamp": {json.dumps(timestamp)}'.encode() in line
+
+    def positions(
+        self,
+        journey_id: Optional[str] = None,
+        action: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None
+    ) -> List[int]:
+        """Ascending positions of the events that may match; timestamps still need checking"""
+        first, last = 0, len(self.offsets)
+        if start is not None:
+            # Blocks whose running highest timestamp is before start hold nothing later
+            first = bisect.bisect_left(self._max_so_far, start) * self.block
+        if end is not None:
+            # Blocks from which every timestamp is after end hold nothing earlier
+            last = min(last, bisect.bisect_right(self._min_from_here, end) * self.block)
+        if first >= last:
+            return []
+
+        keyed = [
+            postings.get(key, array("q"))
+            for postings, key in ((self.journeys, journey_id), (self.actions, action))
+            if key is not None
+        ]
+        if not keyed:
+            return list(range(first, last))
+        keyed.sort(key=len)
+        smallest = keyed[0]
+        selected = smallest[bisect.bisect_left(smallest, first):bisect.bisect_left(smallest, last)]
+        for other in keyed[1:]:
+            selected = [p for p in selected if _contains(other, p)]
+        return list(selected)
+
+    def read(self, positions: List[int]) -> Iterator[Dict[str, Any]]:
+        """Parse the events at ``positions``, newest first"""
+        if not positions:
+            return
+        fd = self._log.fileno()
+        for stop in range(len(positions), 0, -_READ_RUN):
+            run = positions[max(0, stop - _READ_RUN):stop]
+            if run[-1] - run[0] + 1 == len(run):
+                # Consecutive events: one read for the whole run
+                base = self.offsets[run[0]]
+                data = os.pread(fd, self.offsets[run[-1]] + self.lengths[run[-1]] - base, base)
+                for p in reversed(run):
+                    start = self.offsets[p] - base
+                    yield json.loads(data[start:start + self.lengths[p]])
+                continue
+            for p in reversed(run):
+                yield json.loads(os.pread(fd, self.lengths[p], self.offsets[p]))
+
+    def query(
+        self,
+        journey_id: Optional[str] = None,
+        action: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Matching events, newest first: the active log, then older segments
+
+        ``start`` and ``end`` are ISO timestamps (see ``timestamp_key``).
+        """
+        events: List[Dict[str, Any]] = []
+        # Catch up with every process's appends, then read without holding
+        # up their writers
+        with self.writer.lock, self.segments.lock, self.lock:
+            self._refresh()
+        # The active log and the segment list are read as of the same
+        # rotation; the writer thread waits for them meanwhile
+        with self.segments.lock:
+            with self.lock:
+                for event in self.read(self.positions(journey_id, action, start, end)):
+                    # The time index narrows by block; check each event's own time
+                    if _in_range(event, start, end):
+                        events.append(event)
+                        if limit is not None and len(events) >= limit:
+                            return events
+            segments = self.segments.overlapping(start, end)
+
+        for entry in reversed(segments):
+            remaining = None if limit is None else limit - len(events)
+            events.extend(_scan_segment(self.segments, entry, journey_id, action, start, end, remaining))
+            if limit is not None and len(events) >= limit:
+                break
+        return events
+
+
+def _contains(postings: array, position: int) -> bool:
+    i = bisect.bisect_left(postings, position)
+    return i < len(postings) and postings[i] == position
+
+
+def _in_range(event: Dict[str, Any], start: Optional[str], end: Optional[str]) -> bool:
+    timestamp = str(event.get("timestamp", ""))
+    return (start is None or timestamp >= start) and (end is None or timestamp <= end)
+
+
+def _scan_segment(
+    segments: SegmentStore,
+    entry: Dict[str, Any],
+    journey_id: Optional[str],
+    action: Optional[str],
+    start: Optional[str],
+    end: Optional[str],
+    limit: Optional[int]
+) -> List[Dict[str, Any]]:
+    """The newest ``limit`` matching events of one segment, newest first"""
+    # Events are encoded by json.dumps with its default separators, so a
+    # matching line contains these bytes; lines without them are not parsed
+    needles = [
+        f'"{field}": {json.dumps(value)}'.encode()
+        for field, value in (("journey_id", journey_id), ("action", action))
+        if value is not None
+    ]
+    matches: deque = deque(maxlen=limit)
+    for line in segments.lines(entry):
+        if line.startswith(CHECKPOINT_PREFIX) or not all(needle in line for needle in needles):
+            continue
+        try:
+            event = json.loads(line)
+        except ValueError:
+            continue
+        if journey_id is not None and (event.get("metadata") or {}).get("journey_id") != journey_id:
+            continue
+        if action is not None and event.get("action") != action:
+            continue
+        if _in_range(event, start, end):
+            matches.append(event)
+    return list(reversed(matches))
+
+
+_audit_index: Optional[AuditIndex] = None
+_audit_index_lock = threading.Lock()
+
+
+def get_audit_index() -> AuditIndex:
+    """Get the index for the process-wide audit writer"""
+    global _audit_index
+    chain = get_audit_chain()
+    if _audit_index is None or _audit_index.writer is not chain.writer:
+        with _audit_index_lock:
+            if _audit_index is None or _audit_index.writer is not chain.writer:
+                _audit_index = AuditIndex(chain.writer, chain.segments)
+    return _audit_index
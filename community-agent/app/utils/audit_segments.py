@@ -0,0 +1,435 @@
+"""
+Rotated, compressed audit log segments
+
+``audit.log`` used to grow forever, and every query, verification and
+retention pass paid for its full size. The audit chain now rotates the log
+once it reaches ``AUDIT_SEGMENT_BYTES`` (or, if set, ``AUDIT_SEGMENT_SECONDS``
+after its first event), right after sealing the open checkpoint group, so
+every segment holds whole groups. The rotated file is gzipped in the
+background and described in a manifest next to the log
+(``audit.log.manifest``):
+
+- its sequence numbers, event and checkpoint counts, byte sizes and the
+  SHA-256 of the compressed file
+- its lowest and highest event timestamp, so range queries and range
+  verification skip segments outside the window
+- the hash and checkpoint its first event and first checkpoint follow, and
+  its own last ones, so consecutive segments can be checked to join up
+
+Manifest entries are hash-chained too. Retention drops whole segments (the
+oldest first) by deleting their files and keeping their manifest entry, so
+the chain across the gap can still be proven from the hashes recorded.
+
+Every process writing the log keeps a ``SegmentStore``. The manifest is only
+written under the log's lock file, and read again whenever another process
+has replaced it.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .file_lock import file_lock
+
+logger = logging.getLogger(__name__)
+
+# Rotate the log once it holds this many bytes
+AUDIT_SEGMENT_BYTES = int(os.getenv("AUDIT_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+# Also rotate this long after a segment's first event; 0 rotates by size only
+AUDIT_SEGMENT_SECONDS = float(os.getenv("AUDIT_SEGMENT_SECONDS", "0"))
+# Drop segments whose newest event is older than this; 0 keeps them all
+AUDIT_RETENTION_DAYS = float(os.getenv("AUDIT_RETENTION_DAYS", "0"))
+
+GENESIS = "0" * 64
+
+# Manifest fields covered by an entry's hash; filled in once it is compressed
+_HASHED_FIELDS = (
+    "segment", "first_seq", "last_seq", "events", "checkpoints",
+    "first_prev_hash", "last_hash", "first_prev_checkpoint", "last_checkpoint",
+    "min_timestamp", "max_timestamp", "bytes", "sha256", "prev"
+)
+
+
+def entry_hash(entry: Dict[str, Any]) -> str:
+    body = {key: entry.get(key) for key in _HASHED_FIELDS}
+    return hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest()
+
+
+def timestamp_key(moment: datetime) -> str:
+    """A datetime as comparable with the log's naive UTC ISO timestamps"""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment.isoformat()
+
+
+def _open(path: Path):
+    return gzip.open(path, "rb") if path.suffix == ".gz" else open(path, "rb")
+
+
+def _describe(path: Path) -> Dict[str, Any]:
+    """Sequence numbers, hashes, timestamps and counts of a segment's records"""
+    stats: Dict[str, Any] = {
+        "first_seq": None, "last_seq": None, "events": 0, "checkpoints": 0,
+        "first_prev_hash": None, "last_hash": None,
+        "first_prev_checkpoint": None, "last_checkpoint": None,
+        "min_timestamp": None, "max_timestamp": None, "bytes": 0
+    }
+    with _open(path) as f:
+        for line in f:
+            stats["bytes"] += len(line)
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("type") == "checkpoint":
+                stats["checkpoints"] += 1
+                if stats["first_prev_checkpoint"] is None:
+                    stats["first_prev_checkpoint"] = record.get("prev_checkpoint")
+                stats["last_checkpoint"] = record.get("hash")
+                continue
+
+            if stats["events"] == 0:
+                # Events from before the chain start the log: nothing precedes them
+                stats["first_prev_hash"] = record.get("prev_hash", GENESIS)
+            stats["events"] += 1
+            stats["last_hash"] = record.get("hash")
+            if "seq" in record:
+                if stats["first_seq"] is None:
+                    stats["first_seq"] = record["seq"]
+                stats["last_seq"] = record["seq"]
+            timestamp = str(record.get("timestamp", ""))
+            if stats["min_timestamp"] is None or timestamp < stats["min_timestamp"]:
+                stats["min_timestamp"] = timestamp
+            if stats["max_timestamp"] is None or timestamp > stats["max_timestamp"]:
+                stats["max_timestamp"] = timestamp
+    return stats
+
+
+class SegmentStore:
+    """
+    The audit log's rotated segments and their manifest
+
+    Segments are numbered from 1 and named after the log
+    (``audit.000001.log.gz``); each keeps its checkpoint sidecar
+    (``audit.000001.log.checkpoints``) with byte ranges into the
+    uncompressed segment.
+    """
+
+    def __init__(
+        self,
+        log_path: Path,
+        max_bytes: int = AUDIT_SEGMENT_BYTES,
+        max_seconds: float = AUDIT_SEGMENT_SECONDS
+    ):
+        self.log_path = Path(log_path)
+        self.directory = self.log_path.parent
+        self.manifest_path = self.log_path.with_name(self.log_path.name + ".manifest")
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+
+        # Guards the manifest, and lets a reader see the segment list and the
+        # active log's index change together at a rotation
+        self.lock = threading.RLock()
+        # The audit log's lock file: other processes' writers, rotations and
+        # manifest updates wait for it
+        self.log_lock = file_lock(self.log_path.with_name(self.log_path.name + ".lock"))
+        # Held while a verification reads segment files: rotation is put off,
+        # compression and dropping wait for it
+        self.pinned = threading.Lock()
+
+        self.entries: List[Dict[str, Any]] = []
+        # The manifest file the entries were read from, to notice another process replacing it
+        self._manifest_stamp: Optional[Tuple[int, int, int]] = None
+        self._listeners: List[Callable[[Path], None]] = []
+        self._compressor: Optional[ThreadPoolExecutor] = None
+
+        self._load()
+
+    def segment_path(self, number: int, compressed: bool = True) -> Path:
+        name = f"{self.log_path.stem}.{number:06d}{self.log_path.suffix}"
+        return self.directory / (name + ".gz" if compressed else name)
+
+    def checkpoints_path(self, number: int) -> Path:
+        return self.segment_path(number, compressed=False).with_suffix(self.log_path.suffix + ".checkpoints")
+
+    def add_listener(self, listener: Callable[[Path], None]):
+        """Call ``listener(target)`` under ``lock`` when a rotated log becomes a segment"""
+        self._listeners.append(listener)
+
+    def tail(self) -> Optional[Dict[str, Any]]:
+        """The newest segment's entry, dropped or not"""
+        with self.lock:
+            self._refresh()
+            return self.entries[-1] if self.entries else None
+
+    def next_number(self) -> int:
+        with self.lock:
+            self._refresh()
+            return self.entries[-1]["segment"] + 1 if self.entries else 1
+
+    def live(self) -> List[Dict[str, Any]]:
+        """Entries of the segments still on disk, oldest first"""
+        with self.lock:
+            self._refresh()
+            return [entry for entry in self.entries if not entry.get("dropped_at")]
+
+    def find(self, number: int) -> Optional[Dict[str, Any]]:
+        """The current entry of segment ``number``"""
+        with self.lock:
+            self._refresh()
+            position = number - self.entries[0]["segment"] if self.entries else -1
+            return self.entries[position] if 0 <= position < len(self.entries) else None
+
+    def before(self, entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """The entry of the segment before ``entry``"""
+        return self.find(entry["segment"] - 1)
+
+    def due(self, active_bytes: int, started: Optional[datetime]) -> bool:
+        """Whether the active log should be rotated"""
+        if active_bytes <= 0:
+            return False
+        if active_bytes >= self.max_bytes:
+            return True
+        return bool(
+            self.max_seconds and started is not None
+            and (datetime.utcnow() - started).total_seconds() >= self.max_seconds
+        )
+
+    def sealed(self, target: Path, state: Dict[str, Any]):
+        """
+        Record a rotated log as the next segment and compress it in the background
+
+        Runs on the audit writer thread, right after the rename and under the
+        log's lock file. ``state`` is the chain's position at the rotation
+        (last_seq, last_hash and last_checkpoint).
+        """
+        with self.lock:
+            entry = {
+                "segment": self.next_number(),
+                "file": target.name,
+                "compressed": False,
+                "sealed_at": datetime.utcnow().isoformat(),
+                **state
+            }
+            self.entries.append(entry)
+            self._save()
+            for listener in self._listeners:
+                listener(target)
+        self._compress_later(entry["segment"])
+
+    def lines(self, entry: Dict[str, Any], start: int = 0) -> Iterator[bytes]:
+        """The lines of a segment, compressed or not yet; nothing if it was dropped"""
+        for _ in range(2):
+            with self.lock:
+                if entry.get("dropped_at"):
+                    return
+                path = self.directory / entry["file"]
+            try:
+                f = _open(path)
+            except FileNotFoundError:
+                # Compressed meanwhile, maybe by another process; the entry now names the .gz
+                entry = self.find(entry["segment"]) or entry
+                continue
+            with f:
+                if start:
+                    f.seek(start)
+                yield from f
+            return
+
+    def path(self, entry: Dict[str, Any]) -> Path:
+        with self.lock:
+            return self.directory / entry["file"]
+
+    def overlapping(self, start: Optional[str], end: Optional[str]) -> List[Dict[str, Any]]:
+        """Live segments whose events' timestamps may fall in [start, end]"""
+        return [
+            entry for entry in self.live()
+            if entry.get("min_timestamp") is None
+            or ((start is None or entry["max_timestamp"] >= start) and (end is None or entry["min_timestamp"] <= end))
+        ]
+
+    def check(self) -> List[str]:
+        """Check that the manifest's entries are intact and follow each other"""
+        errors = []
+        previous: Optional[Dict[str, Any]] = None
+        with self.lock:
+            self._refresh()
+            entries = list(self.entries)
+        for entry in entries:
+            if entry.get("compressed"):
+                if entry_hash(entry) != entry.get("hash"):
+                    errors.append(f"Manifest entry of segment {entry['segment']} does not match its hash")
+                if entry.get("prev") != (previous.get("hash") if previous else GENESIS):
+                    errors.append(f"Manifest entry of segment {entry['segment']} does not follow the one before it")
+            if previous is not None and entry.get("first_prev_hash") not in (None, previous.get("last_hash")):
+                errors.append(f"Segment {entry['segment']} does not follow segment {previous['segment']}")
+            if previous is not None and entry.get("first_prev_checkpoint") not in (None, previous.get("last_checkpoint")):
+                errors.append(f"Checkpoints of segment {entry['segment']} do not follow segment {previous['segment']}")
+            previous = entry
+        return errors
+
+    def drop_before(self, cutoff: datetime) -> Dict[str, int]:
+        """
+        Delete the oldest segments whose newest event is before ``cutoff``
+
+        Their manifest entries are kept, marked dropped, so the chain across
+        them can still be checked.
+
+        Returns:
+            Number of segments dropped and bytes reclaimed
+        """
+        dropped = reclaimed = 0
+        key = timestamp_key(cutoff)
+        with self.pinned, self.log_lock, self.lock:
+            self._refresh()
+            for entry in self.entries:
+                if entry.get("dropped_at"):
+                    continue
+                if not entry.get("compressed") or entry["max_timestamp"] is None or entry["max_timestamp"] >= key:
+                    break
+                for path in (self.directory / entry["file"], self.checkpoints_path(entry["segment"])):
+                    try:
+                        reclaimed += path.stat().st_size
+                        path.unlink()
+                    except FileNotFoundError:
+                        pass
+                entry["dropped_at"] = datetime.utcnow().isoformat()
+                dropped += 1
+            if dropped:
+                self._save()
+        return {"dropped_segments": dropped, "reclaimed_bytes": reclaimed}
+
+    def wait(self):
+        """Wait for queued compressions to finish"""
+        if self._compressor is not None:
+            self._compressor.submit(lambda: None).result()
+
+    def close(self):
+        if self._compressor is not None:
+            self._compressor.shutdown(wait=True)
+            self._compressor = None
+
+    def _compress_later(self, number: int):
+        if self._compressor is None:
+            self._compressor = ThreadPoolExecutor(1, thread_name_prefix="audit-segments")
+        try:
+            self._compressor.submit(self._compress, number)
+        except RuntimeError:
+            # The interpreter is shutting down; the next start compresses what is left
+            logger.info("Left audit segment %d uncompressed at shutdown", number)
+
+    def _compress(self, number: int):
+        """Gzip a sealed segment and fill in its manifest entry"""
+        try:
+            entry = self.find(number)
+            if entry is None or entry.get("compressed") or entry.get("dropped_at"):
+                # Another process got to it first
+                return
+            raw = self.segment_path(number, compressed=False)
+            compressed = self.segment_path(number)
+            # Another process may be compressing the same segment
+            partial = compressed.with_name(f"{compressed.name}.{os.getpid()}.tmp")
+            source_path = compressed
+            if raw.exists():
+                with open(raw, "rb") as source, gzip.open(partial, "wb", compresslevel=6) as target:
+                    while True:
+                        chunk = source.read(1024 * 1024)
+                        if not chunk:
+                            break
+                        target.write(chunk)
+                source_path = partial
+            stats = _describe(raw if source_path == partial else compressed)
+            digest = hashlib.sha256()
+            with open(source_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+
+            with self.pinned, self.log_lock, self.lock:
+                entry = self.find(number)
+                if entry is None or entry.get("compressed") or entry.get("dropped_at"):
+                    partial.unlink(missing_ok=True)
+                    return
+                if source_path == partial:
+                    os.replace(partial, compressed)
+                previous = self.before(entry)
+                entry.update(stats)
+                entry.update({
+                    "file": compressed.name,
+                    "compressed": True,
+                    "compressed_bytes": compressed.stat().st_size,
+                    "sha256": digest.hexdigest(),
+                    "prev": previous.get("hash", GENESIS) if previous else GENESIS
+                })
+                entry["hash"] = entry_hash(entry)
+                self._save()
+                raw.unlink(missing_ok=True)
+            logger.info(
+                "Compressed audit segment %d: %d events, %d -> %d bytes",
+                number, entry["events"], entry["bytes"], entry["compressed_bytes"]
+            )
+        except Exception:
+            logger.exception("Compressing audit segment %d failed", number)
+
+    def _refresh(self):
+        """Read the manifest again if another process replaced it; called under ``lock``"""
+        try:
+            stat = self.manifest_path.stat()
+        except FileNotFoundError:
+            return
+        stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if stamp != self._manifest_stamp:
+            self.entries = json.loads(self.manifest_path.read_text()).get("segments", [])
+            self._manifest_stamp = stamp
+
+    def _load(self):
+        """Read the manifest, adopting segments rotated just before a crash"""
+        if self._orphaned():
+            with self.log_lock, self.lock:
+                self._adopt()
+        for entry in self.live():
+            if not entry.get("compressed"):
+                self._compress_later(entry["segment"])
+
+    def _orphaned(self) -> bool:
+        """Whether a log was renamed without its manifest entry being written"""
+        number = self.next_number()
+        return self.segment_path(number, compressed=False).exists() or self.segment_path(number).exists()
+
+    def _adopt(self):
+        # Checked again under the lock: a rotation may just have been finishing
+        number = self.next_number()
+        adopted = False
+        while True:
+            raw = self.segment_path(number, compressed=False)
+            if not raw.exists() and not self.segment_path(number).exists():
+                break
+            stats = _describe(raw if raw.exists() else self.segment_path(number))
+            self.entries.append({
+                "segment": number,
+                "file": raw.name if raw.exists() else self.segment_path(number).name,
+                "compressed": False,
+                "sealed_at": datetime.utcnow().isoformat(),
+                "last_seq": stats["last_seq"],
+                "last_hash": stats["last_hash"],
+                "last_checkpoint": stats["last_checkpoint"]
+            })
+            number += 1
+            adopted = True
+        if adopted:
+            self._save()
+
+    def _save(self):
+        """Replace the manifest; called under ``log_lock`` and ``lock``"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        partial = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+        partial.write_text(json.dumps({"segments": self.entries}, indent=2))
+        os.replace(partial, self.manifest_path)
+        stat = self.manifest_path.stat()
+        self._manifest_stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,380 @@
+"""
+Buffered audit log writer
+
+``log_event`` used to create the artifacts directory, open ``audit.log``,
+write one line and close it again for every event, on the request path. Events
+are now queued for one long-lived writer thread that keeps the log open and
+appends whatever has queued up within a short window as a single write.
+``log_event`` returns as soon as the event is queued; a caller that needs
+the event on disk asks for a durable write and waits for it.
+The writer also renames the log aside (``rotate``), in queue order, so the
+audit chain can cut it into segments without stopping writers.
+
+Every uvicorn worker runs its own writer against the same log. Each batch is
+written holding an ``flock`` on ``audit.log.lock``, after the writer has
+passed what other processes appended since its last batch to its listeners,
+and a sequencer (the audit chain) encodes the batch only then, so chain
+positions are assigned in the order the lines land in the log. Rotation
+happens under the same lock, and a writer whose log was rotated by another
+process (say ``make rotate-audit``) notices by its inode and reopens it.
+
+``AUDIT_FSYNC`` decides when a batch is fsynced:
+
+- ``durable``: only batches holding a durable write
+- ``always``: every batch
+- ``off``: never; durable writes wait for the write only
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Tuple
+
+from .file_lock import file_lock
+
+logger = logging.getLogger(__name__)
+
+AUDIT_LOG_PATH = os.getenv("AUDIT_LOG_PATH", str(Path("_artifacts") / "audit.log"))
+# Longest a queued event waits for others to share its write, in milliseconds
+AUDIT_FLUSH_MS = float(os.getenv("AUDIT_FLUSH_MS", "50"))
+AUDIT_MAX_BATCH = int(os.getenv("AUDIT_MAX_BATCH", "1024"))
+AUDIT_FSYNC = os.getenv("AUDIT_FSYNC", "durable")
+
+AUDIT_FSYNC_POLICIES = ("durable", "always", "off")
+
+# Bytes other processes appended that are read at once to catch up
+_CATCH_UP_BYTES = 4 * 1024 * 1024
+
+# sequence(records, offset) -> lines, for records about to be written at offset
+Sequence = Callable[[List[Any], int], List[bytes]]
+# seal(offset, force) -> (lines to write first, rotation target or None)
+Seal = Callable[[int, bool], Tuple[List[bytes], Optional[Path]]]
+
+
+class _Append:
+    __slots__ = ("records", "durable", "rotate", "timeout", "future")
+
+    def __init__(self, records: List[Any], durable: bool, rotate: bool = False, timeout: Optional[float] = None):
+        self.records = records
+        self.durable = durable
+        self.rotate = rotate
+        self.timeout = timeout
+        self.future: Future = Future()
+
+
+class AuditWriter:
+    """
+    Appends JSONL audit events to ``path`` from a background thread
+
+    Appends are written in submission order. A durable append is written
+    (and fsynced, per ``fsync``) without waiting out the batch window.
+    Writers in other processes sharing ``path`` take turns through the
+    log's lock file.
+    """
+
+    def __init__(
+        self,
+        path: str = AUDIT_LOG_PATH,
+        window_ms: float = AUDIT_FLUSH_MS,
+        max_batch: int = AUDIT_MAX_BATCH,
+        fsync: str = AUDIT_FSYNC
+    ):
+        if fsync not in AUDIT_FSYNC_POLICIES:
+            raise ValueError(f"Unknown audit fsync policy: {fsync}")
+        self.path = Path(path)
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.fsync = fsync
+        # Held across processes while a batch is written or the log rotated
+        self.lock = file_lock(self.path.with_name(self.path.name + ".lock"))
+
+        self.batches = 0
+        self.events_written = 0
+
+        self._queue: "queue.Queue[Optional[_Append]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+        # Where the log ends, as far as the listeners have been told
+        self._end = 0
+        self._sequence: Optional[Sequence] = None
+        self._seal: Optional[Seal] = None
+        self._listeners: List[Callable[[int, bytes], None]] = []
+        self._rotation_listeners: List[Callable[[Optional[Path]], None]] = []
+
+    def append(self, records: List[Any], durable: bool = False) -> Future:
+        """
+        Queue events for the log: encoded JSON lines, or records for the sequencer
+
+        The future resolves once they are written, or durable if ``durable``.
+        """
+        append = _Append(records, durable)
+        self._ensure_started()
+        self._queue.put(append)
+        return append.future
+
+    def set_sequencer(self, sequence: Sequence, seal: Seal):
+        """
+        Encode batches and decide rotations on the writer thread, under ``lock``
+
+        ``sequence(records, offset)`` turns a batch's records into lines
+        about to be written at ``offset``. ``seal(offset, force)`` returns
+        lines to write before a rotation and the rotated log's new name, or
+        None for no rotation; it is asked after every batch (``force``
+        False) and for every ``rotate`` (``force`` True).
+        """
+        self._sequence = sequence
+        self._seal = seal
+
+    def add_listener(self, listener: Callable[[int, bytes], None]):
+        """
+        Call ``listener(offset, data)`` on the writer thread for every append
+
+        ``offset`` is where ``data`` starts in the log. Appends by other
+        processes are reported too, before the next batch is sequenced, all
+        while holding ``lock``.
+        """
+        self._listeners.append(listener)
+
+    def add_rotation_listener(self, listener: Callable[[Optional[Path]], None]):
+        """
+        Call ``listener(target)`` on the writer thread after the log is rotated
+
+        ``target`` is the log's new name, or None if another process rotated
+        it; the next append starts a new log.
+        """
+        self._rotation_listeners.append(listener)
+
+    def rotate(self, timeout: Optional[float] = None) -> Future:
+        """
+        Rename the log aside once everything queued before is written
+
+        The sequencer's ``seal`` names the target. Appends queued after this
+        go to a new log at ``path``. The future resolves to the target, or
+        None if nothing was rotated; it fails with TimeoutError if another
+        process holds the log's lock for longer than ``timeout`` seconds.
+        """
+        append = _Append([], True, rotate=True, timeout=timeout)
+        self._ensure_started()
+        self._queue.put(append)
+        return append.future
+
+    def flush(self):
+        """Wait until every event queued so far is written"""
+        self.append([]).result()
+
+    def close(self):
+        """Write everything already queued and stop the writer thread"""
+        with self._lock:
+            if self._thread is None:
+                return
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                return
+            if first.rotate:
+                self._rotate(first)
+                continue
+            batch = [first]
+            rotation: Optional[_Append] = None
+            deadline = time.monotonic() + self.window
+            # Durable appends and flush() barriers (no events) take only what
+            # is already queued instead of waiting out the window
+            urgent = first.durable or not first.records
+            while len(batch) < self.max_batch:
+                try:
+                    if urgent:
+                        append = self._queue.get_nowait()
+                    else:
+                        append = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if append is None:
+                    stopping = True
+                    break
+                if append.rotate:
+                    # Nothing queued after a rotation may share its batch
+                    rotation = append
+                    break
+                batch.append(append)
+                urgent = urgent or append.durable or not append.records
+            self._write(batch)
+            if rotation is not None:
+                self._rotate(rotation)
+
+    def _write(self, batch: List[_Append]):
+        records = [record for append in batch for record in append.records]
+        with self.lock:
+            try:
+                self._sync()
+                lines = self._sequence(records, self._end) if self._sequence is not None and records else records
+                data = b"".join(lines)
+                offset = self._end
+                self._write_locked(data)
+                if self.fsync == "always" or (self.fsync == "durable" and any(append.durable for append in batch)):
+                    os.fsync(self._fd)
+            except Exception as e:
+                logger.exception("Audit log write failed")
+                for append in batch:
+                    append.future.set_exception(e)
+                return
+
+            self.batches += 1
+            self.events_written += len(records)
+            self._notify(offset, data)
+            try:
+                self._rotate_locked(force=False)
+            except Exception:
+                logger.exception("Audit log rotation failed")
+        for append in batch:
+            append.future.set_result(None)
+
+    def _rotate(self, rotation: _Append):
+        if not self.lock.acquire(rotation.timeout):
+            rotation.future.set_exception(TimeoutError(f"{self.lock.path} is held by another process"))
+            return
+        try:
+            self._sync()
+            target = self._rotate_locked(force=True)
+        except Exception as e:
+            logger.exception("Audit log rotation failed")
+            rotation.future.set_exception(e)
+            return
+        finally:
+            self.lock.release()
+        rotation.future.set_result(target)
+
+    def _sync(self):
+        """Open the log if need be and report what other processes appended to it"""
+        if self._fd is not None:
+            try:
+                current = os.stat(self.path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current != os.fstat(self._fd).st_ino:
+                # Rotated by another process, which sealed what it held
+                os.close(self._fd)
+                self._fd = None
+                self._notify_rotated(None)
+        if self._fd is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+            # Listeners read back what the log held before by themselves
+            self._end = os.fstat(self._fd).st_size
+            if self._end and os.pread(self._fd, 1, self._end - 1) != b"\n":
+                self._finish_line()
+            return
+
+        size = os.fstat(self._fd).st_size
+        while self._end < size:
+            data = os.pread(self._fd, min(size - self._end, _CATCH_UP_BYTES), self._end)
+            if not data:
+                break
+            if self._end + len(data) < size and b"\n" in data:
+                # Whole lines only, the rest with the next read
+                data = data[:data.rfind(b"\n") + 1]
+            offset = self._end
+            self._end += len(data)
+            self._notify(offset, data)
+        if size and self._end == size and os.pread(self._fd, 1, size - 1) != b"\n":
+            self._finish_line()
+
+    def _finish_line(self):
+        # A writer that died mid-line: end its line so ours start on their own
+        offset = self._end
+        self._write_locked(b"\n")
+        self._notify(offset, b"\n")
+
+    def _write_locked(self, data: bytes):
+        try:
+            remaining = memoryview(data)
+            while remaining:
+                remaining = remaining[os.write(self._fd, remaining):]
+        except Exception:
+            # Start over from the log as it is: _sync reopens it
+            os.close(self._fd)
+            self._fd = None
+            raise
+        self._end += len(data)
+
+    def _notify(self, offset: int, data: bytes):
+        if not data:
+            return
+        for listener in self._listeners:
+            try:
+                listener(offset, data)
+            except Exception:
+                logger.exception("Audit log listener failed")
+
+    def _rotate_locked(self, force: bool) -> Optional[Path]:
+        if self._seal is None:
+            return None
+        lines, target = self._seal(self._end, force)
+        if target is None:
+            return None
+        data = b"".join(lines)
+        offset = self._end
+        self._write_locked(data)
+        self._notify(offset, data)
+
+        os.close(self._fd)
+        self._fd = None
+        os.replace(self.path, target)
+        self._end = 0
+        self._notify_rotated(target)
+        return target
+
+    def _notify_rotated(self, target: Optional[Path]):
+        for listener in self._rotation_listeners:
+            try:
+                listener(target)
+            except Exception:
+                logger.exception("Audit log rotation listener failed")
+
+
+_audit_writer: Optional[AuditWriter] = None
+_audit_writer_lock = threading.Lock()
+
+
+def get_audit_writer() -> AuditWriter:
+    """Get the process-wide audit writer, creating it on first use"""
+    global _audit_writer
+    if _audit_writer is None:
+        with _audit_writer_lock:
+            if _audit_writer is None:
+                _audit_writer = AuditWriter()
+    return _audit_writer
+
+
+def shutdown_audit_writer():
+    """Write queued events and stop the writer thread"""
+    global _audit_writer
+    with _audit_writer_lock:
+        if _audit_writer is not None:
+            _audit_writer.close()
+            _audit_writer = None
+
+
+# Scripts that never call shutdown_audit_writer still keep their events
+atexit.register(shutdown_audit_writer)
@@ -0,0 +1,144 @@
+"""
+Content-addressed artifact blobs
+
+The same payload used to be written again with every artifact that carried
+it: each revisit of ``/prefill`` rewrote identical form data, a submission
+repeated its prefill's form data, and the same parent or applicant block
+appeared in every journey that person started. Large sub-objects of an
+artifact's data are now stored once, as a blob named by the SHA-256 of their
+canonical JSON, and the artifact keeps ``{"$blob": "<sha256>"}`` in their
+place. A blob that already exists is not written again.
+
+The artifact index counts each blob's references. A blob whose count drops
+to zero is deleted by ``collect_blobs`` once it has been unused for a grace
+period, which covers a save that reuses the blob between finding it on disk
+and recording its reference.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+BLOB_REF = "$blob"
+
+
+def canonical(value: Any) -> bytes:
+    """The bytes a blob is addressed by: key order and whitespace never change its digest"""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode()
+
+
+def split_blobs(data: Any, min_bytes: int) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Replace the large dict values of an artifact's data with blob references
+
+    Only the top level of ``data`` is split, so fields the artifact index
+    reads (journey_id, step_id, life_event) stay inline.
+
+    Returns:
+        The data with references in place, and the extracted values by digest
+    """
+    if not isinstance(data, dict):
+        return data, {}
+    stub, blobs = {}, {}
+    for key, value in data.items():
+        if isinstance(value, dict) and value:
+            content = canonical(value)
+            if len(content) >= min_bytes:
+                digest = hashlib.sha256(content).hexdigest()
+                blobs[digest] = value
+                value = {BLOB_REF: digest}
+        stub[key] = value
+    return stub, blobs
+
+
+def blob_ref(value: Any) -> str:
+    """The digest ``value`` refers to, or '' if it is not a blob reference"""
+    if isinstance(value, dict) and len(value) == 1:
+        digest = value.get(BLOB_REF)
+        if isinstance(digest, str):
+            return digest
+    return ""
+
+
+def blob_digests(data: Any) -> List[str]:
+    """Digests of every blob an artifact's data refers to"""
+    if not isinstance(data, dict):
+        return []
+    return [digest for digest in map(blob_ref, data.values()) if digest]
+
+
+class BlobStore:
+    """
+    Blob files under ``directory``, fanned out by the first two hex digits
+
+    ``claim`` and ``remove_unused`` are serialised so that a blob being
+    reused is never deleted underneath its new reference.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+
+    def path(self, digest: str) -> Path:
+        return self.directory / digest[:2] / f"{digest}.blob"
+
+    def sizes(self, digests: Iterable[str]) -> Dict[str, int]:
+        """Size on disk of each blob that exists"""
+        sizes = {}
+        for digest in digests:
+            try:
+                sizes[digest] = self.path(digest).stat().st_size
+            except FileNotFoundError:
+                continue
+        return sizes
+
+    def claim(self, digests: Iterable[str]) -> Dict[str, int]:
+        """
+        Mark existing blobs as just used and return their sizes
+
+        Digests missing from the result must be written by the caller.
+        Touching a blob restarts its grace period, so it outlives the gap
+        until the new reference is indexed.
+        """
+        claimed = {}
+        with self._lock:
+            for digest in digests:
+                path = self.path(digest)
+                try:
+                    os.utime(path)
+                    claimed[digest] = path.stat().st_size
+                except FileNotFoundError:
+                    continue
+        return claimed
+
+    def remove_unused(self, digests: Iterable[str], grace_seconds: float) -> List[str]:
+        """
+        Delete unreferenced blobs not used within ``grace_seconds``
+
+        Returns:
+            Digests whose files are gone, including ones already missing
+        """
+        cutoff = time.time() - grace_seconds
+        removed = []
+        with self._lock:
+            for digest in digests:
+                path = self.path(digest)
+                try:
+                    if path.stat().st_mtime > cutoff:
+                        continue
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                removed.append(digest)
+        return removed
+
+    def scan(self) -> Iterable[Tuple[str, int]]:
+        """(digest, size) of every blob on disk"""
+        if not self.directory.exists():
+            return
+        for path in self.directory.glob("*/*.blob"):
+            yield path.stem, path.stat().st_size
@@ -0,0 +1,87 @@
+"""
+Artifact read cache
+
+``load_artifact`` used to open and decode the file on every call, although
+the same intake is read again and again by prefill, submission and
+caseworker views. Decoded artifacts are now kept in an LRU cache with a byte
+budget. Each entry carries the version it was read at (inode, mtime and size
+for files, the segment and offset for packed artifacts), so a rewritten
+artifact is never served stale even if the write bypassed ``save_artifact``.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class ArtifactCache:
+    """
+    Least-recently-used cache of decoded artifacts, bounded by bytes
+
+    An entry's cost is the artifact's uncompressed encoded size, a stand-in
+    for its size in memory. Cached artifacts are shared between callers and
+    must not be modified.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries: "OrderedDict[str, Tuple[Hashable, Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str, version: Hashable) -> Optional[Any]:
+        """Return the cached artifact if it was read at ``version``, else None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+
+    def put(self, key: str, version: Hashable, value: Any, size: int) -> None:
+        """Cache an artifact read at ``version``, evicting the least recently used"""
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (version, value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None
+            }
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
@@ -0,0 +1,260 @@
+"""
+Append-only consent ledger
+
+``log_consent`` used to read the whole ``consent_ledger.json``, append one
+consent and rewrite the file, and ``verify_consent`` parsed it and scanned
+every consent on each check. Consents are now appended to
+``consent_ledger.jsonl``, one JSON line per grant, and kept in a
+process-wide index:
+
+- by consent_id: the consent with its scopes as a set and its expiry
+- by journey_id: the journey's consent IDs
+
+so a check is a dict lookup, a set lookup and one comparison. A snapshot of
+every consent, with the log offset it covers, is written every
+``CONSENT_SNAPSHOT_EVERY`` grants; on startup the index is rebuilt from the
+snapshot plus the lines appended after it. A ledger still in the old
+``consent_ledger.json`` format is converted on first use.
+
+The summary counts (total, active, expired, consents per scope and active
+consents per scope) are kept as consents are indexed. Active consents sit in
+a min-heap by expiry that each summary drains up to the current time,
+moving the ones that have lapsed to expired, so a summary costs O(1) plus
+the consents that expired since the last one.
+
+Other worker processes append to the same log. A lookup that misses reads
+whatever they appended since (grants never change, so a hit needs no check).
+"""
+
+import heapq
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from .writer import VAULT_FSYNC, get_vault_writer
+
+logger = logging.getLogger(__name__)
+
+CONSENT_LEDGER_PATH = os.getenv("CONSENT_LEDGER_PATH", str(Path("_artifacts") / "consent_ledger.jsonl"))
+# Grants between snapshots of the index
+CONSENT_SNAPSHOT_EVERY = int(os.getenv("CONSENT_SNAPSHOT_EVERY", "1000"))
+
+
+def consent_expiry(consent: Dict[str, Any]) -> datetime:
+    """When a consent ends: ``granted_at`` plus ``ttl_days``, as naive UTC"""
+    granted_at = datetime.fromisoformat(consent["granted_at"].replace('Z', '+00:00'))
+    if granted_at.tzinfo is not None:
+        granted_at = granted_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return granted_at + timedelta(days=consent.get("ttl_days", 30))
+
+
+class _Entry:
+    __slots__ = ("consent", "scopes", "expires_at")
+
+    def __init__(self, consent: Dict[str, Any]):
+        self.consent = consent
+        self.scopes: Set[str] = set(consent.get("consent_scope", []))
+        self.expires_at = consent_expiry(consent)
+
+
+class ConsentLedger:
+    """
+    Consents appended to a JSONL log, indexed in memory by consent and journey
+    """
+
+    def __init__(self, path: str = CONSENT_LEDGER_PATH, snapshot_every: int = CONSENT_SNAPSHOT_EVERY):
+        self.path = Path(path)
+        self.snapshot_path = self.path.with_name(self.path.stem + ".snapshot.json")
+        self.legacy_path = self.path.with_suffix(".json")
+        self.snapshot_every = snapshot_every
+        self.lock = threading.Lock()
+
+        self._loaded = False
+        self._by_id: Dict[str, _Entry] = {}
+        self._by_journey: Dict[str, List[str]] = {}
+        # Summary counts, and (expiry, consent_id) of every consent still counted active
+        self._active = 0
+        self._expired = 0
+        self._scopes: Dict[str, int] = {}
+        self._active_scopes: Dict[str, int] = {}
+        self._expiries: List[Tuple[datetime, str]] = []
+        # Bytes of the log read into the index, and grants since the last snapshot
+        self._offset = 0
+        self._unsnapshotted = 0
+        self._fd: Optional[int] = None
+
+    def grant(self, consent: Dict[str, Any]):
+        """Append a consent to the log and the index"""
+        line = (json.dumps(consent, default=str) + "\n").encode()
+        with self.lock:
+            self._load()
+            if self._fd is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            # One write per grant: O_APPEND keeps concurrent appenders' lines whole
+            os.write(self._fd, line)
+            if VAULT_FSYNC != "off":
+                os.fsync(self._fd)
+            # Read back into the index with whatever other processes appended
+            self._refresh()
+            snapshot = self._snapshot() if self._unsnapshotted >= self.snapshot_every else None
+        if snapshot is not None:
+            get_vault_writer().write(str(self.snapshot_path), snapshot).result()
+
+    def verify(self, consent_id: str, required_scope: str, now: Optional[datetime] = None) -> bool:
+        """Whether ``consent_id`` exists, covers ``required_scope`` and has not expired"""
+        entry = self._get(consent_id)
+        return entry is not None and required_scope in entry.scopes and (now or datetime.utcnow()) < entry.expires_at
+
+    def verify_journey(self, journey_id: str, required_scope: str, now: Optional[datetime] = None) -> bool:
+        """Whether any unexpired consent of ``journey_id`` covers ``required_scope``"""
+        now = now or datetime.utcnow()
+        with self.lock:
+            self._load()
+            self._refresh()
+            entries = [self._by_id[consent_id] for consent_id in self._by_journey.get(journey_id, [])]
+        return any(required_scope in entry.scopes and now < entry.expires_at for entry in entries)
+
+    def get(self, consent_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._get(consent_id)
+        return entry.consent if entry is not None else None
+
+    def consents(self) -> Iterator[Dict[str, Any]]:
+        """Every consent, in the order granted"""
+        with self.lock:
+            self._load()
+            self._refresh()
+            entries = list(self._by_id.values())
+        return (entry.consent for entry in entries)
+
+    def summary(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Counts of total, active and expired consents and consents per scope"""
+        now = now or datetime.utcnow()
+        with self.lock:
+            self._load()
+            self._refresh()
+            # Lapsed since the last summary
+            while self._expiries and self._expiries[0][0] <= now:
+                _, consent_id = heapq.heappop(self._expiries)
+                self._active -= 1
+                self._expired += 1
+                for scope in self._by_id[consent_id].scopes:
+                    self._active_scopes[scope] -= 1
+                    if not self._active_scopes[scope]:
+                        del self._active_scopes[scope]
+            return {
+                "total_consents": len(self._by_id),
+                "active_consents": self._active,
+                "expired_consents": self._expired,
+                "scope_breakdown": dict(self._scopes),
+                "active_scope_breakdown": dict(self._active_scopes)
+            }
+
+    def close(self):
+        with self.lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def _get(self, consent_id: str) -> Optional[_Entry]:
+        entry = self._by_id.get(consent_id) if self._loaded else None
+        if entry is None:
+            # Not seen yet: maybe granted by another process
+            with self.lock:
+                self._load()
+                self._refresh()
+                entry = self._by_id.get(consent_id)
+        return entry
+
+    def _index(self, consent: Dict[str, Any]):
+        consent_id = consent.get("consent_id")
+        if not consent_id or consent_id in self._by_id:
+            return
+        try:
+            entry = self._by_id[consent_id] = _Entry(consent)
+        except (KeyError, TypeError, ValueError):
+            logger.warning("Skipping unreadable consent %s", consent_id)
+            return
+        self._by_journey.setdefault(consent.get("journey_id"), []).append(consent_id)
+
+        for scope in consent.get("consent_scope", []):
+            self._scopes[scope] = self._scopes.get(scope, 0) + 1
+        # Counted active until a summary finds it lapsed
+        self._active += 1
+        for scope in entry.scopes:
+            self._active_scopes[scope] = self._active_scopes.get(scope, 0) + 1
+        heapq.heappush(self._expiries, (entry.expires_at, consent_id))
+
+    def _refresh(self):
+        """Index the lines appended to the log since it was last read"""
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            return
+        if size <= self._offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(size - self._offset)
+        # A line still being written by another process is read next time
+        data = data[:data.rfind(b"\n") + 1]
+        for line in data.splitlines():
+            try:
+                self._index(json.loads(line))
+            except ValueError:
+                logger.warning("Skipping unreadable consent ledger line")
+                continue
+            self._unsnapshotted += 1
+        self._offset += len(data)
+
+    def _load(self):
+        """Rebuild the index from the latest snapshot and the log after it"""
+        if self._loaded:
+            return
+        if not self.path.exists() and self.legacy_path.exists():
+            self._convert_legacy()
+
+        if self.snapshot_path.exists():
+            try:
+                snapshot = json.loads(self.snapshot_path.read_text())
+                size = self.path.stat().st_size if self.path.exists() else 0
+                if snapshot["offset"] <= size:
+                    for consent in snapshot["consents"]:
+                        self._index(consent)
+                    self._offset = snapshot["offset"]
+            except (ValueError, KeyError):
+                logger.warning("Ignoring unreadable consent ledger snapshot")
+        self._refresh()
+        self._loaded = True
+
+    def _snapshot(self) -> bytes:
+        self._unsnapshotted = 0
+        return json.dumps({
+            "offset": self._offset,
+            "consents": [entry.consent for entry in self._by_id.values()]
+        }, default=str).encode()
+
+    def _convert_legacy(self):
+        with open(self.legacy_path, 'r') as f:
+            consents = json.load(f).get("consents", [])
+        encoded = "".join(json.dumps(consent, default=str) + "\n" for consent in consents).encode()
+        get_vault_writer().write(str(self.path), encoded).result()
+        logger.info("Converted %d consents from %s to %s", len(consents), self.legacy_path, self.path)
+
+
+_consent_ledger: Optional[ConsentLedger] = None
+_consent_ledger_lock = threading.Lock()
+
+
+def get_consent_ledger() -> ConsentLedger:
+    """Get the process-wide consent ledger, creating it on first use"""
+    global _consent_ledger
+    if _consent_ledger is None:
+        with _consent_ledger_lock:
+            if _consent_ledger is None:
+                _consent_ledger = ConsentLedger()
+    return _consent_ledger
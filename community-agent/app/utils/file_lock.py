@@ -0,0 +1,89 @@
+"""
+Lock shared by the threads of a process and by other processes
+
+Uvicorn workers each run their own audit writer against the same log, so a
+thread lock alone lets them interleave. ``FileLock`` takes an ``flock`` on
+a lock file next to the guarded files as well. ``flock`` belongs to the open
+file, so the lock is re-entrant within a process and handed out per path by
+``file_lock``: every user of a path in one process shares the same ``flock``.
+"""
+
+import fcntl
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, IO, Optional
+
+# How often a timed acquire retries an flock held by another process
+_POLL_SECONDS = 0.01
+
+
+class FileLock:
+    """Re-entrant lock across threads (``RLock``) and processes (``flock``)"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._file: Optional[IO] = None
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Take the lock, or give up after ``timeout`` seconds and return False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if not self._lock.acquire(timeout=-1 if timeout is None else timeout):
+            return False
+        if self._depth:
+            self._depth += 1
+            return True
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            lock_file = open(self.path, "a")
+            try:
+                while True:
+                    try:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX if deadline is None else fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        if time.monotonic() >= deadline:
+                            lock_file.close()
+                            self._lock.release()
+                            return False
+                        time.sleep(_POLL_SECONDS)
+            except BaseException:
+                lock_file.close()
+                raise
+        except BaseException:
+            self._lock.release()
+            raise
+        self._file = lock_file
+        self._depth = 1
+        return True
+
+    def release(self):
+        self._depth -= 1
+        if not self._depth:
+            # Closing the file drops the flock
+            self._file.close()
+            self._file = None
+        self._lock.release()
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+_file_locks: Dict[str, FileLock] = {}
+_file_locks_lock = threading.Lock()
+
+
+def file_lock(path: Path) -> FileLock:
+    """The process's lock for ``path``, shared by everyone who asks for it"""
+    key = os.path.abspath(path)
+    with _file_locks_lock:
+        if key not in _file_locks:
+            _file_locks[key] = FileLock(Path(key))
+        return _file_locks[key]
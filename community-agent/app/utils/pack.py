@@ -0,0 +1,244 @@
+"""
+Pack-file artifact storage
+
+With the files backend every intake, prefill and submission is its own small
+file, so a large vault is bound by inodes and per-file open/stat/close calls
+rather than bytes. The pack backend appends artifacts to size-capped segment
+files instead. The artifact index records each artifact's segment and
+offset, and reads slice a shared read-only ``mmap`` of the segment, so a read
+costs no syscalls once the segment is mapped.
+
+A segment is a sequence of records, each a fixed header followed by the
+artifact path and a payload:
+
+- ``PUT``: the payload is the encoded artifact
+- ``DEL``: the payload is the (segment, offset) of the ``PUT`` it removes
+
+Records are only ever appended, so file order is write order and the index
+can be rebuilt by replaying the segments. Removing an artifact leaves its
+bytes in place; ``compact`` copies the live records of a mostly dead
+segment to the active one and deletes the old segment.
+"""
+
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+PUT = b"P1"
+DEL = b"D1"
+
+# tag, path length, payload length, payload crc32
+RECORD_HEADER = struct.Struct("<2sHII")
+TARGET = struct.Struct("<IQ")
+
+
+class PackRecord(NamedTuple):
+    kind: bytes
+    path: str
+    offset: int  # of the payload within the segment
+    length: int
+    target: Optional[Tuple[int, int]] = None  # (segment, offset) removed by a DEL record
+
+
+class PackStore:
+    """
+    Append-only segment files under ``directory``
+
+    Appends from threads and from other processes sharing the directory are
+    serialised with a lock file, so every process sees one write order.
+    """
+
+    def __init__(self, directory: Path, max_segment_bytes: int = 64 * 1024 * 1024, fsync: bool = False):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_segment_bytes = max_segment_bytes
+        # fsync once per append: a group of artifacts is one durable write
+        self.fsync = fsync
+
+        self._lock = threading.Lock()
+        # Where each segment's records are known to end intact, so an append
+        # only checks what was written since
+        self._intact: Dict[int, int] = {}
+        self._maps: Dict[int, mmap.mmap] = {}
+        self._maps_lock = threading.Lock()
+
+    def segment_path(self, segment: int) -> Path:
+        return self.directory / f"segment_{segment:06d}.pack"
+
+    def segments(self) -> List[int]:
+        """Existing segment numbers, oldest first"""
+        return sorted(int(path.stem.split("_")[1]) for path in self.directory.glob("segment_*.pack"))
+
+    def segment_size(self, segment: int) -> int:
+        return self.segment_path(segment).stat().st_size
+
+    def active_segment(self) -> Optional[int]:
+        """The segment appends currently go to; it is never compacted"""
+        segments = self.segments()
+        return segments[-1] if segments else None
+
+    def append_many(self, artifacts: List[Tuple[str, bytes]]) -> List[Tuple[int, int]]:
+        """
+        Append encoded artifacts with one write
+
+        Returns:
+            (segment, offset) of each artifact's payload, in order
+        """
+        return self._append([(PUT, path, payload) for path, payload in artifacts])
+
+    def delete_many(self, removed: List[Tuple[str, int, int]]) -> None:
+        """Record that (path, segment, offset) artifacts were removed"""
+        self._append([(DEL, path, TARGET.pack(segment, offset)) for path, segment, offset in removed])
+
+    def read(self, segment: int, offset: int, length: int) -> bytes:
+        """Read one payload through the segment's mmap"""
+        with self._maps_lock:
+            mapped = self._maps.get(segment)
+            if mapped is None or offset + length > len(mapped):
+                # New segment, or the active segment grew since it was mapped
+                if mapped is not None:
+                    mapped.close()
+                else:
+                    self._unmap_removed()
+                with open(self.segment_path(segment), "rb") as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._maps[segment] = mapped
+            if offset + length > len(mapped):
+                raise ValueError(f"Artifact at {segment}:{offset} is past the end of its segment")
+            return mapped[offset:offset + length]
+
+    def scan(self, segment: int) -> Iterator[PackRecord]:
+        """
+        Yield the records of a segment in write order
+
+        Stops at a torn or corrupt record, which can only be the tail of a
+        write interrupted by a crash.
+        """
+        with open(self.segment_path(segment), "rb") as f:
+            data = f.read()
+        for record, _ in _records(data):
+            yield record
+
+    def compact(self, segment: int, live_offsets: Set[int]) -> List[Tuple[str, int, int, int]]:
+        """
+        Copy the live records of a segment to the active segment
+
+        ``live_offsets`` are the payload offsets the index still points at.
+        ``DEL`` records are kept while the segment they refer to exists. The
+        segment itself is not deleted; call ``remove_segment`` once the index
+        points at the copies.
+
+        Raises:
+            ValueError: if some live offsets are not readable records (past a
+                corrupt one), so the segment must not be removed
+
+        Returns:
+            (path, old offset, new segment, new offset) of each moved artifact
+        """
+        existing = set(self.segments())
+        puts: List[Tuple[str, int, bytes]] = []
+        dels: List[Tuple[bytes, str, bytes]] = []
+        for record in self.scan(segment):
+            if record.kind == PUT and record.offset in live_offsets:
+                puts.append((record.path, record.offset, self.read(segment, record.offset, record.length)))
+            elif record.kind == DEL and record.target[0] != segment and record.target[0] in existing:
+                dels.append((DEL, record.path, TARGET.pack(*record.target)))
+        missed = live_offsets - {offset for _, offset, _ in puts}
+        if missed:
+            raise ValueError(f"Segment {segment} has {len(missed)} live artifacts past a corrupt record")
+
+        locations = self._append([(PUT, path, payload) for path, _, payload in puts] + dels)
+        return [
+            (path, old_offset, new_segment, new_offset)
+            for (path, old_offset, _), (new_segment, new_offset) in zip(puts, locations)
+        ]
+
+    def remove_segment(self, segment: int) -> None:
+        with self._maps_lock:
+            mapped = self._maps.pop(segment, None)
+            if mapped is not None:
+                mapped.close()
+        self.segment_path(segment).unlink(missing_ok=True)
+
+    def _unmap_removed(self) -> None:
+        """Release maps of segments another process compacted away, freeing their disk space"""
+        for segment in [segment for segment in self._maps if not self.segment_path(segment).exists()]:
+            self._maps.pop(segment).close()
+
+    def close(self) -> None:
+        with self._maps_lock:
+            for mapped in self._maps.values():
+                mapped.close()
+            self._maps.clear()
+
+    def _append(self, records: List[Tuple[bytes, str, bytes]]) -> List[Tuple[int, int]]:
+        if not records:
+            return []
+        encoded = []
+        for kind, path, payload in records:
+            path_bytes = path.encode()
+            encoded.append((RECORD_HEADER.pack(kind, len(path_bytes), len(payload), zlib.crc32(payload)) + path_bytes, payload))
+        batch_bytes = sum(len(header) + len(payload) for header, payload in encoded)
+
+        with self._lock, open(self.directory / ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            segment = self.active_segment()
+            if segment is None:
+                segment = 1
+            else:
+                size = self.segment_size(segment)
+                if self._intact_end(segment, size) < size:
+                    # A crash left a torn record: records after it would be
+                    # invisible to scan, so start a new segment
+                    segment += 1
+                elif 0 < size and size + batch_bytes > self.max_segment_bytes:
+                    segment += 1
+
+            with open(self.segment_path(segment), "ab") as f:
+                position = f.tell()
+                locations = []
+                for header, payload in encoded:
+                    locations.append((segment, position + len(header)))
+                    position += len(header) + len(payload)
+                f.write(b"".join(header + payload for header, payload in encoded))
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            self._intact[segment] = position
+        return locations
+
+    def _intact_end(self, segment: int, size: int) -> int:
+        """Where the intact records of ``segment`` end; less than ``size`` after a torn write"""
+        start = self._intact.get(segment, 0)
+        if start > size:
+            start = 0
+        end = start
+        if start < size:
+            with open(self.segment_path(segment), "rb") as f:
+                f.seek(start)
+                data = f.read(size - start)
+            for _, record_end in _records(data):
+                end = start + record_end
+            self._intact[segment] = end
+        return end
+
+
+def _records(data: bytes) -> Iterator[Tuple[PackRecord, int]]:
+    """Each record in ``data`` and where it ends, up to a torn or corrupt one"""
+    position = 0
+    while position + RECORD_HEADER.size <= len(data):
+        kind, path_length, length, crc = RECORD_HEADER.unpack_from(data, position)
+        path_start = position + RECORD_HEADER.size
+        offset = path_start + path_length
+        payload = data[offset:offset + length]
+        if kind not in (PUT, DEL) or len(payload) != length or zlib.crc32(payload) != crc:
+            return
+        path = data[path_start:offset].decode()
+        target = TARGET.unpack(payload) if kind == DEL else None
+        yield PackRecord(kind, path, offset, length, target), offset + length
+        position = offset + length
@@ -0,0 +1,29 @@
+import sqlite3
+import threading
+from pathlib import Path
+
+
+class ThreadLocalSQLite:
+    """
+    Per-thread SQLite connections to one WAL-mode database file
+
+    sqlite3 connections must not be shared across threads, and the stores run
+    their queries on the I/O pool, so each thread lazily opens its own. WAL
+    lets any number of processes read while one writes.
+    """
+
+    def __init__(self, db_path: str, busy_timeout_ms: int = 5000):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=self.busy_timeout_ms / 1000)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+        return conn
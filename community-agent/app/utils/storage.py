@@ -1,147 +1,1271 @@
+import hashlib
 import json
+import os
 import shutil
-from datetime import datetime, timedelta
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .artifact_codec import ArtifactCodec, decode, decode_sized, describe, get_artifact_codec
+from .blobs import BlobStore, blob_digests, blob_ref, split_blobs
+from .cache import ArtifactCache
+from .pack import DEL, PUT, PackStore
+from .sqlite import ThreadLocalSQLite
+from .writer import VAULT_FSYNC, get_vault_writer
 
 
 def get_vault_path(journey_id: str) -> Path:
-    """Get the vault path for a specific journey"""
+    """Get the vault path for a specific journey (``vault/ab/cd/<journey_id>``)"""
     artifacts_dir = Path("_artifacts")
-    vault_dir = artifacts_dir / "vault" / journey_id
-    vault_dir.mkdir(parents=True, exist_ok=True)
+    vault_dir = artifacts_dir / "vault" / Path(*vault_shard(journey_id)) / journey_id
+    # Packed artifacts only use the path as their key
+    if ARTIFACT_BACKEND != "pack":
+        vault_dir.mkdir(parents=True, exist_ok=True)
     return vault_dir
 
 
+def vault_shard(journey_id: str) -> Tuple[str, str]:
+    """
+    Two-level hash prefix a journey is filed under in the vault
+    
+    A flat vault directory holding every journey slows down badly past a
+    few hundred thousand entries; 65,536 shards keep each directory small.
+    Journey IDs already end in a hash, which is used directly so the shard
+    can be read off the ID; other IDs are hashed.
+    """
+    suffix = journey_id[len("journey_"):].lower() if journey_id.startswith("journey_") else ""
+    if len(suffix) < 4 or any(c not in "0123456789abcdef" for c in suffix[:4]):
+        suffix = hashlib.sha256(journey_id.encode()).hexdigest()
+    return suffix[:2], suffix[2:4]
+
+
+def _split_vault_path(file_path: Path) -> Optional[Tuple[Tuple[str, ...], str, Tuple[str, ...], bool]]:
+    """
+    Split an artifact path into (vault root, journey ID, path within the journey, sharded)
+    
+    Understands both the sharded layout and the flat ``vault/<journey_id>/``
+    layout it replaced.
+    """
+    parts = file_path.parts
+    for position, part in enumerate(parts[:-1]):
+        if part != "vault":
+            continue
+        root, rest = parts[:position + 1], parts[position + 1:]
+        if len(rest) >= 4 and (rest[0], rest[1]) == vault_shard(rest[2]):
+            return root, rest[2], rest[3:], True
+        if len(rest) >= 2:
+            return root, rest[0], rest[1:], False
+    return None
+
+
+def _other_layout_path(file_path: Path) -> Optional[Path]:
+    """The same artifact's path in the other vault layout (flat <-> sharded)"""
+    split = _split_vault_path(file_path)
+    if split is None:
+        return None
+    root, journey_id, rest, sharded = split
+    if sharded:
+        return Path(*root, journey_id, *rest)
+    return Path(*root, *vault_shard(journey_id), journey_id, *rest)
+
+
 def save_artifact(path: str, data: Any, artifact_type: str):
-    """Save an artifact to the specified path"""
-    file_path = Path(path)
-    file_path.parent.mkdir(parents=True, exist_ok=True)
+    """Save an artifact to the specified path and record it in the index"""
+    entry = _store_artifacts([(path, data, artifact_type)])[0]
+    get_artifact_index().record_many([entry])
+    
+    print(f"Artifact saved: {entry['path']}")
+
+
+def save_artifacts(artifacts: Iterable[Tuple[str, Any, str]]) -> int:
+    """
+    Save several artifacts as one group
+    
+    Args:
+        artifacts: (path, data, artifact_type) tuples
+    
+    Returns:
+        Number of artifacts written
+    """
+    entries = _store_artifacts(list(artifacts))
+    
+    # One index transaction for the whole group
+    get_artifact_index().record_many(entries)
+    
+    print(f"Artifacts saved: {len(entries)}")
+    
+    return len(entries)
+
+
+def _store_artifacts(artifacts: List[Tuple[str, Any, str]]) -> List[Dict[str, Any]]:
+    """
+    Write artifacts with the configured backend and return their index entries
+    
+    Large parts of each artifact's data are split off into content-addressed
+    blobs first; only blobs not already on disk are written, in the same
+    batch as the artifacts.
+    """
+    codec = get_artifact_codec()
+    records, found = [], {}
+    for path, data, artifact_type in artifacts:
+        stub, blobs = split_blobs(data, BLOB_MIN_BYTES)
+        records.append((path, _artifact_record(stub, artifact_type)))
+        found.update(blobs)
+    encoded = [codec.encode(artifact_data) for _, artifact_data in records]
+    
+    store = get_blob_store()
+    blob_sizes = store.claim(found)
+    blob_writes = []
+    for digest, value in found.items():
+        if digest not in blob_sizes:
+            payload = codec.encode(value)
+            blob_sizes[digest] = len(payload)
+            blob_writes.append((str(store.path(digest)), payload))
+    
+    cache = get_artifact_cache()
+    for path, _ in records:
+        cache.invalidate(str(Path(path)))
+    
+    if ARTIFACT_BACKEND != "pack":
+        # Blocks until the group is durable; concurrent callers share the commit
+        get_vault_writer().write_many(
+            [(path, payload) for (path, _), payload in zip(records, encoded)] + blob_writes
+        ).result()
+        return [
+            _index_entry(Path(path), artifact_data, len(payload), blob_sizes=blob_sizes)
+            for (path, artifact_data), payload in zip(records, encoded)
+        ]
     
-    # Add metadata to the artifact
-    artifact_data = {
+    # Blobs stay files; they must be durable before anything refers to them
+    get_vault_writer().write_many(blob_writes).result()
+    # One append for the whole group
+    locations = get_pack_store().append_many([(path, payload) for (path, _), payload in zip(records, encoded)])
+    
+    return [
+        _index_entry(Path(path), artifact_data, len(payload), location, blob_sizes)
+        for (path, artifact_data), payload, location in zip(records, encoded, locations)
+    ]
+
+
+def _artifact_record(data: Any, artifact_type: str) -> Dict[str, Any]:
+    """Wrap artifact data with its metadata"""
+    return {
         "type": artifact_type,
         "created_at": datetime.utcnow().isoformat(),
         "data": data
     }
-    
-    with open(file_path, 'w') as f:
-        json.dump(artifact_data, f, indent=2, default=str)
-    
-    print(f"Artifact saved: {file_path}")
+
+
+def _index_entry(
+    file_path: Path,
+    artifact_data: Dict[str, Any],
+    size: int,
+    location: Optional[Tuple[int, int]] = None,
+    blob_sizes: Optional[Dict[str, int]] = None
+) -> Dict[str, Any]:
+    data = artifact_data.get("data")
+    fields = data if isinstance(data, dict) else {}
+    segment, pack_offset = location or (None, None)
+    blob_sizes = blob_sizes or {}
+    return {
+        "path": str(file_path),
+        "journey_id": fields.get("journey_id") or _journey_id_from_path(file_path),
+        "life_event": fields.get("life_event"),
+        "type": artifact_data.get("type"),
+        "step_id": fields.get("step_id"),
+        "size": size,
+        "created_at": artifact_data.get("created_at"),
+        "segment": segment,
+        "pack_offset": pack_offset,
+        "blobs": {digest: blob_sizes.get(digest, 0) for digest in blob_digests(data)}
+    }
+
+
+def _journey_id_from_path(file_path: Path) -> Optional[str]:
+    """Vault artifacts live under .../vault/ab/cd/<journey_id>/... (or the older .../vault/<journey_id>/...)"""
+    split = _split_vault_path(file_path)
+    return split[1] if split else None
 
 
 def load_artifact(path: str) -> Dict[str, Any]:
-    """Load an artifact from the specified path"""
+    """
+    Load an artifact from the specified path, whichever codec and backend wrote it
+    
+    Paths in the flat vault layout keep working after their journey moved
+    to the sharded layout, and the other way round.
+    
+    Blob references are replaced with the blobs' contents, so callers see
+    the artifact as it was saved.
+    
+    Repeat reads are served from the artifact cache while the artifact is
+    unchanged. The returned dict is shared with the cache; copy it before
+    modifying it.
+    """
     file_path = Path(path)
+    candidates = [file_path]
+    other = _other_layout_path(file_path)
+    if other is not None:
+        candidates.append(other)
+    
+    if ARTIFACT_BACKEND != "pack":
+        for candidate in candidates:
+            try:
+                return _load_file(candidate, candidate.stat())
+            except FileNotFoundError:
+                continue
+    
+    for candidate in candidates:
+        artifact = _load_packed(str(candidate))
+        if artifact is not None:
+            return artifact
     
-    if not file_path.exists():
-        raise FileNotFoundError(f"Artifact not found: {path}")
+    # Files written before switching to the pack backend
+    if ARTIFACT_BACKEND == "pack":
+        for candidate in candidates:
+            if candidate.exists():
+                return _load_file(candidate, candidate.stat())
     
-    with open(file_path, 'r') as f:
-        return json.load(f)
+    raise FileNotFoundError(f"Artifact not found: {path}")
 
 
-def cleanup_expired_artifacts(ttl_days: int = 30):
-    """Clean up expired artifacts based on TTL"""
-    artifacts_dir = Path("_artifacts")
-    vault_dir = artifacts_dir / "vault"
+def _load_file(file_path: Path, stat: os.stat_result) -> Dict[str, Any]:
+    # An atomic rewrite always changes the inode, even within one mtime tick
+    version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    cache = get_artifact_cache()
+    artifact = cache.get(str(file_path), version)
+    if artifact is None:
+        artifact, size = _resolve_blobs(*decode_sized(file_path.read_bytes()))
+        cache.put(str(file_path), version, artifact, size)
+    return artifact
+
+
+def _load_packed(path: str) -> Optional[Dict[str, Any]]:
+    cache = get_artifact_cache()
+    # A compaction may move the artifact between the lookup and the read
+    for _ in range(2):
+        location = get_artifact_index().location(path)
+        if location is None:
+            return None
+        artifact = cache.get(path, location)
+        if artifact is not None:
+            return artifact
+        try:
+            artifact, size = decode_sized(get_pack_store().read(*location))
+        except FileNotFoundError:
+            continue
+        artifact, size = _resolve_blobs(artifact, size)
+        cache.put(path, location, artifact, size)
+        return artifact
+    return None
+
+
+def _resolve_blobs(artifact: Any, size: int) -> Tuple[Any, int]:
+    """Put the referenced blobs back into an artifact's data"""
+    data = artifact.get("data") if isinstance(artifact, dict) else None
+    if not blob_digests(data):
+        return artifact, size
     
+    resolved = {}
+    for key, value in data.items():
+        digest = blob_ref(value)
+        if digest:
+            value, blob_size = _load_blob(digest)
+            size += blob_size
+        resolved[key] = value
+    return {**artifact, "data": resolved}, size
+
+
+def _load_blob(digest: str) -> Tuple[Any, int]:
+    # Blobs never change, so their digest is the cache version
+    cache, key = get_artifact_cache(), f"blob:{digest}"
+    cached = cache.get(key, digest)
+    if cached is not None:
+        return cached
+    try:
+        value, size = decode_sized(get_blob_store().path(digest).read_bytes())
+    except FileNotFoundError:
+        raise ValueError(f"Artifact refers to missing blob {digest}") from None
+    cache.put(key, digest, (value, size), size)
+    return value, size
+
+
+def migrate_artifacts(codec: Optional[ArtifactCodec] = None) -> Dict[str, Any]:
+    """
+    Re-encode every artifact on disk with ``codec`` (the configured codec by default)
+    
+    Files already in the target encoding are left alone. Each file is
+    replaced atomically through the vault writer and its index entry
+    updated with the new size.
+    
+    Returns:
+        Files converted and the bytes they used before and after
+    """
+    codec = codec or get_artifact_codec()
+    index = get_artifact_index()
+    converted, bytes_before, bytes_after = 0, 0, 0
+    entries, writes = [], []
+    
+    for file_path in index.artifacts_dir.rglob("*.json"):
+        raw = file_path.read_bytes()
+        try:
+            artifact_data = decode(raw)
+        except ValueError:
+            continue
+        if not _is_artifact(artifact_data):
+            continue
+        
+        encoded = codec.encode(artifact_data)
+        if describe(encoded) == describe(raw) and len(encoded) >= len(raw):
+            continue
+        
+        writes.append(get_vault_writer().write(str(file_path), encoded))
+        
+        converted += 1
+        bytes_before += len(raw)
+        bytes_after += len(encoded)
+        entries.append(_index_entry(
+            file_path, artifact_data, len(encoded),
+            blob_sizes=get_blob_store().sizes(blob_digests(artifact_data["data"]))
+        ))
+    
+    for write in writes:
+        write.result()
+    index.record_many(entries)
+    
+    return {
+        "codec": codec.name,
+        "converted": converted,
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after
+    }
+
+
+def _is_artifact(artifact_data: Any) -> bool:
+    """Only files written by save_artifact, not ledgers or other state"""
+    return isinstance(artifact_data, dict) and "type" in artifact_data and "data" in artifact_data
+
+
+def cleanup_expired_artifacts(batch_size: int = 100, now: Optional[datetime] = None) -> List[str]:
+    """
+    Remove one batch of journeys whose retention period has passed
+    
+    Expired journeys are read from the index's expiry table, oldest expiry
+    first, so no journey directory is listed and no artifact is opened.
+    Call repeatedly until fewer than ``batch_size`` journeys come back.
+    
+    Args:
+        batch_size: Most journeys removed by this call
+        now: Expiry cut-off (defaults to the current UTC time)
+    
+    Returns:
+        IDs of the journeys removed
+    """
+    index = get_artifact_index()
+    journey_ids = index.expired_journeys(now or datetime.utcnow(), batch_size)
+    if not journey_ids:
+        return []
+    
+    vault_dir = index.artifacts_dir / "vault"
+    for journey_id in journey_ids:
+        shutil.rmtree(vault_dir / Path(*vault_shard(journey_id)) / journey_id, ignore_errors=True)
+        # Not yet moved by migrate_vault_layout
+        shutil.rmtree(vault_dir / journey_id, ignore_errors=True)
+    packed = index.pack_locations(journey_ids)
+    if packed:
+        # Their bytes are reclaimed when compact_packs rewrites the segments
+        get_pack_store().delete_many(packed)
+    # Index rows go last so a sweep interrupted mid-batch is retried
+    index.remove_journeys(journey_ids)
+    
+    print(f"Removed {len(journey_ids)} expired journeys")
+    return journey_ids
+
+
+def migrate_vault_layout(
+    batch_size: int = 100,
+    pause: float = 0.0,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> Dict[str, Any]:
+    """
+    Move journeys from the flat vault layout into their shards
+    
+    Safe to run while the app is serving: new artifacts already go to the
+    sharded layout, each journey directory is moved with renames, and
+    ``load_artifact`` reads either layout. A journey that also has newer
+    sharded artifacts is merged file by file, keeping the newer copy. Index
+    entries are repointed after each batch.
+    
+    Args:
+        batch_size: Journeys moved between index updates and progress reports
+        pause: Seconds to sleep between batches, to limit I/O on a live server
+        progress: Called with (journeys moved, journeys to move) after each batch
+    
+    Returns:
+        Journeys and files moved
+    """
+    index = get_artifact_index()
+    vault_dir = index.artifacts_dir / "vault"
     if not vault_dir.exists():
-        return
+        return {"journeys": 0, "files": 0}
+    
+    flat = [
+        path for path in vault_dir.iterdir()
+        if path.is_dir() and not (len(path.name) == 2 and all(c in "0123456789abcdef" for c in path.name))
+    ]
+    moved_journeys, moved_files = 0, 0
+    
+    for start in range(0, len(flat), batch_size):
+        moves: List[Tuple[str, str]] = []
+        for journey_dir in flat[start:start + batch_size]:
+            moves.extend(_move_journey(journey_dir, vault_dir / Path(*vault_shard(journey_dir.name)) / journey_dir.name))
+        index.rename_paths(moves)
+        
+        moved_journeys += len(flat[start:start + batch_size])
+        moved_files += len(moves)
+        if progress is not None:
+            progress(moved_journeys, len(flat))
+        if pause:
+            time.sleep(pause)
+    
+    return {"journeys": moved_journeys, "files": moved_files}
+
+
+def _move_journey(source: Path, target: Path) -> List[Tuple[str, str]]:
+    """Move one journey directory; returns (old path, new path) of every file"""
+    files = [path for path in source.rglob("*") if path.is_file()]
+    
+    if not target.exists():
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.rename(source, target)
+        return [(str(path), str(target / path.relative_to(source))) for path in files]
     
-    cutoff_date = datetime.utcnow() - timedelta(days=ttl_days)
+    moves = []
+    for path in files:
+        destination = target / path.relative_to(source)
+        if destination.exists():
+            # Written after the switch to sharding, so newer
+            path.unlink()
+        else:
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            os.rename(path, destination)
+        moves.append((str(path), str(destination)))
     
-    for journey_dir in vault_dir.iterdir():
-        if not journey_dir.is_dir():
+    # Leave anything written while merging for the next run
+    for directory in sorted((p for p in source.rglob("*") if p.is_dir()), reverse=True) + [source]:
+        try:
+            directory.rmdir()
+        except OSError:
+            pass
+    return moves
+
+
+def set_journey_retention(journey_id: str, ttl_days: int, granted_at: Optional[datetime] = None):
+    """Keep a journey's artifacts for ``ttl_days`` from ``granted_at`` (its consent)"""
+    get_artifact_index().set_expiry(journey_id, _expires_at(granted_at or datetime.utcnow(), ttl_days))
+
+
+def compact_packs(max_live_ratio: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Rewrite pack segments that are mostly removed artifacts
+    
+    Every sealed segment whose live bytes are at most ``max_live_ratio`` of
+    its size has its live artifacts copied to the active segment, the index
+    repointed at the copies, and is then deleted. A segment whose live
+    artifacts cannot all be read back is left alone.
+    
+    Returns:
+        Segments compacted and skipped, and bytes reclaimed
+    """
+    max_live_ratio = PACK_COMPACT_LIVE_RATIO if max_live_ratio is None else max_live_ratio
+    index = get_artifact_index()
+    if not (index.artifacts_dir / "packs").exists():
+        return {"compacted_segments": 0, "skipped_segments": 0, "reclaimed_bytes": 0}
+    
+    pack = get_pack_store()
+    live_bytes = index.segment_live_bytes()
+    active = pack.active_segment()
+    compacted, skipped, reclaimed = 0, 0, 0
+    
+    for segment in pack.segments():
+        if segment == active:
+            continue
+        size = pack.segment_size(segment)
+        if live_bytes.get(segment, 0) > size * max_live_ratio:
             continue
         
-        # Check if journey directory is expired
-        journey_created_file = journey_dir / "intake" / "intake.json"
-        if journey_created_file.exists():
-            try:
-                with open(journey_created_file, 'r') as f:
-                    journey_data = json.load(f)
-                    created_at_str = journey_data.get("created_at")
-                    if created_at_str:
-                        created_at = datetime.fromisoformat(created_at_str.replace('Z', '+00:00'))
-                        if created_at < cutoff_date:
-                            # Remove expired journey
-                            shutil.rmtree(journey_dir)
-                            print(f"Removed expired journey: {journey_dir}")
-            except (json.JSONDecodeError, ValueError) as e:
-                print(f"Error processing journey {journey_dir}: {e}")
-                continue
+        try:
+            moves = pack.compact(segment, index.segment_offsets(segment))
+        except ValueError:
+            skipped += 1
+            continue
+        index.relocate_many(segment, moves)
+        pack.remove_segment(segment)
+        
+        compacted += 1
+        reclaimed += size - live_bytes.get(segment, 0)
+    
+    return {"compacted_segments": compacted, "skipped_segments": skipped, "reclaimed_bytes": reclaimed}
 
 
-def list_artifacts(journey_id: str = None) -> Dict[str, Any]:
-    """List all artifacts or artifacts for a specific journey"""
-    artifacts_dir = Path("_artifacts")
+def collect_blobs(batch_size: int = 1000, grace_seconds: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Delete blobs no artifact refers to any more
     
-    if not artifacts_dir.exists():
-        return {"artifacts": [], "total": 0}
-    
-    artifacts = []
-    
-    if journey_id:
-        # List artifacts for specific journey
-        vault_dir = artifacts_dir / "vault" / journey_id
-        if vault_dir.exists():
-            for file_path in vault_dir.rglob("*.json"):
-                relative_path = file_path.relative_to(artifacts_dir)
-                artifacts.append({
-                    "path": str(relative_path),
-                    "size": file_path.stat().st_size,
-                    "modified": datetime.fromtimestamp(file_path.stat().st_mtime).isoformat()
-                })
-    else:
-        # List all artifacts
-        for file_path in artifacts_dir.rglob("*.json"):
-            relative_path = file_path.relative_to(artifacts_dir)
-            artifacts.append({
-                "path": str(relative_path),
-                "size": file_path.stat().st_size,
-                "modified": datetime.fromtimestamp(file_path.stat().st_mtime).isoformat()
-            })
+    A blob is only deleted once it has also gone unused for
+    ``grace_seconds`` (BLOB_GC_GRACE_SECONDS by default), so a save that
+    is about to reference it again keeps it.
     
-    return {
-        "artifacts": artifacts,
-        "total": len(artifacts)
-    }
+    Returns:
+        Blobs deleted and the bytes they used
+    """
+    grace_seconds = BLOB_GC_GRACE_SECONDS if grace_seconds is None else grace_seconds
+    index = get_artifact_index()
+    store = get_blob_store()
+    removed, reclaimed, after = 0, 0, ""
+    
+    while True:
+        batch = index.unreferenced_blobs(after, batch_size)
+        if not batch:
+            break
+        after = batch[-1][0]
+        sizes = dict(batch)
+        gone = store.remove_unused(sizes, grace_seconds)
+        index.drop_blobs(gone)
+        removed += len(gone)
+        reclaimed += sum(sizes[digest] for digest in gone)
+    
+    return {"removed_blobs": removed, "reclaimed_bytes": reclaimed}
 
 
-def get_artifact_stats() -> Dict[str, Any]:
-    """Get statistics about stored artifacts"""
-    artifacts_dir = Path("_artifacts")
+def _expires_at(created_at: Any, ttl_days: int) -> str:
+    """Expiry timestamp in a fixed-width format that sorts chronologically"""
+    if not isinstance(created_at, datetime):
+        try:
+            created_at = datetime.fromisoformat(str(created_at).replace('Z', '+00:00'))
+        except ValueError:
+            created_at = datetime.utcnow()
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return (created_at + timedelta(days=ttl_days)).isoformat(timespec="microseconds")
+
+
+class ArtifactIndex:
+    """
+    SQLite catalog of saved artifacts
+    
+    Every ``save_artifact`` records the artifact's path, journey, life event,
+    type, step, size and creation time here, so listing and stats are index
+    queries instead of walking and stat()-ing the whole ``_artifacts`` tree.
+    Rows are numbered in insertion order and that number is the pagination
+    cursor.
+    
+    Totals are kept as running counters (overall, per type and per life
+    event) that triggers update in the same transaction as the rows, so
+    stats never aggregate over the catalog. ``reconcile`` recomputes them
+    and ``rebuild`` re-indexes from disk; a new index is backfilled from the
+    files already there.
+    
+    Packed artifacts (``ARTIFACT_BACKEND=pack``) also record their segment
+    and offset, which makes this the pack backend's offset index.
+    
+    ``journey_expiry`` holds when each journey's retention ends, ordered by
+    expiry so the sweeper finds expired journeys with one index range scan.
+    A journey's first artifact sets it ``default_ttl_days`` ahead; granting
+    consent moves it to the consent's ``ttl_days``.
+    
+    ``artifact_blobs`` lists the blobs each artifact refers to, and triggers
+    keep every blob's reference count in ``blobs`` in step with it, so
+    removing artifacts (or a whole journey) releases their blobs.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS artifacts (
+            id          INTEGER PRIMARY KEY AUTOINCREMENT,
+            path        TEXT NOT NULL UNIQUE,
+            journey_id  TEXT,
+            life_event  TEXT,
+            type        TEXT,
+            step_id     TEXT,
+            size        INTEGER NOT NULL,
+            created_at  TEXT,
+            segment     INTEGER,
+            pack_offset INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_artifacts_journey ON artifacts (journey_id, id);
+        CREATE INDEX IF NOT EXISTS idx_artifacts_type ON artifacts (type, id);
+        CREATE INDEX IF NOT EXISTS idx_artifacts_created ON artifacts (created_at);
+        CREATE INDEX IF NOT EXISTS idx_artifacts_segment ON artifacts (segment, pack_offset);
+        
+        CREATE TABLE IF NOT EXISTS artifact_counters (
+            dimension   TEXT NOT NULL,
+            key         TEXT NOT NULL,
+            artifacts   INTEGER NOT NULL DEFAULT 0,
+            size_bytes  INTEGER NOT NULL DEFAULT 0,
+            journeys    INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (dimension, key)
+        );
+        
+        CREATE TABLE IF NOT EXISTS journey_expiry (
+            journey_id  TEXT PRIMARY KEY,
+            expires_at  TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_journey_expiry ON journey_expiry (expires_at);
+        
+        CREATE TABLE IF NOT EXISTS blobs (
+            digest      TEXT PRIMARY KEY,
+            size        INTEGER NOT NULL,
+            refs        INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_blobs_unreferenced ON blobs (digest) WHERE refs = 0;
+        
+        CREATE TABLE IF NOT EXISTS artifact_blobs (
+            path        TEXT NOT NULL,
+            digest      TEXT NOT NULL,
+            PRIMARY KEY (path, digest)
+        );
+        
+        CREATE TRIGGER IF NOT EXISTS artifact_blobs_insert AFTER INSERT ON artifact_blobs BEGIN
+            UPDATE blobs SET refs = refs + 1 WHERE digest = NEW.digest;
+        END;
+        CREATE TRIGGER IF NOT EXISTS artifact_blobs_delete AFTER DELETE ON artifact_blobs BEGIN
+            UPDATE blobs SET refs = refs - 1 WHERE digest = OLD.digest;
+        END;
+        CREATE TRIGGER IF NOT EXISTS artifacts_blobs_delete AFTER DELETE ON artifacts BEGIN
+            DELETE FROM artifact_blobs WHERE path = OLD.path;
+        END;
+        CREATE TRIGGER IF NOT EXISTS artifacts_blobs_rename AFTER UPDATE OF path ON artifacts BEGIN
+            UPDATE artifact_blobs SET path = NEW.path WHERE path = OLD.path;
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS blobs_counters_insert AFTER INSERT ON blobs BEGIN
+            INSERT INTO artifact_counters (dimension, key, artifacts, size_bytes) VALUES ('blobs', '', 1, NEW.size)
+            ON CONFLICT (dimension, key) DO UPDATE SET
+                artifacts  = artifacts + 1,
+                size_bytes = size_bytes + excluded.size_bytes;
+        END;
+        CREATE TRIGGER IF NOT EXISTS blobs_counters_delete AFTER DELETE ON blobs BEGIN
+            UPDATE artifact_counters SET artifacts = artifacts - 1, size_bytes = size_bytes - OLD.size
+            WHERE dimension = 'blobs' AND key = '';
+        END;
+    """
     
-    if not artifacts_dir.exists():
-        return {
+    # {dimension}, {key} and {row} are filled in per counter; {row} is NEW or OLD
+    _COUNTER_DELTA = """
+            INSERT INTO artifact_counters (dimension, key, artifacts, size_bytes, journeys)
+            VALUES ({dimension}, {key}, {sign}1, {sign}{row}.size, {sign}({journeys}))
+            ON CONFLICT (dimension, key) DO UPDATE SET
+                artifacts  = artifacts + excluded.artifacts,
+                size_bytes = size_bytes + excluded.size_bytes,
+                journeys   = journeys + excluded.journeys;
+    """
+    
+    COUNTERS = (
+        ("'total'", "''", True),
+        ("'type'", "COALESCE({row}.type, 'unknown')", False),
+        ("'life_event'", "COALESCE({row}.life_event, 'unknown')", True),
+        # Live bytes per pack segment, for compaction
+        ("'segment'", "COALESCE(CAST({row}.segment AS TEXT), 'files')", False),
+    )
+    
+    COLUMNS = ("path", "journey_id", "life_event", "type", "step_id", "size", "created_at")
+    
+    def __init__(
+        self,
+        db_path: str,
+        artifacts_dir: Path = Path("_artifacts"),
+        default_ttl_days: Optional[int] = None
+    ):
+        self.artifacts_dir = Path(artifacts_dir)
+        self.default_ttl_days = ARTIFACT_TTL_DAYS if default_ttl_days is None else default_ttl_days
+        self.blobs = BlobStore(self.artifacts_dir / "blobs")
+        is_new = not Path(db_path).exists()
+        self.db = ThreadLocalSQLite(db_path)
+        
+        conn = self._connection()
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        needs_reconcile = not is_new and self._migrate(conn)
+        conn.executescript(self.SCHEMA + self._triggers())
+        conn.commit()
+        
+        if is_new:
+            self.rebuild()
+        elif needs_reconcile:
+            self.reconcile()
+        if not is_new and "journey_expiry" not in tables:
+            self._backfill_expiry()
+    
+    def _connection(self) -> sqlite3.Connection:
+        return self.db.connection()
+    
+    def _migrate(self, conn: sqlite3.Connection) -> bool:
+        """Bring an older index up to date; True if counters must be rebuilt"""
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        counters_changed = False
+        if "artifacts" in tables:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(artifacts)")}
+            if "life_event" not in columns:
+                conn.execute("ALTER TABLE artifacts ADD COLUMN life_event TEXT")
+            if "segment" not in columns:
+                conn.execute("ALTER TABLE artifacts ADD COLUMN segment INTEGER")
+                conn.execute("ALTER TABLE artifacts ADD COLUMN pack_offset INTEGER")
+                # Recreated with the per-segment counter
+                for trigger in ("insert", "delete", "update"):
+                    conn.execute(f"DROP TRIGGER IF EXISTS artifacts_counters_{trigger}")
+                counters_changed = True
+        return counters_changed or "artifact_counters" not in tables
+    
+    def _triggers(self) -> str:
+        def deltas(row: str, sign: str, journey_change: str) -> str:
+            return "".join(
+                self._COUNTER_DELTA.format(
+                    dimension=dimension,
+                    key=key.format(row=row),
+                    row=row,
+                    sign=sign,
+                    journeys=journey_change if counts_journeys else "0"
+                )
+                for dimension, key, counts_journeys in self.COUNTERS
+            )
+        
+        first_of_journey = "NOT EXISTS (SELECT 1 FROM artifacts WHERE journey_id = NEW.journey_id AND id <> NEW.id)"
+        last_of_journey = "NOT EXISTS (SELECT 1 FROM artifacts WHERE journey_id = OLD.journey_id)"
+        
+        # Journey counts are not moved on update: re-saving a path keeps its journey
+        return f"""
+        CREATE TRIGGER IF NOT EXISTS artifacts_counters_insert AFTER INSERT ON artifacts BEGIN
+            {deltas("NEW", "", f"NEW.journey_id IS NOT NULL AND {first_of_journey}")}
+        END;
+        CREATE TRIGGER IF NOT EXISTS artifacts_counters_delete AFTER DELETE ON artifacts BEGIN
+            {deltas("OLD", "-", f"OLD.journey_id IS NOT NULL AND {last_of_journey}")}
+        END;
+        CREATE TRIGGER IF NOT EXISTS artifacts_counters_update AFTER UPDATE ON artifacts BEGIN
+            {deltas("OLD", "-", "0")}
+            {deltas("NEW", "", "0")}
+        END;
+        """
+    
+    def record_many(self, entries: List[Dict[str, Any]]) -> None:
+        """
+        Insert or refresh index entries; rewriting a path keeps its position
+        
+        Entries without a life event inherit the one already recorded for
+        their journey (from its intake).
+        """
+        if not entries:
+            return
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                """
+                INSERT INTO artifacts (path, journey_id, life_event, type, step_id, size, created_at, segment, pack_offset)
+                VALUES (
+                    :path, :journey_id,
+                    COALESCE(:life_event, (
+                        SELECT life_event FROM artifacts
+                        WHERE journey_id = :journey_id AND life_event IS NOT NULL
+                        LIMIT 1
+                    )),
+                    :type, :step_id, :size, :created_at, :segment, :pack_offset
+                )
+                ON CONFLICT (path) DO UPDATE SET
+                    journey_id  = excluded.journey_id,
+                    life_event  = COALESCE(excluded.life_event, artifacts.life_event),
+                    type        = excluded.type,
+                    step_id     = excluded.step_id,
+                    size        = excluded.size,
+                    created_at  = excluded.created_at,
+                    segment     = excluded.segment,
+                    pack_offset = excluded.pack_offset
+                """,
+                entries,
+            )
+            # Re-saving a path replaces its blob references
+            conn.executemany("DELETE FROM artifact_blobs WHERE path = ?", [(entry["path"],) for entry in entries])
+            blobs = [(entry["path"], digest, size) for entry in entries for digest, size in entry.get("blobs", {}).items()]
+            conn.executemany(
+                "INSERT INTO blobs (digest, size) VALUES (?, ?) ON CONFLICT (digest) DO NOTHING",
+                [(digest, size) for _, digest, size in blobs],
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO artifact_blobs (path, digest) VALUES (?, ?)",
+                [(path, digest) for path, digest, _ in blobs],
+            )
+            # A journey's retention starts with its first artifact; later
+            # artifacts and re-saves leave it alone
+            conn.executemany(
+                """
+                INSERT INTO journey_expiry (journey_id, expires_at) VALUES (?, ?)
+                ON CONFLICT (journey_id) DO NOTHING
+                """,
+                [
+                    (entry["journey_id"], _expires_at(entry["created_at"], self.default_ttl_days))
+                    for entry in entries if entry["journey_id"]
+                ],
+            )
+    
+    def list(
+        self,
+        journey_id: Optional[str] = None,
+        artifact_type: Optional[str] = None,
+        step_id: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Return one page of matching entries and the cursor for the next page
+        
+        The next cursor is None on the last page.
+        """
+        where = ["id > ?"]
+        params: List[Any] = [int(cursor) if cursor else 0]
+        for column, value in (("journey_id", journey_id), ("type", artifact_type), ("step_id", step_id)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        
+        # Fetch one extra row to know whether another page exists
+        rows = self._connection().execute(
+            f"""
+            SELECT id, {", ".join(self.COLUMNS)} FROM artifacts
+            WHERE {" AND ".join(where)}
+            ORDER BY id
+            LIMIT ?
+            """,
+            (*params, limit + 1),
+        ).fetchall()
+        
+        page = rows[:limit]
+        next_cursor = str(page[-1][0]) if len(rows) > limit else None
+        return [dict(zip(self.COLUMNS, row[1:])) for row in page], next_cursor
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Read the running totals, with per-type and per-life-event breakdowns
+        
+        Costs a handful of primary-key and index lookups regardless of how
+        many artifacts are stored.
+        """
+        conn = self._connection()
+        counters = conn.execute(
+            "SELECT dimension, key, artifacts, size_bytes, journeys FROM artifact_counters WHERE artifacts > 0"
+        ).fetchall()
+        # MIN/MAX are answered from the created_at index
+        oldest = conn.execute("SELECT MIN(created_at) FROM artifacts").fetchone()[0]
+        newest = conn.execute("SELECT MAX(created_at) FROM artifacts").fetchone()[0]
+        
+        stats = {
             "total_journeys": 0,
             "total_artifacts": 0,
             "total_size_bytes": 0,
-            "oldest_artifact": None,
-            "newest_artifact": None
+            "oldest_artifact": oldest,
+            "newest_artifact": newest,
+            "by_type": {},
+            "by_life_event": {},
+            "blobs": {"blobs": 0, "size_bytes": 0}
         }
+        for dimension, key, artifacts, size_bytes, journeys in counters:
+            if dimension == "total":
+                stats["total_journeys"] = journeys
+                stats["total_artifacts"] = artifacts
+                stats["total_size_bytes"] = size_bytes
+            elif dimension == "type":
+                stats["by_type"][key] = {"artifacts": artifacts, "size_bytes": size_bytes}
+            elif dimension == "life_event":
+                stats["by_life_event"][key] = {"journeys": journeys, "artifacts": artifacts, "size_bytes": size_bytes}
+            elif dimension == "blobs":
+                stats["blobs"] = {"blobs": artifacts, "size_bytes": size_bytes}
+        
+        return stats
+    
+    def location(self, path: str) -> Optional[Tuple[int, int, int]]:
+        """(segment, offset, size) of a packed artifact, or None if it is not packed"""
+        row = self._connection().execute(
+            "SELECT segment, pack_offset, size FROM artifacts WHERE path = ? AND segment IS NOT NULL", (path,)
+        ).fetchone()
+        return tuple(row) if row else None
+    
+    def pack_locations(self, journey_ids: List[str]) -> List[Tuple[str, int, int]]:
+        """(path, segment, offset) of every packed artifact of these journeys"""
+        conn = self._connection()
+        return [
+            row
+            for journey_id in journey_ids
+            for row in conn.execute(
+                "SELECT path, segment, pack_offset FROM artifacts WHERE journey_id = ? AND segment IS NOT NULL",
+                (journey_id,),
+            )
+        ]
+    
+    def segment_live_bytes(self) -> Dict[int, int]:
+        """Bytes of live artifacts in each pack segment, from the running counters"""
+        rows = self._connection().execute(
+            "SELECT key, size_bytes FROM artifact_counters WHERE dimension = 'segment' AND key <> 'files'"
+        ).fetchall()
+        return {int(key): size_bytes for key, size_bytes in rows}
+    
+    def segment_offsets(self, segment: int) -> Set[int]:
+        """Offsets of the live artifacts in a pack segment"""
+        rows = self._connection().execute(
+            "SELECT pack_offset FROM artifacts WHERE segment = ?", (segment,)
+        ).fetchall()
+        return {row[0] for row in rows}
+    
+    def relocate_many(self, segment: int, moves: List[Tuple[str, int, int, int]]) -> None:
+        """
+        Point artifacts copied out of ``segment`` at their copies
+        
+        An artifact rewritten since the copy was taken keeps its new location.
+        """
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                """
+                UPDATE artifacts SET segment = ?, pack_offset = ?
+                WHERE path = ? AND segment = ? AND pack_offset = ?
+                """,
+                [
+                    (new_segment, new_offset, path, segment, old_offset)
+                    for path, old_offset, new_segment, new_offset in moves
+                ],
+            )
+    
+    def rename_paths(self, moves: List[Tuple[str, str]]) -> None:
+        """
+        Repoint entries at moved files
+        
+        An entry already recorded at the new path wins over the moved one.
+        """
+        conn = self._connection()
+        with conn:
+            conn.executemany("UPDATE OR IGNORE artifacts SET path = ? WHERE path = ?", [(new, old) for old, new in moves])
+            conn.executemany("DELETE FROM artifacts WHERE path = ?", [(old,) for old, _ in moves])
+    
+    def unreferenced_blobs(self, after: str = "", limit: int = 1000) -> List[Tuple[str, int]]:
+        """(digest, size) of up to ``limit`` blobs no artifact refers to, in digest order after ``after``"""
+        return self._connection().execute(
+            "SELECT digest, size FROM blobs WHERE refs = 0 AND digest > ? ORDER BY digest LIMIT ?",
+            (after, limit),
+        ).fetchall()
+    
+    def drop_blobs(self, digests: List[str]) -> None:
+        """Forget deleted blobs, unless they were referenced again meanwhile"""
+        conn = self._connection()
+        with conn:
+            conn.executemany("DELETE FROM blobs WHERE digest = ? AND refs = 0", [(digest,) for digest in digests])
+    
+    def remove_journey(self, journey_id: str) -> None:
+        """Drop every entry of a journey whose vault has been removed"""
+        self.remove_journeys([journey_id])
+    
+    def remove_journeys(self, journey_ids: List[str]) -> None:
+        """Drop the entries and expiry of several journeys in one transaction"""
+        conn = self._connection()
+        with conn:
+            params = [(journey_id,) for journey_id in journey_ids]
+            conn.executemany("DELETE FROM artifacts WHERE journey_id = ?", params)
+            conn.executemany("DELETE FROM journey_expiry WHERE journey_id = ?", params)
     
-    total_size = 0
-    total_artifacts = 0
-    dates = []
+    def set_expiry(self, journey_id: str, expires_at: str) -> None:
+        """Set when a journey's retention ends, replacing the current expiry"""
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO journey_expiry (journey_id, expires_at) VALUES (?, ?)
+                ON CONFLICT (journey_id) DO UPDATE SET expires_at = excluded.expires_at
+                """,
+                (journey_id, expires_at),
+            )
+    
+    def get_expiry(self, journey_id: str) -> Optional[str]:
+        """When a journey's retention ends, or None if it has no artifacts"""
+        row = self._connection().execute(
+            "SELECT expires_at FROM journey_expiry WHERE journey_id = ?", (journey_id,)
+        ).fetchone()
+        return row[0] if row else None
+    
+    def expired_journeys(self, now: datetime, limit: int = 100) -> List[str]:
+        """Up to ``limit`` journeys whose retention ended before ``now``, soonest expiry first"""
+        rows = self._connection().execute(
+            "SELECT journey_id FROM journey_expiry WHERE expires_at <= ? ORDER BY expires_at LIMIT ?",
+            (now.isoformat(timespec="microseconds"), limit),
+        ).fetchall()
+        return [row[0] for row in rows]
+    
+    def _backfill_expiry(self) -> None:
+        """Give journeys indexed before the expiry table their default retention"""
+        conn = self._connection()
+        rows = conn.execute(
+            "SELECT journey_id, MIN(created_at) FROM artifacts WHERE journey_id IS NOT NULL GROUP BY journey_id"
+        ).fetchall()
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO journey_expiry (journey_id, expires_at) VALUES (?, ?)",
+                [(journey_id, _expires_at(created_at, self.default_ttl_days)) for journey_id, created_at in rows],
+            )
+    
+    def reconcile(self) -> Dict[str, Any]:
+        """
+        Recompute the running counters from the catalog
+        
+        Also fills in life events for journeys whose intake was indexed after
+        their other artifacts.
+        
+        Returns:
+            The reconciled stats
+        """
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                """
+                UPDATE artifacts SET life_event = (
+                    SELECT sibling.life_event FROM artifacts AS sibling
+                    WHERE sibling.journey_id = artifacts.journey_id AND sibling.life_event IS NOT NULL
+                    LIMIT 1
+                )
+                WHERE life_event IS NULL AND journey_id IS NOT NULL
+                """
+            )
+            conn.execute("DELETE FROM artifact_counters")
+            conn.execute(
+                """
+                INSERT INTO artifact_counters (dimension, key, artifacts, size_bytes, journeys)
+                SELECT 'total', '', COUNT(*), COALESCE(SUM(size), 0), COUNT(DISTINCT journey_id)
+                FROM artifacts
+                """
+            )
+            conn.execute(
+                """
+                INSERT INTO artifact_counters (dimension, key, artifacts, size_bytes, journeys)
+                SELECT 'type', COALESCE(type, 'unknown'), COUNT(*), SUM(size), 0
+                FROM artifacts GROUP BY COALESCE(type, 'unknown')
+                """
+            )
+            conn.execute(
+                """
+                INSERT INTO artifact_counters (dimension, key, artifacts, size_bytes, journeys)
+                SELECT 'life_event', COALESCE(life_event, 'unknown'), COUNT(*), SUM(size), COUNT(DISTINCT journey_id)
+                FROM artifacts GROUP BY COALESCE(life_event, 'unknown')
+                """
+            )
+            conn.execute(
+                """
+                INSERT INTO artifact_counters (dimension, key, artifacts, size_bytes, journeys)
+                SELECT 'segment', COALESCE(CAST(segment AS TEXT), 'files'), COUNT(*), SUM(size), 0
+                FROM artifacts GROUP BY COALESCE(CAST(segment AS TEXT), 'files')
+                """
+            )
+            conn.execute(
+                """
+                INSERT INTO artifact_counters (dimension, key, artifacts, size_bytes, journeys)
+                SELECT 'blobs', '', COUNT(*), COALESCE(SUM(size), 0), 0 FROM blobs
+                """
+            )
+        
+        return self.stats()
+    
+    def _packed_entries(self) -> List[Dict[str, Any]]:
+        """Replay the pack segments; an artifact packed later than a file of the same path wins"""
+        pack_dir = self.artifacts_dir / "packs"
+        if not pack_dir.exists():
+            return []
+        
+        pack = PackStore(pack_dir)
+        live: Dict[str, Tuple[int, int, int]] = {}
+        try:
+            for segment in pack.segments():
+                for record in pack.scan(segment):
+                    if record.kind == PUT:
+                        live[record.path] = (segment, record.offset, record.length)
+                    elif record.kind == DEL and live.get(record.path, ())[:2] == record.target:
+                        del live[record.path]
+            
+            entries = []
+            for path, (segment, offset, length) in live.items():
+                try:
+                    artifact_data = decode(pack.read(segment, offset, length))
+                except ValueError:
+                    continue
+                if _is_artifact(artifact_data):
+                    entries.append(_index_entry(
+                        Path(path), artifact_data, length, (segment, offset), self._blob_sizes(artifact_data)
+                    ))
+            return entries
+        finally:
+            pack.close()
+    
+    def _blob_sizes(self, artifact_data: Dict[str, Any]) -> Dict[str, int]:
+        return self.blobs.sizes(blob_digests(artifact_data.get("data")))
+    
+    def rebuild(self) -> int:
+        """
+        Re-index every artifact file and pack segment under the artifacts directory
+        
+        Entries whose files no longer exist are dropped and the counters are
+        reconciled. This is the one operation that walks the tree; run it
+        after files were changed outside ``save_artifact``.
+        
+        Returns:
+            Number of artifacts indexed
+        """
+        entries = []
+        if self.artifacts_dir.exists():
+            for file_path in self.artifacts_dir.rglob("*.json"):
+                try:
+                    artifact_data = decode(file_path.read_bytes())
+                except (OSError, ValueError):
+                    continue
+                if not _is_artifact(artifact_data):
+                    continue
+                entries.append(_index_entry(
+                    file_path, artifact_data, file_path.stat().st_size, blob_sizes=self._blob_sizes(artifact_data)
+                ))
+        entries.extend(self._packed_entries())
+        
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM artifacts")
+            # Blobs nothing refers to are indexed too, so collect_blobs finds them
+            conn.executemany(
+                "INSERT INTO blobs (digest, size) VALUES (?, ?) ON CONFLICT (digest) DO UPDATE SET size = excluded.size",
+                self.blobs.scan(),
+            )
+        self.record_many(entries)
+        self.reconcile()
+        
+        return len(entries)
+
+
+ARTIFACT_INDEX_PATH = os.getenv("ARTIFACT_INDEX_PATH", str(Path("_artifacts") / "artifact_index.db"))
+# Retention of a journey's artifacts until consent sets its own ttl_days
+ARTIFACT_TTL_DAYS = int(os.getenv("ARTIFACT_TTL_DAYS", "30"))
+# 'files' writes one file per artifact; 'pack' appends to segment files
+ARTIFACT_BACKEND = os.getenv("ARTIFACT_BACKEND", "files")
+PACK_SEGMENT_MAX_BYTES = int(os.getenv("PACK_SEGMENT_MAX_BYTES", str(64 * 1024 * 1024)))
+# Segments at most this fraction live are compacted
+PACK_COMPACT_LIVE_RATIO = float(os.getenv("PACK_COMPACT_LIVE_RATIO", "0.5"))
+# Dict values of an artifact's data at least this large (as JSON) are stored as shared
+# blobs; smaller ones cost more as a separate file than they save
+BLOB_MIN_BYTES = int(os.getenv("BLOB_MIN_BYTES", "1024"))
+# Unreferenced blobs are kept this long after their last use
+BLOB_GC_GRACE_SECONDS = float(os.getenv("BLOB_GC_GRACE_SECONDS", "3600"))
+# Memory for decoded artifacts kept by load_artifact; 0 disables the cache
+ARTIFACT_CACHE_BYTES = int(os.getenv("ARTIFACT_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+_artifact_index: Optional[ArtifactIndex] = None
+_artifact_index_lock = threading.Lock()
+
+
+def get_artifact_index() -> ArtifactIndex:
+    """Get the process-wide artifact index, opening (or backfilling) it on first use"""
+    global _artifact_index
+    if _artifact_index is None:
+        with _artifact_index_lock:
+            if _artifact_index is None:
+                _artifact_index = ArtifactIndex(ARTIFACT_INDEX_PATH)
+    return _artifact_index
+
+
+_pack_store: Optional[PackStore] = None
+
+
+def get_pack_store() -> PackStore:
+    """Get the process-wide pack store, kept next to the artifact index's vault"""
+    global _pack_store
+    if _pack_store is None:
+        pack_dir = get_artifact_index().artifacts_dir / "packs"
+        with _artifact_index_lock:
+            if _pack_store is None:
+                _pack_store = PackStore(pack_dir, PACK_SEGMENT_MAX_BYTES, fsync=VAULT_FSYNC != "off")
+    return _pack_store
+
+
+def get_blob_store() -> BlobStore:
+    """Get the blob store whose reference counts the artifact index keeps"""
+    return get_artifact_index().blobs
+
+
+_artifact_cache: Optional[ArtifactCache] = None
+
+
+def get_artifact_cache() -> ArtifactCache:
+    """Get the process-wide artifact read cache"""
+    global _artifact_cache
+    if _artifact_cache is None:
+        with _artifact_index_lock:
+            if _artifact_cache is None:
+                _artifact_cache = ArtifactCache(ARTIFACT_CACHE_BYTES)
+    return _artifact_cache
+
+
+def list_artifacts(
+    journey_id: str = None,
+    artifact_type: str = None,
+    step_id: str = None,
+    cursor: str = None,
+    limit: int = 100
+) -> Dict[str, Any]:
+    """
+    List artifacts from the index, one page at a time
     
-    for file_path in artifacts_dir.rglob("*.json"):
-        total_size += file_path.stat().st_size
-        total_artifacts += 1
-        dates.append(file_path.stat().st_mtime)
+    Args:
+        journey_id: Only artifacts of this journey
+        artifact_type: Only artifacts of this type (intake, prefill, submission, ...)
+        step_id: Only artifacts of this journey step
+        cursor: ``next_cursor`` from the previous page
+        limit: Page size
     
-    # Count unique journeys
-    vault_dir = artifacts_dir / "vault"
-    total_journeys = 0
-    if vault_dir.exists():
-        total_journeys = len([d for d in vault_dir.iterdir() if d.is_dir()])
+    Returns:
+        Artifacts on this page and the cursor for the next one (None when done)
+    """
+    artifacts, next_cursor = get_artifact_index().list(journey_id, artifact_type, step_id, cursor, limit)
     
     return {
-        "total_journeys": total_journeys,
-        "total_artifacts": total_artifacts,
-        "total_size_bytes": total_size,
-        "oldest_artifact": datetime.fromtimestamp(min(dates)).isoformat() if dates else None,
-        "newest_artifact": datetime.fromtimestamp(max(dates)).isoformat() if dates else None
+        "artifacts": artifacts,
+        "count": len(artifacts),
+        "next_cursor": next_cursor
     }
+
+
+def get_artifact_stats() -> Dict[str, Any]:
+    """Get statistics about stored artifacts and the artifact read cache"""
+    stats = get_artifact_index().stats()
+    stats["cache"] = get_artifact_cache().stats()
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Maintain the artifact index")
+    parser.add_argument(
+        "command", choices=["reconcile", "rebuild", "migrate", "compact", "shard"],
+        help="reconcile: recompute stats counters from the index; rebuild: re-index every artifact on disk; "
+             "migrate: re-encode every artifact with ARTIFACT_FORMAT / ARTIFACT_COMPRESSION; "
+             "compact: rewrite mostly-dead pack segments; "
+             "shard: move journeys from the flat vault layout into vault/ab/cd/ (safe while serving)"
+    )
+    parser.add_argument("--batch", type=int, default=100, help="shard: journeys moved per batch")
+    parser.add_argument("--pause", type=float, default=0.0, help="shard: seconds to sleep between batches")
+    args = parser.parse_args()
+    
+    if args.command == "migrate":
+        print(json.dumps(migrate_artifacts(), indent=2))
+    elif args.command == "compact":
+        print(json.dumps(compact_packs(), indent=2))
+    elif args.command == "shard":
+        started = time.monotonic()
+        
+        def report(moved: int, total: int):
+            rate = moved / max(time.monotonic() - started, 1e-9)
+            print(f"Moved {moved:,}/{total:,} journeys ({moved / total:.1%}), {rate:,.0f} journeys/s", flush=True)
+        
+        print(json.dumps(migrate_vault_layout(args.batch, args.pause, report), indent=2))
+    else:
+        index = get_artifact_index()
+        if args.command == "rebuild":
+            print(f"Indexed {index.rebuild()} artifacts")
+        print(json.dumps(index.reconcile(), indent=2))
@@ -0,0 +1,235 @@
+"""
+Group-commit file writer
+
+Vault artifacts and the consent ledger used to be written in place with
+``open(..., 'w')``, so a crash mid-write left a truncated file, and every
+write paid for its own syscalls. Writes now go through one background
+thread. It collects the writes submitted within a short window, writes each
+to a temp file next to its target, makes the batch durable, and renames
+every temp file over its target. A reader therefore sees either the old file
+or the new one, and concurrent writers share one durability barrier per
+batch instead of each paying for their own.
+
+``VAULT_FSYNC`` picks the barrier:
+
+- ``batch``: one ``syncfs(2)`` per filesystem before the renames and one
+  after (Linux; elsewhere this falls back to ``file``)
+- ``file``: ``fsync`` every temp file, then every directory touched once
+- ``off``: atomic rename only, durable whenever the OS flushes
+"""
+
+import ctypes
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Longest a write waits for others to share its batch, in milliseconds
+VAULT_WRITE_WINDOW_MS = float(os.getenv("VAULT_WRITE_WINDOW_MS", "2"))
+VAULT_WRITE_MAX_BATCH = int(os.getenv("VAULT_WRITE_MAX_BATCH", "256"))
+VAULT_FSYNC = os.getenv("VAULT_FSYNC", "batch")
+
+FSYNC_POLICIES = ("batch", "file", "off")
+
+
+def _load_syncfs():
+    try:
+        syncfs = ctypes.CDLL(None, use_errno=True).syncfs
+    except (OSError, AttributeError):
+        return None
+    syncfs.argtypes = [ctypes.c_int]
+    return syncfs
+
+
+_syncfs = _load_syncfs()
+
+
+class _Write:
+    __slots__ = ("files", "future")
+
+    def __init__(self, files: List[Tuple[Path, bytes]]):
+        self.files = files
+        self.future: Future = Future()
+
+
+class GroupCommitWriter:
+    """
+    Atomic, durable file writes committed in groups
+
+    ``write`` and ``write_many`` return a ``concurrent.futures.Future`` that
+    resolves once the files are durable (wrap it with
+    ``asyncio.wrap_future`` to await it). Writes resolve in submission order,
+    and of two writes to one path the later one wins.
+    """
+
+    def __init__(
+        self,
+        window_ms: float = VAULT_WRITE_WINDOW_MS,
+        max_batch: int = VAULT_WRITE_MAX_BATCH,
+        fsync: str = VAULT_FSYNC
+    ):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.fsync = "file" if fsync == "batch" and _syncfs is None else fsync
+
+        self.batches = 0
+        self.files_written = 0
+
+        self._queue: "queue.Queue[Optional[_Write]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def write(self, path: str, data: bytes) -> Future:
+        """Write one file; the future resolves when it is durable"""
+        return self.write_many([(path, data)])
+
+    def write_many(self, files: Iterable[Tuple[str, bytes]]) -> Future:
+        """Write several files in the same batch; the future resolves when all are durable"""
+        write = _Write([(Path(path), data) for path, data in files])
+        if not write.files:
+            write.future.set_result(None)
+            return write.future
+        self._ensure_started()
+        self._queue.put(write)
+        return write.future
+
+    def close(self):
+        """Commit everything already submitted and stop the writer thread"""
+        with self._lock:
+            if self._thread is None:
+                return
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="vault-writer", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                try:
+                    # Whatever queued up during the previous commit joins at once
+                    write = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if write is None:
+                    stopping = True
+                    break
+                batch.append(write)
+            self._commit(batch)
+
+    def _commit(self, batch: List[_Write]):
+        staged: List[Tuple[_Write, List[Tuple[Path, Path]]]] = []
+        for write in batch:
+            renames: List[Tuple[Path, Path]] = []
+            try:
+                for path, data in write.files:
+                    renames.append((self._stage(path, data), path))
+            except Exception as e:
+                # A write lands whole or not at all
+                for temp_path, _ in renames:
+                    temp_path.unlink(missing_ok=True)
+                write.future.set_exception(e)
+                continue
+            staged.append((write, renames))
+
+        try:
+            directories = {path.parent for _, renames in staged for _, path in renames}
+            if self.fsync == "batch":
+                self._sync_filesystems(directories)
+            for _, renames in staged:
+                for temp_path, path in renames:
+                    os.replace(temp_path, path)
+            if self.fsync == "batch":
+                self._sync_filesystems(directories)
+            elif self.fsync == "file":
+                for directory in directories:
+                    self._fsync_path(directory)
+        except Exception as e:
+            logger.exception("Vault write batch failed")
+            for write, _ in staged:
+                if not write.future.done():
+                    write.future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.files_written += sum(len(renames) for _, renames in staged)
+        for write, _ in staged:
+            write.future.set_result(None)
+
+    def _stage(self, path: Path, data: bytes) -> Path:
+        """Write ``data`` to a temp file beside ``path``"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        with open(temp_path, "wb") as f:
+            f.write(data)
+            if self.fsync == "file":
+                f.flush()
+                os.fsync(f.fileno())
+        return temp_path
+
+    @staticmethod
+    def _sync_filesystems(directories: Iterable[Path]):
+        """One syncfs per filesystem the batch touched"""
+        devices: Dict[int, Path] = {}
+        for directory in directories:
+            devices.setdefault(directory.stat().st_dev, directory)
+        for directory in devices.values():
+            fd = os.open(directory, os.O_RDONLY)
+            try:
+                if _syncfs(fd) != 0:
+                    errno = ctypes.get_errno()
+                    raise OSError(errno, os.strerror(errno))
+            finally:
+                os.close(fd)
+
+    @staticmethod
+    def _fsync_path(path: Path):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+_vault_writer: Optional[GroupCommitWriter] = None
+_vault_writer_lock = threading.Lock()
+
+
+def get_vault_writer() -> GroupCommitWriter:
+    """Get the process-wide group-commit writer, creating it on first use"""
+    global _vault_writer
+    if _vault_writer is None:
+        with _vault_writer_lock:
+            if _vault_writer is None:
+                _vault_writer = GroupCommitWriter()
+    return _vault_writer
+
+
+def shutdown_vault_writer():
+    """Commit pending writes and stop the writer thread"""
+    global _vault_writer
+    with _vault_writer_lock:
+        if _vault_writer is not None:
+            _vault_writer.close()
+            _vault_writer = None
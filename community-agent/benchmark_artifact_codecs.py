@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark for artifact codecs
+
+Writes synthetic intake, prefill and submission artifacts with the legacy
+indented JSON and with every available codec, and reports bytes per artifact,
+write throughput and read (decode) throughput for each.
+
+Usage:
+    python3 benchmark_artifact_codecs.py
+    python3 benchmark_artifact_codecs.py --artifacts 20000 --min-bytes 512
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from app.utils import artifact_codec
+from app.utils.artifact_codec import ArtifactCodec, decode
+
+
+def make_artifact(i: int) -> Dict[str, Any]:
+    """One artifact shaped like what the orchestrator saves"""
+    journey_id = f"journey_{i:012d}"
+    kind = ("intake", "prefill", "submission")[i % 3]
+    if kind == "intake":
+        data = {
+            "journey_id": journey_id,
+            "life_event": "baby_just_born",
+            "parent1": {
+                "full_name": f"Person {i}",
+                "dob": "1990-01-01",
+                "email": f"person{i}@example.com",
+                "address": {"line1": f"{i} Test Street", "suburb": "Lismore", "state": "NSW", "postcode": "2480"},
+            },
+            "baby": {"name": f"Baby {i}", "dob": "2025-01-01", "parents": []},
+        }
+    elif kind == "prefill":
+        data = {
+            "journey_id": journey_id,
+            "step_id": "birth_reg",
+            "form_data": {f"field_{n}": f"Prefilled value {n} for person {i}" for n in range(40)},
+            "sources": {f"field_{n}": f"intake.parent1.field_{n}" for n in range(40)},
+        }
+    else:
+        data = {
+            "journey_id": journey_id,
+            "step_id": "medicare_enrolment",
+            "reference": f"MC-{i:08d}",
+            "submitted_at": "2025-01-01T00:00:00",
+            "status": "submitted",
+        }
+    return {"type": kind, "created_at": "2025-01-01T00:00:00", "data": data}
+
+
+def bench(label: str, artifacts: List[Dict[str, Any]], encode: Callable[[Any], bytes], directory: Path):
+    paths = [directory / f"{i}.json" for i in range(len(artifacts))]
+
+    start = time.perf_counter()
+    total_bytes = 0
+    for path, artifact in zip(paths, artifacts):
+        encoded = encode(artifact)
+        path.write_bytes(encoded)
+        total_bytes += len(encoded)
+    write_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for path in paths:
+        decode(path.read_bytes())
+    read_elapsed = time.perf_counter() - start
+
+    print(
+        f"   {label:<16} {total_bytes / len(artifacts):>9,.0f} B/artifact"
+        f" {len(artifacts) / write_elapsed:>12,.0f} writes/sec"
+        f" {len(artifacts) / read_elapsed:>12,.0f} reads/sec"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark artifact codecs")
+    parser.add_argument("--artifacts", type=int, default=5000, help="Artifacts written per codec")
+    parser.add_argument(
+        "--min-bytes", type=int, default=artifact_codec.ARTIFACT_COMPRESS_MIN_BYTES,
+        help="Compression threshold in bytes"
+    )
+    args = parser.parse_args()
+
+    artifacts = [make_artifact(i) for i in range(args.artifacts)]
+    formats = [name for name in artifact_codec.FORMATS if name != "msgpack" or artifact_codec.msgpack is not None]
+    codecs = [
+        ArtifactCodec(name, compression, args.min_bytes)
+        for name in formats for compression in artifact_codec.COMPRESSIONS
+    ]
+
+    print(f"Writing {args.artifacts:,} artifacts per codec (compression above {args.min_bytes} bytes)")
+    if artifact_codec.msgpack is None:
+        print("   (msgpack not installed; skipping the binary format)")
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_dir = Path(tmp) / "legacy"
+        legacy_dir.mkdir()
+        bench("legacy indent=2", artifacts, lambda a: json.dumps(a, indent=2, default=str).encode(), legacy_dir)
+        for codec in codecs:
+            directory = Path(tmp) / codec.name
+            directory.mkdir()
+            bench(codec.name, artifacts, codec.encode, directory)
+
+
+if __name__ == "__main__":
+    main()
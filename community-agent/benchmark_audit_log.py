@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark for audit logging on the request path
+
+Concurrent callers each log events the way ``plan_journey`` and
+``submit_form`` do. Compares opening, appending to and closing the log for
+every event against queueing events for the buffered audit writer, and
+reports events per second and the median time a caller spends in the call.
+
+Usage:
+    python3 benchmark_audit_log.py
+    python3 benchmark_audit_log.py --callers 16 --events 2000 --fsync always
+"""
+
+import argparse
+import json
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List
+
+from app.utils.audit import _build_event
+from app.utils.audit_writer import AUDIT_FSYNC_POLICIES, AuditWriter
+
+
+def event() -> dict:
+    return _build_event("system", "journey_created", "New birth journey initiated", None, {"journey_id": "journey_000000000001"})
+
+
+def bench(label: str, callers: int, events: int, log: Callable[[], None]) -> float:
+    latencies: List[float] = []
+    lock = threading.Lock()
+
+    def worker():
+        own = []
+        for _ in range(events):
+            start = time.perf_counter()
+            log()
+            own.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=worker) for _ in range(callers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    rate = callers * events / elapsed
+    print(f"   {label:<28} {rate:>10,.0f} events/sec   p50 {statistics.median(latencies) * 1e6:7.1f}us")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark buffered audit logging")
+    parser.add_argument("--callers", type=int, default=8, help="Concurrent logging threads")
+    parser.add_argument("--events", type=int, default=1000, help="Events per caller")
+    parser.add_argument("--fsync", choices=AUDIT_FSYNC_POLICIES, default="durable", help="Audit writer fsync policy")
+    args = parser.parse_args()
+
+    print(f"{args.callers} callers x {args.events} audit events")
+    with tempfile.TemporaryDirectory(dir=".") as tmp:
+        legacy_path = Path(tmp) / "legacy.log"
+
+        def open_append():
+            with open(legacy_path, "a") as f:
+                f.write(json.dumps(event(), default=str) + "\n")
+
+        bench("open/append per event", args.callers, args.events, open_append)
+
+        writer = AuditWriter(str(Path(tmp) / "audit.log"), fsync=args.fsync)
+        bench(
+            "buffered writer", args.callers, args.events,
+            lambda: writer.append([(json.dumps(event(), default=str) + "\n").encode()])
+        )
+        writer.close()
+        print(f"   {writer.events_written / max(writer.batches, 1):6.1f} events/append")
+
+        writer = AuditWriter(str(Path(tmp) / "durable.log"), fsync=args.fsync)
+        bench(
+            "buffered writer, durable", args.callers, args.events // 10,
+            lambda: writer.append([(json.dumps(event(), default=str) + "\n").encode()], durable=True).result()
+        )
+        writer.close()
+        print(f"   {writer.events_written / max(writer.batches, 1):6.1f} events/append")
+
+
+if __name__ == "__main__":
+    main()
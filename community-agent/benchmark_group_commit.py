@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark for durable vault writes
+
+Concurrent writers each save small artifacts and wait until they are
+durable. Compares every writer doing its own temp file + fsync + rename
+against the group-commit writer at several batch windows, and reports
+durable writes per second, the average batch size and median latency.
+
+Usage:
+    python3 benchmark_group_commit.py
+    python3 benchmark_group_commit.py --writers 64 --writes 200 --fsync file
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List
+
+from app.utils.writer import FSYNC_POLICIES, GroupCommitWriter
+
+PAYLOAD = b'{"type":"prefill","created_at":"2025-01-01T00:00:00","data":{"journey_id":"journey_000000000001"}}'
+
+
+def fsync_each(path: Path, data: bytes):
+    """What a durable write costs without batching"""
+    temp_path = path.with_name(f".{path.name}.tmp")
+    with open(temp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    fd = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def bench(label: str, directory: Path, writers: int, writes: int, write: Callable[[Path, bytes], None]) -> float:
+    latencies: List[float] = []
+    lock = threading.Lock()
+
+    def worker(n: int):
+        folder = directory / f"journey_{n:06d}"
+        folder.mkdir(parents=True)
+        own = []
+        for i in range(writes):
+            start = time.perf_counter()
+            write(folder / f"step_{i}.json", PAYLOAD)
+            own.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(writers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    rate = writers * writes / elapsed
+    print(f"   {label:<28} {rate:>10,.0f} durable writes/sec   p50 {statistics.median(latencies) * 1000:6.2f}ms", end="")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark group-commit vault writes")
+    parser.add_argument("--writers", type=int, default=32, help="Concurrent writer threads")
+    parser.add_argument("--writes", type=int, default=100, help="Writes per writer")
+    parser.add_argument("--windows", default="0,1,2,5,10", help="Batch windows to try, in milliseconds")
+    parser.add_argument("--fsync", choices=FSYNC_POLICIES, default="batch", help="Group-commit fsync policy")
+    args = parser.parse_args()
+
+    print(f"{args.writers} writers x {args.writes} durable writes, fsync={args.fsync}")
+    with tempfile.TemporaryDirectory(dir=".") as tmp:
+        bench("fsync per write", Path(tmp) / "baseline", args.writers, args.writes, fsync_each)
+        print()
+
+        for window in (float(w) for w in args.windows.split(",")):
+            writer = GroupCommitWriter(window_ms=window, fsync=args.fsync)
+            bench(
+                f"group commit, {window:g}ms window", Path(tmp) / f"window_{window:g}", args.writers, args.writes,
+                lambda path, data: writer.write(str(path), data).result()
+            )
+            writer.close()
+            print(f"   {writer.files_written / max(writer.batches, 1):6.1f} writes/batch")
+
+
+if __name__ == "__main__":
+    main()
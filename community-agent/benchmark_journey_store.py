@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the SQLite journey repository
+
+Populates a fresh database with synthetic journeys (1M by default) and then
+reports random read, write and life-event query throughput against it.
+
+Usage:
+    python3 benchmark_journey_store.py
+    python3 benchmark_journey_store.py --journeys 100000 --db /tmp/journeys.db
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+from app.models import Intake, Journey, JourneyStep, Person, Disaster
+from app.repository import SQLiteJourneyRepository
+
+LIFE_EVENTS = ["baby_just_born", "job_loss", "disaster_recovery", "carer_support"]
+
+
+def make_journey(i: int):
+    """Create a synthetic journey/intake pair"""
+    journey = Journey(
+        id=f"journey_{i:012x}",
+        life_event=LIFE_EVENTS[i % len(LIFE_EVENTS)],
+        jurisdiction="NSW",
+        steps=[
+            JourneyStep(id="emergency_disaster_payment", title="Emergency Disaster Payment"),
+            JourneyStep(id="emergency_housing_assistance", title="Emergency Housing Assistance"),
+        ],
+    )
+    intake = Intake(
+        applicant=Person(full_name=f"Applicant {i}", dob=date(1980, 1, 1 + i % 28)),
+        disaster=Disaster(type="Flood", location="Lismore, NSW"),
+    )
+    return journey, intake
+
+
+def populate(repo: SQLiteJourneyRepository, total: int, batch_size: int = 10000):
+    """Fill the repository with ``total`` journeys"""
+    start = time.perf_counter()
+    # Serialising through Pydantic dominates population time, so reuse a
+    # template pair and only vary the ids.
+    template_journey, template_intake = make_journey(0)
+
+    for offset in range(0, total, batch_size):
+        batch = []
+        for i in range(offset, min(offset + batch_size, total)):
+            journey = template_journey.model_copy(
+                update={"id": f"journey_{i:012x}", "life_event": LIFE_EVENTS[i % len(LIFE_EVENTS)]}
+            )
+            batch.append((journey, template_intake))
+        repo.save_many(batch)
+        print(f"\r   populated {min(offset + batch_size, total):,}/{total:,}", end="", flush=True)
+
+    elapsed = time.perf_counter() - start
+    print(f"\n   bulk load: {total / elapsed:,.0f} journeys/sec ({elapsed:.1f}s)")
+
+
+def bench_reads(repo: SQLiteJourneyRepository, total: int, operations: int):
+    ids = [f"journey_{random.randrange(total):012x}" for _ in range(operations)]
+    start = time.perf_counter()
+    for journey_id in ids:
+        repo.get_journey(journey_id)
+    elapsed = time.perf_counter() - start
+    print(f"   get_journey: {operations / elapsed:,.0f} reads/sec")
+
+    start = time.perf_counter()
+    for journey_id in ids:
+        repo.get_intake(journey_id)
+    elapsed = time.perf_counter() - start
+    print(f"   get_intake:  {operations / elapsed:,.0f} reads/sec")
+
+
+def bench_writes(repo: SQLiteJourneyRepository, total: int, operations: int):
+    pairs = [make_journey(total + i) for i in range(operations)]
+    start = time.perf_counter()
+    for journey, intake in pairs:
+        repo.save(journey, intake)
+    elapsed = time.perf_counter() - start
+    print(f"   save (one transaction per write): {operations / elapsed:,.0f} writes/sec")
+
+
+def bench_life_event(repo: SQLiteJourneyRepository, operations: int):
+    start = time.perf_counter()
+    for i in range(operations):
+        repo.list_by_life_event(LIFE_EVENTS[i % len(LIFE_EVENTS)], limit=20)
+    elapsed = time.perf_counter() - start
+    print(f"   list_by_life_event(limit=20): {operations / elapsed:,.0f} queries/sec")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SQLite journey repository")
+    parser.add_argument("--journeys", type=int, default=1_000_000, help="journeys to preload")
+    parser.add_argument("--operations", type=int, default=20000, help="operations per measurement")
+    parser.add_argument("--db", type=str, default=None, help="database path (default: temp file)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db or str(Path(tmp) / "journeys.db")
+        print("📦 JOURNEY REPOSITORY BENCHMARK")
+        print("=" * 60)
+        print(f"Database: {db_path}")
+
+        repo = SQLiteJourneyRepository(db_path)
+        populate(repo, args.journeys)
+        print(f"   stored journeys: {repo.count():,}")
+
+        bench_reads(repo, args.journeys, args.operations)
+        bench_writes(repo, args.journeys, min(args.operations, 5000))
+        bench_life_event(repo, min(args.operations, 2000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for form prefill throughput
+
+Compares the previous reflective prefill (split each dotted source and walk
+it with hasattr/getattr per field per request) against the compiled prefill
+functions from the form registry, on synthetic intakes for every form.
+
+Usage:
+    python3 benchmark_prefill.py
+    python3 benchmark_prefill.py --intakes 20000
+"""
+
+import argparse
+import random
+import time
+from datetime import date
+from typing import Any, Dict
+
+from app.forms.registry import get_form_registry
+from app.models import (
+    Intake, Person, Baby, Address, Employment, Banking, Disaster, Housing, FormSchema
+)
+
+
+def reflective_get(obj: Any, path: str) -> Any:
+    """The per-field path walk prefill used before compilation"""
+    try:
+        for key in path.split('.'):
+            if hasattr(obj, key):
+                obj = getattr(obj, key)
+            elif isinstance(obj, dict):
+                obj = obj[key]
+            else:
+                return None
+        return obj
+    except (AttributeError, KeyError, TypeError):
+        return None
+
+
+def reflective_prefill(form_schema: FormSchema, intake: Intake) -> Dict[str, Any]:
+    form_data = {}
+    for field in form_schema.fields:
+        value = reflective_get(intake, field.source)
+        if value is not None:
+            form_data[field.id] = value
+    return form_data
+
+
+def make_intake(i: int) -> Intake:
+    """Create a synthetic intake that touches most form sources"""
+    address = Address(line1=f"{i} Test Street", suburb="Lismore", state="NSW", postcode="2480")
+    person = Person(
+        full_name=f"Person {i}",
+        dob=date(1980, 1 + i % 12, 1 + i % 28),
+        email=f"person{i}@example.com" if i % 2 else None,
+        phone="0400 000 000",
+        address=address,
+    )
+    return Intake(
+        parent1=person,
+        parent2=person if i % 3 == 0 else None,
+        baby=Baby(name=f"Baby {i}", dob=date(2025, 1, 1), parents=[person]),
+        applicant=person,
+        employment=Employment(last_employer="Acme", skills_assessment=bool(i % 2)),
+        banking=Banking(bsb="123-456", account_number=f"{i:08d}", account_name=person.full_name),
+        disaster=Disaster(type="Flood", date=date(2025, 8, 15), location="Lismore"),
+        housing=Housing(status="Displaced", household_size=1 + i % 5),
+        address=address,
+    )
+
+
+def bench(label: str, intakes, schemas, prefill) -> float:
+    start = time.perf_counter()
+    for intake in intakes:
+        prefill(intake)
+    elapsed = time.perf_counter() - start
+    forms_per_second = len(intakes) * len(schemas) / elapsed
+    print(f"   {label:<32} {forms_per_second:>12,.0f} forms/sec")
+    return forms_per_second
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark form prefill throughput")
+    parser.add_argument("--intakes", type=int, default=10000, help="synthetic intakes to prefill")
+    args = parser.parse_args()
+
+    registry = get_form_registry()
+    schemas = [registry.get(step_id, jurisdiction) for step_id, jurisdiction, _ in sorted(registry.keys())]
+    intakes = [make_intake(i) for i in range(args.intakes)]
+    random.shuffle(intakes)
+
+    print("📝 FORM PREFILL BENCHMARK")
+    print("=" * 60)
+    print(f"{len(intakes):,} intakes x {len(schemas)} forms")
+
+    # Both implementations must agree before their speed is worth comparing
+    for intake in intakes[:100]:
+        compiled = registry.compile(schemas)(intake)
+        assert list(compiled) == [reflective_prefill(schema, intake) for schema in schemas]
+
+    before = bench(
+        "reflective (per form)", intakes, schemas,
+        lambda intake: [reflective_prefill(schema, intake) for schema in schemas]
+    )
+    compiled_each = [registry.compile([schema]) for schema in schemas]
+    after = bench(
+        "compiled (per form)", intakes, schemas,
+        lambda intake: [prefill(intake) for prefill in compiled_each]
+    )
+    compiled_all = registry.compile(schemas)
+    shared = bench("compiled (all forms, shared)", intakes, schemas, compiled_all)
+
+    print(f"   speedup per form: {after / before:.1f}x, shared: {shared / before:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
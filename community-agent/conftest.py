@@ -0,0 +1,122 @@
+"""
+Shared test fixtures
+
+Tests that start the app run it against a temporary ``_artifacts/`` through
+the ``temporary_artifacts`` fixture. Audit tests point the audit writer,
+chain and index at a log of their own through ``use_log``, and have another
+process append to it with ``log_elsewhere``. Test modules run as scripts use
+``artifacts_in_tempdir`` and ``audit_singletons`` directly.
+"""
+
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import pytest
+
+from app.utils import audit_chain, audit_index, audit_writer
+from app.utils.audit import log_event
+from app.utils.audit_chain import AuditChain
+from app.utils.audit_index import AuditIndex
+from app.utils.audit_segments import AUDIT_SEGMENT_BYTES, SegmentStore
+from app.utils.audit_writer import AuditWriter
+
+
+@contextmanager
+def artifacts_in_tempdir() -> Iterator[Path]:
+    """Run the app against an empty _artifacts/ in a temporary directory, not the repo's"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        artifacts = Path(tmp) / "_artifacts"
+        environ = {
+            "ARTIFACT_INDEX_PATH": str(artifacts / "artifact_index.db"),
+            "AUDIT_LOG_PATH": str(artifacts / "audit.log"),
+            "CONSENT_LEDGER_PATH": str(artifacts / "consent_ledger.jsonl"),
+        }
+        saved_environ = {name: os.environ.get(name) for name in environ}
+        os.environ.update(environ)
+        # Relative _artifacts/ paths resolve here, also for modules imported before this test
+        os.chdir(tmp)
+
+        from app.utils import audit_chain, audit_index, audit_writer, consent_ledger, storage
+        from app.utils.writer import shutdown_vault_writer
+
+        singletons = [
+            (audit_writer, "_audit_writer"), (audit_chain, "_audit_chain"), (audit_index, "_audit_index"),
+            (consent_ledger, "_consent_ledger"), (storage, "_artifact_index"), (storage, "_artifact_cache"),
+        ]
+        previous = [getattr(module, name) for module, name in singletons]
+        for module, name in singletons:
+            setattr(module, name, None)
+        try:
+            yield Path(tmp)
+        finally:
+            # Queued writes land in the temporary directory before leaving it
+            shutdown_vault_writer()
+            audit_writer.shutdown_audit_writer()
+            if consent_ledger._consent_ledger is not None:
+                consent_ledger._consent_ledger.close()
+            for (module, name), value in zip(singletons, previous):
+                setattr(module, name, value)
+            os.chdir(cwd)
+            for name, value in saved_environ.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+
+@pytest.fixture
+def temporary_artifacts() -> Iterator[Path]:
+    """The temporary directory the test runs in, holding its _artifacts/"""
+    with artifacts_in_tempdir() as tmp:
+        yield tmp
+
+
+def use_audit_log(path: Path, every: int = 10, block: int = 8, max_bytes: int = AUDIT_SEGMENT_BYTES) -> AuditChain:
+    """Point the audit writer, chain and index singletons at the log at ``path``"""
+    writer = AuditWriter(str(path), window_ms=1)
+    chain = AuditChain(writer, every, segments=SegmentStore(path, max_bytes=max_bytes))
+    audit_writer._audit_writer = writer
+    audit_chain._audit_chain = chain
+    audit_index._audit_index = AuditIndex(writer, chain.segments, block)
+    return chain
+
+
+@contextmanager
+def audit_singletons() -> Iterator[None]:
+    """Close the audit log the test used and restore the process's own"""
+    previous = audit_writer._audit_writer, audit_chain._audit_chain, audit_index._audit_index
+    try:
+        yield
+    finally:
+        if audit_writer._audit_writer is not previous[0]:
+            audit_writer._audit_writer.close()
+        if audit_chain._audit_chain is not previous[1]:
+            audit_chain._audit_chain.segments.close()
+        audit_writer._audit_writer, audit_chain._audit_chain, audit_index._audit_index = previous
+
+
+@pytest.fixture
+def use_log() -> Iterator[Callable[..., AuditChain]]:
+    """``use_audit_log``, with the audit singletons restored after the test"""
+    with audit_singletons():
+        yield use_audit_log
+
+
+def log_elsewhere(path: str, count: int, options: Dict[str, Any], metadata: Optional[Dict[str, Any]] = None):
+    """
+    Another worker process appending ``count`` events to the log at ``path``
+
+    ``options`` are passed to ``use_audit_log``. Events are paced so they
+    interleave with the test's own.
+    """
+    chain = use_audit_log(Path(path), **options)
+    for i in range(count):
+        log_event("system", "elsewhere", "From another process", metadata={**(metadata or {}), "i": i})
+        time.sleep(0.001)
+    chain.writer.close()
+    chain.segments.close()
@@ -50,6 +50,17 @@ class CommunityAssistantDemo:
             print(f"Error {response.status_code}: {response.text}")
         print()
     
+    def wait_for_submission(self, response):
+        """Long-poll a queued submission job until it has a receipt"""
+        if response.status_code != 202:
+            return response
+        
+        job_url = f"{self.base_url}{response.headers['Location']}"
+        while True:
+            response = self.session.get(job_url, params={"wait": 30})
+            if response.status_code != 200 or response.json()["status"] in ("succeeded", "failed"):
+                return response
+    
     def run_demo(self):
         """Run the complete demo workflow"""
         print("🚀 AGENTIC COMMUNITY ASSISTANT DEMO")
@@ -157,10 +168,10 @@ class CommunityAssistantDemo:
             "place_of_birth": "Westmead Hospital"
         }
         
-        response = self.session.post(f"{self.base_url}/submit/{self.journey_id}/birth_reg", json=form_data)
+        response = self.wait_for_submission(self.session.post(f"{self.base_url}/submit/{self.journey_id}/birth_reg", json=form_data))
         self.print_response(response, "Birth Registration Submission")
         
-        if response.status_code == 200:
+        if response.status_code == 200 and response.json()["status"] == "succeeded":
             print("✅ Birth registration submitted successfully!")
         else:
             print("❌ Failed to submit birth registration.")
@@ -188,10 +199,10 @@ class CommunityAssistantDemo:
             "baby_dob": "2025-08-28"
         }
         
-        response = self.session.post(f"{self.base_url}/submit/{self.journey_id}/medicare_enrolment", json=medicare_form_data)
+        response = self.wait_for_submission(self.session.post(f"{self.base_url}/submit/{self.journey_id}/medicare_enrolment", json=medicare_form_data))
         self.print_response(response, "Medicare Submission")
         
-        if response.status_code == 200:
+        if response.status_code == 200 and response.json()["status"] == "succeeded":
             print("✅ Medicare enrolment submitted successfully!")
         else:
             print("❌ Failed to submit Medicare enrolment.")
@@ -105,7 +105,7 @@ def main():
     for step in journey.steps:
         print(f"\n   Prefilling {step.title}...")
         try:
-            prefill_response = orchestrator.prefill_form(journey.id, step.id, intake)
+            prefill_response = orchestrator.prefill_form(journey.id, step.id, intake, journey.jurisdiction)
             print(f"     Form ID: {prefill_response.form_id}")
             print(f"     Fields filled: {len(prefill_response.data)}")
             
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Artifact blob test
+
+Saves prefills and submissions that repeat the same form data and checks
+that the form data is stored once as a blob, that loading returns the
+artifacts exactly as saved, and that the blob is deleted only after every
+artifact referring to it is gone.
+"""
+
+import tempfile
+from pathlib import Path
+
+from app.utils import storage
+from app.utils.storage import ArtifactIndex, collect_blobs, load_artifact, save_artifact, save_artifacts
+
+
+def test_repeated_payloads_share_a_blob():
+    """Test that identical form data is written once and reference counted"""
+    print("Testing content-addressed blobs...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        artifacts_dir = Path(tmp) / "_artifacts"
+        index = ArtifactIndex(str(Path(tmp) / "index.db"), artifacts_dir)
+        previous, storage._artifact_index = storage._artifact_index, index
+        try:
+            form_data = {f"parent1_field_{i}": f"value {i}" for i in range(60)}
+            journey = artifacts_dir / "vault" / "00" / "00" / "journey_000000000000"
+            prefill = {"journey_id": "journey_000000000000", "step_id": "birth_reg", "form_data": form_data}
+
+            # A revisit re-saves the prefill; the submission repeats its form data
+            save_artifact(str(journey / "prefill" / "birth_reg_prefill.json"), prefill, "prefill")
+            save_artifacts([
+                (str(journey / "prefill" / "birth_reg_prefill.json"), prefill, "prefill"),
+                (str(journey / "submissions" / "birth_reg_submission.json"), {**prefill, "status": "submitted"}, "submission"),
+                (str(journey / "prefill" / "small.json"), {"journey_id": "journey_000000000000", "form_data": {"a": 1}}, "prefill")
+            ])
+
+            blobs = list((artifacts_dir / "blobs").rglob("*.blob"))
+            assert len(blobs) == 1
+            stats = index.stats()
+            assert stats["blobs"] == {"blobs": 1, "size_bytes": blobs[0].stat().st_size}
+
+            submission = load_artifact(str(journey / "submissions" / "birth_reg_submission.json"))
+            assert submission["data"] == {**prefill, "status": "submitted"}
+            assert load_artifact(str(journey / "prefill" / "small.json"))["data"]["form_data"] == {"a": 1}
+            assert "$blob" in (journey / "prefill" / "birth_reg_prefill.json").read_text()
+
+            # Still referenced, and rebuilding the index keeps the reference count
+            index.rebuild()
+            assert collect_blobs(grace_seconds=0)["removed_blobs"] == 0
+
+            index.remove_journey("journey_000000000000")
+            assert collect_blobs()["removed_blobs"] == 0  # still within its grace period
+            assert collect_blobs(grace_seconds=0) == {"removed_blobs": 1, "reclaimed_bytes": stats["blobs"]["size_bytes"]}
+            assert not blobs[0].exists()
+            assert index.stats()["blobs"] == {"blobs": 0, "size_bytes": 0}
+        finally:
+            storage._artifact_index = previous
+
+    print("✅ Repeated form data is stored once and collected when unreferenced")
+
+
+if __name__ == "__main__":
+    test_repeated_payloads_share_a_blob()
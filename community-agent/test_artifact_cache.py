@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Artifact cache test
+
+Reads artifacts repeatedly through load_artifact and checks that repeat
+reads hit the cache, that rewrites through save_artifact or straight to
+disk are never served stale, and that the byte budget evicts the least
+recently used artifacts.
+"""
+
+import json
+import tempfile
+from pathlib import Path
+
+from app.utils import storage
+from app.utils.cache import ArtifactCache
+from app.utils.storage import ArtifactIndex, load_artifact, save_artifact
+
+
+def test_cache_hits_and_invalidation():
+    """Test that cached artifacts are reused until they change"""
+    print("Testing the artifact read cache...")
+
+    previous = storage._artifact_cache, storage._artifact_index
+    storage._artifact_cache = cache = ArtifactCache(max_bytes=1024 * 1024)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            storage._artifact_index = ArtifactIndex(str(Path(tmp) / "index.db"), Path(tmp))
+            path = str(Path(tmp) / "vault" / "journey_000000000001" / "intake" / "intake.json")
+            save_artifact(path, {"journey_id": "journey_000000000001", "applicant": "First"}, "intake")
+
+            first = load_artifact(path)
+            for _ in range(9):
+                assert load_artifact(path) is first
+            assert (cache.hits, cache.misses) == (9, 1)
+
+            save_artifact(path, {"journey_id": "journey_000000000001", "applicant": "Second"}, "intake")
+            assert load_artifact(path)["data"]["applicant"] == "Second"
+
+            # Written behind the cache's back, with the same size as before
+            Path(path).write_text(json.dumps({"type": "intake", "data": {"applicant": "Thirds"}}))
+            Path(path).write_text(json.dumps({"type": "intake", "data": {"applicant": "Fourth"}}))
+            assert load_artifact(path)["data"]["applicant"] == "Fourth"
+
+            stats = storage.get_artifact_cache().stats()
+            assert stats["hits"] == 9 and stats["misses"] == 3
+    finally:
+        storage._artifact_cache, storage._artifact_index = previous
+
+    print("✅ Repeat reads hit the cache and changed artifacts are re-read")
+
+
+def test_byte_budget_evicts_least_recently_used():
+    """Test that the cache stays within its byte budget"""
+    cache = ArtifactCache(max_bytes=300)
+    for key in ("a", "b", "c"):
+        cache.put(key, 1, {"key": key}, 100)
+    assert cache.get("a", 1) is not None
+
+    cache.put("d", 1, {"key": "d"}, 100)
+    assert cache.get("b", 1) is None
+    assert all(cache.get(key, 1) is not None for key in ("a", "c", "d"))
+    assert cache.stats()["bytes"] == 300 and cache.evictions == 1
+
+    # Never cached: larger than the whole budget
+    cache.put("huge", 1, {}, 301)
+    assert cache.get("huge", 1) is None
+
+    print("✅ Byte budget evicts the least recently used artifacts")
+
+
+if __name__ == "__main__":
+    test_cache_hits_and_invalidation()
+    test_byte_budget_evicts_least_recently_used()
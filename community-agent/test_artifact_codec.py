@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Artifact codec test
+
+Round-trips artifacts through every codec, checks that load_artifact reads
+files written before codecs existed, and migrates a legacy vault in place.
+"""
+
+import json
+import tempfile
+from pathlib import Path
+
+from app.utils import artifact_codec, storage
+from app.utils.artifact_codec import ArtifactCodec, decode, describe
+from app.utils.storage import ArtifactIndex, load_artifact, migrate_artifacts
+
+ARTIFACT = {
+    "type": "prefill",
+    "created_at": "2025-01-01T00:00:00",
+    "data": {
+        "journey_id": "journey_000000000001",
+        "step_id": "birth_reg",
+        "form_data": {f"field_{i}": f"Value number {i}" for i in range(100)},
+    },
+}
+
+
+def _codecs():
+    codecs = [ArtifactCodec("json", compression) for compression in artifact_codec.COMPRESSIONS]
+    if artifact_codec.msgpack is not None:
+        codecs += [ArtifactCodec("msgpack", compression) for compression in artifact_codec.COMPRESSIONS]
+    return codecs
+
+
+def test_codecs_round_trip():
+    """Test that every codec decodes transparently and compresses only large artifacts"""
+    print("Testing artifact codecs...")
+
+    legacy = json.dumps(ARTIFACT, indent=2).encode()
+    assert decode(legacy) == ARTIFACT
+
+    for codec in _codecs():
+        encoded = codec.encode(ARTIFACT)
+        assert decode(encoded) == ARTIFACT, codec.name
+        assert describe(encoded) == (codec.format, codec.compression)
+        assert len(encoded) < len(legacy)
+        print(f"   {codec.name:<16} {len(encoded):>6} bytes (legacy {len(legacy)})")
+
+    # Below the threshold artifacts are stored as plain, readable JSON
+    small = {"type": "intake", "data": {"journey_id": "journey_000000000002"}}
+    encoded = ArtifactCodec("json", "gzip").encode(small)
+    assert json.loads(encoded) == small
+
+    try:
+        decode(artifact_codec.MAGIC + b"\x09\x00{}")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Unknown header was accepted")
+
+    print("✅ Codecs round-trip and legacy JSON still loads")
+
+
+def test_migrate_legacy_vault():
+    """Test that migration re-encodes legacy artifacts and keeps the index in step"""
+    with tempfile.TemporaryDirectory() as tmp:
+        artifacts_dir = Path(tmp) / "_artifacts"
+        paths = []
+        for i in range(5):
+            path = artifacts_dir / "vault" / f"journey_{i:012d}" / "prefill" / "birth_reg_prefill.json"
+            path.parent.mkdir(parents=True)
+            path.write_text(json.dumps(ARTIFACT, indent=2))
+            paths.append(path)
+        (artifacts_dir / "consent_ledger.json").write_text(json.dumps({"consents": []}))
+
+        index = ArtifactIndex(str(Path(tmp) / "index.db"), artifacts_dir)
+        previous, storage._artifact_index = storage._artifact_index, index
+        try:
+            codec = ArtifactCodec("json", "lzma")
+            result = migrate_artifacts(codec)
+            assert result["converted"] == 5
+            assert result["bytes_after"] < result["bytes_before"]
+
+            for path in paths:
+                assert describe(path.read_bytes()) == ("json", "lzma")
+                assert load_artifact(str(path)) == ARTIFACT
+            assert index.stats()["total_size_bytes"] == result["bytes_after"]
+            assert json.loads((artifacts_dir / "consent_ledger.json").read_text()) == {"consents": []}
+
+            # Migrating again is a no-op
+            assert migrate_artifacts(codec)["converted"] == 0
+        finally:
+            storage._artifact_index = previous
+
+    print("✅ Legacy vault migrated in place")
+
+
+if __name__ == "__main__":
+    test_codecs_round_trip()
+    test_migrate_legacy_vault()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Artifact index test
+
+Writes artifacts into a temporary vault and checks that the SQLite index
+backfills existing files, pages with a stable cursor, filters by journey,
+type and step, and keeps running stats counters that agree with a recount.
+"""
+
+import json
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from app.utils import storage
+from app.utils.storage import ArtifactIndex, save_artifact
+
+
+@contextmanager
+def _saving_to(index: ArtifactIndex):
+    """Record artifacts saved inside the block in ``index``"""
+    previous, storage._artifact_index = storage._artifact_index, index
+    try:
+        yield
+    finally:
+        storage._artifact_index = previous
+
+
+def _vault(tmp: Path, journeys: int) -> Path:
+    artifacts_dir = tmp / "_artifacts"
+    # Saved by an earlier process, recorded in an index the tests do not open
+    with _saving_to(ArtifactIndex(str(tmp / "earlier.db"), artifacts_dir)):
+        _save_journeys(artifacts_dir, journeys)
+    # Not an artifact: must not be indexed
+    (artifacts_dir / "consent_ledger.json").write_text(json.dumps({"consents": []}))
+    return artifacts_dir
+
+
+def _save_journeys(artifacts_dir: Path, journeys: int):
+    for i in range(journeys):
+        journey_id = f"journey_{i:012d}"
+        vault = artifacts_dir / "vault" / journey_id
+        life_event = "job_loss" if i % 5 == 0 else "baby_just_born"
+        save_artifact(
+            str(vault / "intake" / "intake.json"),
+            {"journey_id": journey_id, "life_event": life_event, "applicant": f"Person {i}"},
+            "intake"
+        )
+        for step_id in ("birth_reg", "medicare_enrolment"):
+            save_artifact(
+                str(vault / "prefill" / f"{step_id}_prefill.json"),
+                {"journey_id": journey_id, "step_id": step_id, "form_data": {}},
+                "prefill"
+            )
+
+
+def test_index_backfill_and_pagination():
+    """Test that a new index backfills the vault and pages through it"""
+    print("Testing artifact index backfill, filters and pagination...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        artifacts_dir = _vault(Path(tmp), journeys=25)
+        index = ArtifactIndex(str(Path(tmp) / "index.db"), artifacts_dir)
+
+        stats = index.stats()
+        assert stats["total_journeys"] == 25
+        assert stats["total_artifacts"] == 75
+        assert stats["total_size_bytes"] == sum(p.stat().st_size for p in (artifacts_dir / "vault").rglob("*.json"))
+
+        seen, cursor = [], None
+        while True:
+            page, cursor = index.list(cursor=cursor, limit=10)
+            seen.extend(entry["path"] for entry in page)
+            if cursor is None:
+                break
+        assert len(seen) == len(set(seen)) == 75
+
+        journey, _ = index.list(journey_id="journey_000000000007")
+        assert len(journey) == 3
+        assert {entry["type"] for entry in journey} == {"intake", "prefill"}
+
+        prefills, _ = index.list(artifact_type="prefill", step_id="birth_reg", limit=100)
+        assert len(prefills) == 25
+        assert all(entry["step_id"] == "birth_reg" for entry in prefills)
+
+        # Re-saving an artifact updates its entry instead of duplicating it
+        path = journey[0]["path"]
+        with _saving_to(index):
+            save_artifact(path, {"applicant": "Updated"}, "intake")
+        assert index.stats()["total_artifacts"] == 75
+
+        index.remove_journey("journey_000000000007")
+        assert index.list(journey_id="journey_000000000007")[0] == []
+        assert index.stats()["total_journeys"] == 24
+
+    print("✅ Artifact index backfills, filters and pages correctly")
+
+
+def test_running_counters_match_reconcile():
+    """Test that trigger-maintained counters agree with a full recount"""
+    with tempfile.TemporaryDirectory() as tmp:
+        artifacts_dir = _vault(Path(tmp), journeys=10)
+        index = ArtifactIndex(str(Path(tmp) / "index.db"), artifacts_dir)
+
+        # Artifacts saved after the intake inherit the journey's life event
+        journey_id = "journey_000000000010"
+        vault = artifacts_dir / "vault" / journey_id
+        with _saving_to(index):
+            save_artifact(
+                str(vault / "intake" / "intake.json"),
+                {"journey_id": journey_id, "life_event": "job_loss"},
+                "intake"
+            )
+            save_artifact(
+                str(vault / "submissions" / "unemployment_centrelink_submission.json"),
+                {"journey_id": journey_id, "step_id": "unemployment_centrelink"},
+                "submission"
+            )
+        index.remove_journey("journey_000000000003")
+
+        stats = index.stats()
+        assert stats == index.reconcile()
+        assert stats["total_journeys"] == 10
+        assert stats["by_type"]["submission"]["artifacts"] == 1
+        assert stats["by_life_event"]["job_loss"]["journeys"] == 3
+        assert stats["by_life_event"]["job_loss"]["artifacts"] == 8
+        assert stats["by_life_event"]["baby_just_born"]["journeys"] == 7
+
+    print("✅ Running stats counters agree with a full reconcile")
+
+
+if __name__ == "__main__":
+    test_index_backfill_and_pagination()
+    test_running_counters_match_reconcile()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Audit chain test
+
+Logs events after a few pre-chain events and checks that the chain picks
+up after them, that checkpoints seal every group, that full (parallel) and
+time-range verification pass, that an event's inclusion proof checks out,
+that a restarted process continues the chain, that two processes appending
+to one log keep a single chain, and that deleting a line is detected.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from app.utils import audit_chain
+from app.utils.audit import log_event
+from app.utils.audit_chain import prove_event, verify_audit_log, verify_proof
+from conftest import audit_singletons, log_elsewhere, use_audit_log
+
+
+def test_chained_log_verifies(use_log):
+    """Test that the chain, checkpoints, proofs and verification agree"""
+    print("Testing the hash-chained audit log...")
+
+    parallel_bytes = audit_chain.AUDIT_VERIFY_PARALLEL_BYTES
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "audit.log"
+        with open(path, "w") as f:
+            for i in range(3):
+                event = {"timestamp": f"2025-01-0{i + 1}T00:00:00", "actor": "system", "action": "legacy",
+                         "why": "Before the chain", "consent_id": None, "metadata": {}}
+                event["hash"] = hashlib.sha256(json.dumps(event, sort_keys=True).encode()).hexdigest()
+                f.write(json.dumps(event) + "\n")
+        legacy_hash = event["hash"]
+
+        writer = use_log(path).writer
+        try:
+            for i in range(55):
+                log_event("system", "step", "Chained", metadata={"journey_id": f"journey_{i % 4}", "i": i})
+            middle = datetime.utcnow()
+            for i in range(55, 60):
+                log_event("system", "step", "Chained", metadata={"journey_id": f"journey_{i % 4}", "i": i})
+            writer.flush()
+
+            events = [json.loads(line) for line in path.read_text().splitlines()]
+            first = next(event for event in events if "seq" in event)
+            assert first["seq"] == 0 and first["prev_hash"] == legacy_hash
+
+            result = verify_audit_log()
+            assert result["valid"], result
+            assert (result["events"], result["unchained_events"], result["checkpoints"], result["unsealed_events"]) == (63, 3, 6, 0)
+
+            audit_chain.AUDIT_VERIFY_PARALLEL_BYTES = 0
+            parallel = verify_audit_log(workers=3)
+            assert parallel["valid"] and parallel["workers"] == 3, parallel
+            assert parallel["checkpoints"] == 6
+
+            recent = verify_audit_log(start=middle)
+            assert recent["valid"] and recent["checkpoints"] == 1, recent
+            # The same moment with a time zone selects the same events
+            sydney = timezone(timedelta(hours=10))
+            aware = verify_audit_log(start=middle.replace(tzinfo=timezone.utc).astimezone(sydney))
+            assert {key: aware[key] for key in ("valid", "events", "checkpoints")} == \
+                {key: recent[key] for key in ("valid", "events", "checkpoints")}, aware
+
+            proof = prove_event(12)
+            assert proof["event"]["metadata"]["i"] == 12
+            assert verify_proof(proof["event"]["hash"], proof["proof"], proof["root"])
+            assert not verify_proof(proof["event"]["prev_hash"], proof["proof"], proof["root"])
+            assert len(proof["proof"]) <= 4
+
+            # A restarted process continues the chain from the log
+            writer.close()
+            writer = use_log(path).writer
+            log_event("system", "restart", "After a restart")
+            writer.flush()
+            last = json.loads(path.read_text().splitlines()[-1])
+            assert last["seq"] == 60 and last["prev_hash"] == events[-2]["hash"]
+            assert verify_audit_log()["valid"]
+
+            # Deleting one event breaks the chain and its checkpoint
+            writer.close()
+            lines = path.read_text().splitlines(keepends=True)
+            del lines[20]
+            path.write_text("".join(lines))
+            Path(str(path) + ".checkpoints").unlink()
+            use_log(path)
+            tampered = verify_audit_log(workers=1)
+            assert not tampered["valid"]
+            print(f"   Tampering reported: {tampered['errors'][0]}")
+        finally:
+            audit_chain.AUDIT_VERIFY_PARALLEL_BYTES = parallel_bytes
+
+    print("✅ Chain, checkpoints, proofs and parallel verification agree")
+
+
+def test_processes_share_one_chain(use_log):
+    """Test that two processes appending to one log keep a single chain"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "audit.log"
+        writer = use_log(path).writer
+        other = multiprocessing.get_context("spawn").Process(target=log_elsewhere, args=(str(path), 300, {}))
+        other.start()
+        ours = 0
+        while other.is_alive() or ours < 100:
+            log_event("system", "here", "From this process", metadata={"i": ours})
+            ours += 1
+            time.sleep(0.001)
+        other.join()
+        writer.flush()
+
+        records = [json.loads(line) for line in path.read_text().splitlines()]
+        events = [record for record in records if record.get("type") != "checkpoint"]
+        print(f"   {ours} + 300 events from two processes")
+        assert [event["seq"] for event in events] == list(range(ours + 300))
+        assert [event["metadata"]["i"] for event in events if event["action"] == "elsewhere"] == list(range(300))
+
+        result = verify_audit_log(workers=1)
+        assert result["valid"], result
+        assert result["checkpoints"] == (ours + 300) // 10
+
+    print("✅ Processes sharing the log keep one chain")
+
+
+if __name__ == "__main__":
+    with audit_singletons():
+        test_chained_log_verifies(use_audit_log)
+    with audit_singletons():
+        test_processes_share_one_chain(use_audit_log)
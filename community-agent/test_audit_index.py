@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Audit index test
+
+Logs events for a few journeys and actions and checks that get_audit_trail
+answers journey, action and time-range queries from the index, newest
+first, the same as filtering every line; that events logged before the
+index existed are picked up from the log; that a restarted process
+reads the index back from its sidecar; and that a query sees the events
+another process appended, with the shared sidecar kept in log order.
+"""
+
+import json
+import multiprocessing
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from app.utils import audit_index
+from app.utils.audit import get_audit_trail, log_event
+from conftest import audit_singletons, log_elsewhere, use_audit_log
+
+# Checkpoints every 16 events, an index time block every 8
+OPTIONS = {"every": 16, "block": 8}
+
+
+def scan(path: Path, keep) -> list:
+    """What the old full scan returned: every matching event, newest first"""
+    events = [json.loads(line) for line in path.read_text().splitlines()]
+    events = [event for event in events if event.get("type") != "checkpoint" and keep(event)]
+    return sorted(events, key=lambda event: event["timestamp"], reverse=True)
+
+
+def test_indexed_audit_queries(use_log):
+    """Test that indexed queries match a full scan of the log"""
+    print("Testing indexed audit trail queries...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "audit.log"
+        writer = use_log(path, **OPTIONS).writer
+        # Logged before anything asks for the index
+        for i in range(20):
+            log_event("system", "journey_created", "Early", metadata={"journey_id": f"journey_{i % 3}", "i": i})
+        writer.flush()
+        audit_index._audit_index = None
+
+        for i in range(20, 60):
+            action = "form_submitted" if i % 5 == 0 else "step"
+            log_event("system", action, "Indexed", metadata={"journey_id": f"journey_{i % 3}", "i": i})
+            if i == 40:
+                time.sleep(0.01)
+                middle = datetime.utcnow()
+        log_event("system", "no_journey", "No journey in metadata")
+
+        trail = get_audit_trail(journey_id="journey_1")
+        assert [e["metadata"]["i"] for e in trail] == [e["metadata"]["i"] for e in scan(path, lambda e: e["metadata"].get("journey_id") == "journey_1")]
+        assert trail[0]["metadata"]["i"] == 58
+
+        submitted = get_audit_trail(journey_id="journey_2", action="form_submitted")
+        assert [e["metadata"]["i"] for e in submitted] == [50, 35, 20]
+
+        recent = get_audit_trail(action="form_submitted", start_date=middle)
+        assert [e["metadata"]["i"] for e in recent] == [55, 50, 45]
+
+        window = get_audit_trail(start_date=middle, end_date=datetime.fromisoformat(trail[0]["timestamp"]))
+        assert [e["metadata"]["i"] for e in window] == list(range(58, 40, -1))
+
+        assert len(get_audit_trail()) == 61
+        assert len(get_audit_trail(limit=5)) == 5
+        assert get_audit_trail(journey_id="journey_unknown") == []
+
+        # A restarted process reads the sidecar and indexes only the tail
+        writer.close()
+        writer = use_log(path, **OPTIONS).writer
+        log_event("system", "restart", "After a restart", metadata={"journey_id": "journey_1"})
+        restarted = get_audit_trail(journey_id="journey_1")
+        assert restarted[0]["action"] == "restart" and len(restarted) == len(trail) + 1
+        assert len(audit_index._audit_index.offsets) == 62
+        print(f"   {len(audit_index._audit_index._max_so_far)} time index blocks for 62 events")
+
+    print("✅ Indexed queries match a full scan, newest first")
+
+
+def test_queries_see_other_processes(use_log):
+    """Test that a query covers every process's events and the sidecar stays in order"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "audit.log"
+        use_log(path, **OPTIONS)
+        other = multiprocessing.get_context("spawn").Process(
+            target=log_elsewhere, args=(str(path), 300, OPTIONS, {"journey_id": "journey_elsewhere"})
+        )
+        other.start()
+        ours = 0
+        while other.is_alive() or ours < 100:
+            log_event("system", "here", "From this process", metadata={"journey_id": "journey_here", "i": ours})
+            ours += 1
+            time.sleep(0.001)
+        other.join()
+
+        elsewhere = get_audit_trail(journey_id="journey_elsewhere")
+        assert [e["metadata"]["i"] for e in elsewhere] == list(range(299, -1, -1))
+        # Log order, newest first
+        everything = get_audit_trail()
+        assert [e["seq"] for e in everything] == list(range(ours + 299, -1, -1))
+
+        sidecar = [json.loads(line) for line in Path(str(path) + ".index").read_text().splitlines()]
+        assert [entry[0] for entry in sidecar] == sorted({entry[0] for entry in sidecar})
+        assert len(sidecar) == ours + 300
+
+    print("✅ Queries see every process's events")
+
+
+if __name__ == "__main__":
+    with audit_singletons():
+        test_indexed_audit_queries(use_audit_log)
+    with audit_singletons():
+        test_queries_see_other_processes(use_audit_log)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Audit segment test
+
+Logs events with a small segment size and checks that the log rotates into
+gzipped segments described by the manifest, that queries and proofs reach
+into them, that time-range queries skip segments outside the range, that
+retention drops whole segments while verification still proves the chain
+across them, that a restarted process continues the chain after the last
+segment, that a segment rotated at shutdown is compressed on the next
+start, that an edited manifest entry is detected, and that rotating from
+the command line while another process writes loses no events.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from app.utils import audit_writer
+from app.utils.audit import get_audit_trail, log_event
+from app.utils.audit_chain import prove_event, verify_audit_log, verify_proof
+from conftest import audit_singletons, use_audit_log
+
+# Small segments and index time blocks, so a few dozen events span several
+OPTIONS = {"max_bytes": 6000, "block": 4}
+
+
+def log(start: int, stop: int):
+    for i in range(start, stop):
+        log_event("system", "step", "Segmented", metadata={"journey_id": f"journey_{i % 2}", "i": i})
+        # Rotation is decided after each written batch; keep batches small
+        if i % 5 == 4:
+            audit_writer.get_audit_writer().flush()
+
+
+def test_rotated_segments(use_log):
+    """Test rotation, segment queries, retention and continuity across segments"""
+    print("Testing audit log segments...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "audit.log"
+        chain = use_log(path, **OPTIONS)
+        log(0, 40)
+        chain.writer.flush()
+        time.sleep(0.01)
+        middle = datetime.utcnow()
+        log(40, 80)
+        chain.writer.flush()
+        chain.segments.wait()
+
+        live = chain.segments.live()
+        assert len(live) >= 3, live
+        for entry in live:
+            assert entry["compressed"] and (Path(tmp) / entry["file"]).suffix == ".gz"
+            assert not chain.segments.segment_path(entry["segment"], compressed=False).exists()
+        print(f"   {len(live)} segments, {sum(e['compressed_bytes'] for e in live)} bytes compressed "
+              f"from {sum(e['bytes'] for e in live)}")
+
+        # Queries reach into the segments, newest first
+        trail = get_audit_trail(journey_id="journey_1")
+        assert [event["metadata"]["i"] for event in trail] == list(range(79, 0, -2))
+        assert [event["metadata"]["i"] for event in get_audit_trail(limit=3)] == [79, 78, 77]
+
+        # A time range skips the segments before it
+        read = []
+        lines = chain.segments.lines
+        chain.segments.lines = lambda entry, start=0: read.append(entry["segment"]) or lines(entry, start)
+        recent = get_audit_trail(start_date=middle)
+        chain.segments.lines = lines
+        assert [event["metadata"]["i"] for event in recent] == list(range(79, 39, -1))
+        assert live[0]["segment"] not in read
+
+        verified = verify_audit_log()
+        assert verified["valid"] and verified["segments"] == len(live), verified
+        assert verified["events"] == 80
+        assert verify_audit_log(start=middle)["valid"]
+
+        proof = prove_event(3)
+        assert proof["event"]["metadata"]["i"] == 3
+        assert verify_proof(proof["event"]["hash"], proof["proof"], proof["root"])
+
+        # Retention drops whole segments; the manifest still links the chain
+        dropped = chain.segments.drop_before(middle)
+        assert dropped["dropped_segments"] >= 1 and dropped["reclaimed_bytes"] > 0
+        assert not (Path(tmp) / live[0]["file"]).exists()
+        verified = verify_audit_log()
+        assert verified["valid"] and verified["dropped_segments"] == dropped["dropped_segments"], verified
+        assert min(event["metadata"]["i"] for event in get_audit_trail()) > 0
+
+        # A restarted process continues after the last segment
+        chain.writer.close()
+        chain.segments.close()
+        chain = use_log(path, **OPTIONS)
+        log_event("system", "restart", "After a restart")
+        chain.writer.flush()
+        last = json.loads(path.read_text().splitlines()[-1])
+        assert last["seq"] == 80
+        assert verify_audit_log()["valid"]
+
+        # A rotation while the interpreter shuts down leaves its segment for the next start
+        chain.segments.close()
+        chain.segments._compressor = ThreadPoolExecutor(1)
+        chain.segments._compressor.shutdown()
+        assert chain.rotate().result() is not None
+        # The chain finished taking up the rotation
+        assert chain._covered == 0
+        number = chain.segments.live()[-1]["segment"]
+        assert chain.segments.segment_path(number, compressed=False).exists()
+        chain.writer.close()
+        chain.segments._compressor = None
+        chain = use_log(path, **OPTIONS)
+        chain.segments.wait()
+        assert chain.segments.live()[-1]["compressed"]
+        assert verify_audit_log()["valid"]
+
+        # Editing a dropped segment's manifest entry is detected
+        chain.writer.close()
+        chain.segments.close()
+        manifest = json.loads(chain.segments.manifest_path.read_text())
+        manifest["segments"][0]["last_hash"] = "f" * 64
+        chain.segments.manifest_path.write_text(json.dumps(manifest))
+        chain = use_log(path, **OPTIONS)
+        tampered = verify_audit_log()
+        assert not tampered["valid"]
+        print(f"   Tampering reported: {tampered['errors'][0]}")
+
+    print("✅ Segments rotate, compress, drop and still verify as one chain")
+
+
+def test_rotation_from_another_process(use_log):
+    """Test that `make rotate-audit` while the server writes loses no events"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "audit.log"
+        chain = use_log(path, **OPTIONS)
+        env = {**os.environ, "AUDIT_LOG_PATH": str(path), "AUDIT_CHECKPOINT_EVERY": "10"}
+        logged = 0
+        for _ in range(3):
+            rotate = subprocess.Popen(
+                [sys.executable, "-m", "app.utils.audit_chain", "rotate"],
+                cwd=Path(__file__).parent, env=env, stdout=subprocess.DEVNULL
+            )
+            while rotate.poll() is None:
+                log_event("system", "step", "While rotating", metadata={"journey_id": "journey_0", "i": logged})
+                logged += 1
+                time.sleep(0.001)
+            assert rotate.returncode == 0
+        chain.writer.flush()
+        chain.segments.wait()
+        print(f"   {logged} events across {len(chain.segments.live())} segments")
+
+        trail = get_audit_trail(action="step")
+        assert [event["metadata"]["i"] for event in trail] == list(range(logged - 1, -1, -1))
+        segments = chain.segments.live()
+        assert [entry["segment"] for entry in segments] == list(range(1, len(segments) + 1))
+        verified = verify_audit_log(workers=1)
+        assert verified["valid"] and verified["events"] == logged, verified
+
+    print("✅ Rotating from another process keeps every event")
+
+
+if __name__ == "__main__":
+    with audit_singletons():
+        test_rotated_segments(use_audit_log)
+    with audit_singletons():
+        test_rotation_from_another_process(use_audit_log)
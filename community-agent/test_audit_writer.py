@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Audit writer test
+
+Logs events from many threads through a buffered audit writer and checks
+that log_event returns before the disk write, that events share appends and
+all land in order per thread, that durable events are on disk when
+log_event returns, and that closing the writer keeps queued events.
+"""
+
+import json
+import tempfile
+import threading
+from pathlib import Path
+
+from app.utils import audit_writer
+from app.utils.audit import get_audit_trail, log_event
+from app.utils.audit_writer import AuditWriter
+
+
+def read_events(path: Path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_buffered_audit_writes():
+    """Test that audit events are queued, batched and flushed"""
+    print("Testing the buffered audit writer...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "audit.log"
+        writer = AuditWriter(str(path), window_ms=5000)
+        previous, audit_writer._audit_writer = audit_writer._audit_writer, writer
+        try:
+            # Queued, not yet written
+            event_id = log_event("system", "journey_created", "Queued", metadata={"journey_id": "journey_a"})
+            assert len(event_id) == 64
+            assert not path.exists() or path.read_text() == ""
+
+            # A durable write goes out at once, with everything queued before it
+            log_event("user", "consent_granted", "Durable", metadata={"journey_id": "journey_a"}, durable=True)
+            assert [event["event_id"] for event in read_events(path)][0] == event_id
+            assert len(read_events(path)) == 2
+
+            writer.window = 0.02
+
+            def worker(n: int):
+                for i in range(50):
+                    log_event("system", "step", "Concurrent", metadata={"thread": n, "i": i})
+
+            threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            # Reads see queued events
+            assert len(get_audit_trail(action="step")) == 400
+            print(f"   402 events in {writer.batches} appends")
+            assert writer.batches < 100
+
+            for n in range(8):
+                steps = [event["metadata"]["i"] for event in read_events(path) if event["metadata"].get("thread") == n]
+                assert steps == list(range(50))
+
+            log_event("system", "shutdown", "Still queued at close")
+            writer.close()
+            assert read_events(path)[-1]["action"] == "shutdown"
+        finally:
+            writer.close()
+            audit_writer._audit_writer = previous
+
+    print("✅ Audit events are batched, ordered and flushed on close")
+
+
+if __name__ == "__main__":
+    test_buffered_audit_writes()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Bulk prefill test
+
+Checks that the column-wise bulk prefill gives every row the same form as
+prefilling that applicant on its own, from Intake models and from raw
+intake dicts, with required-field flags to match; that the batch file
+holds the rows; and that POST /bulk/prefill answers 404 only for an
+unknown step and 422 for intake data it cannot read.
+"""
+
+import gzip
+import json
+import os
+import tempfile
+from datetime import date
+
+os.environ.setdefault("JOURNEY_STORE", "memory")
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from app.forms.bulk import bulk_prefill
+from app.forms.registry import get_form_registry
+from app.models import Intake
+from benchmark_prefill import make_intake
+from conftest import artifacts_in_tempdir
+
+
+def _row_wise(schema, intake: Intake) -> dict:
+    (form,) = get_form_registry().compile([schema])(intake)
+    return {key: value.isoformat() if isinstance(value, date) else value for key, value in form.items()}
+
+
+def _row(frame: pd.DataFrame, index: int, schema) -> dict:
+    row = frame.iloc[index]
+    return {field.id: row[field.id] for field in schema.fields if not pd.isna(row[field.id])}
+
+
+def test_bulk_matches_row_wise_prefill():
+    """Test that every bulk row equals the row-wise prefill of its applicant"""
+    print("Testing bulk prefill against row-wise prefill...")
+
+    registry = get_form_registry()
+    intakes = [make_intake(i) for i in range(30)] + [Intake(), Intake(applicant=make_intake(0).applicant)]
+    records = [intake.model_dump(mode="json", exclude_none=True) for intake in intakes]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for key in sorted(registry.keys()):
+            schema = registry.get(*key)
+            required = [field.id for field in schema.fields if field.required]
+            expected = [_row_wise(schema, intake) for intake in intakes]
+
+            for source in (intakes, records):
+                result = bulk_prefill(schema, source, output_dir=tmp)
+                assert result.rows == len(intakes)
+                for index, form in enumerate(expected):
+                    assert _row(result.frame, index, schema) == form, (schema.id, index)
+                    incomplete = any(field_id not in form for field_id in required)
+                    assert bool(result.frame["missing_required"].iloc[index]) == incomplete
+                assert result.incomplete_rows == sum(
+                    any(field_id not in form for field_id in required) for form in expected
+                )
+
+            with gzip.open(result.path, "rt") as f:
+                written = [json.loads(line) for line in f]
+            assert [row["row_id"] for row in written] == list(range(len(intakes)))
+
+    print(f"✅ Bulk rows match row-wise prefill for {len(registry.keys())} forms")
+
+
+def test_bulk_prefill_errors(temporary_artifacts):
+    """Test that only an unknown step is 404 and unreadable intake data is 422"""
+    from app import orchestrator as orchestrator_module
+    from app.main import app
+
+    records = [make_intake(i).model_dump(mode="json") for i in range(3)]
+    with TestClient(app) as client:
+        response = client.post("/bulk/prefill/unemployment_centrelink", json=records)
+        assert response.status_code == 200, response.text
+        assert response.json()["rows"] == 3
+
+        assert client.post("/bulk/prefill/no_such_step", json=records).status_code == 404
+
+        def unreadable(*args, **kwargs):
+            raise ValueError("All arrays must be of the same length")
+
+        bulk = orchestrator_module.bulk_prefill
+        orchestrator_module.bulk_prefill = unreadable
+        try:
+            response = client.post("/bulk/prefill/unemployment_centrelink", json=records)
+        finally:
+            orchestrator_module.bulk_prefill = bulk
+        assert response.status_code == 422, response.text
+        assert response.json()["detail"].startswith("Invalid intake data")
+
+    print("✅ Bulk prefill answers 404 for unknown steps and 422 for bad data")
+
+
+if __name__ == "__main__":
+    test_bulk_matches_row_wise_prefill()
+    with artifacts_in_tempdir() as tmp:
+        test_bulk_prefill_errors(tmp)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Concurrency test for the Agentic Community Assistant API
+
+Replaces the Ollama command with a slow stand-in process and checks that
+/health and /plan latency stays flat while 50 /ai/chat calls are in flight.
+A handler that blocks the event loop would serialise the chats and push
+every other request behind them.
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("JOURNEY_STORE", "memory")
+
+import httpx
+
+from conftest import artifacts_in_tempdir
+
+LLM_DELAY_SECONDS = 1.0
+CHAT_REQUESTS = 50
+SAMPLES = 20
+
+INTAKE = {
+    "parent1": {"full_name": "Concurrency Test", "dob": "1990-01-01"},
+    "baby": {"dob": "2025-01-01", "parents": []},
+}
+
+
+async def _latency(client: httpx.AsyncClient, url: str) -> float:
+    start = time.perf_counter()
+    response = await client.get(url)
+    assert response.status_code == 200, response.text
+    return time.perf_counter() - start
+
+
+async def _sample(client: httpx.AsyncClient, url: str) -> list:
+    latencies = []
+    for _ in range(SAMPLES):
+        latencies.append(await _latency(client, url))
+        await asyncio.sleep(0.01)
+    return latencies
+
+
+async def _run() -> dict:
+    from app.main import app
+    from app.ai_integration import ollama_ai
+
+    ollama_ai.command = [
+        sys.executable, "-c",
+        f"import sys, time; sys.stdin.read(); time.sleep({LLM_DELAY_SECONDS}); print('Assistant: Happy to help.')"
+    ]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver", timeout=60) as client:
+        response = await client.post("/intake", json=INTAKE)
+        assert response.status_code == 200, response.text
+        plan_url = f"/plan/{response.json()['journey_id']}"
+
+        baseline_health = await _sample(client, "/health")
+        baseline_plan = await _sample(client, plan_url)
+
+        chat_start = time.perf_counter()
+        chats = [
+            asyncio.create_task(client.post("/ai/chat", json={"message": f"My home was damaged in a flood ({i})"}))
+            for i in range(CHAT_REQUESTS)
+        ]
+        # Give the chat requests time to reach the LLM before sampling
+        await asyncio.sleep(0.2)
+
+        loaded_health = await _sample(client, "/health")
+        loaded_plan = await _sample(client, plan_url)
+        in_flight = sum(1 for chat in chats if not chat.done())
+
+        responses = await asyncio.gather(*chats)
+        chat_elapsed = time.perf_counter() - chat_start
+
+    assert all(r.status_code == 200 and r.json()["success"] for r in responses)
+
+    return {
+        "baseline_health": baseline_health,
+        "baseline_plan": baseline_plan,
+        "loaded_health": loaded_health,
+        "loaded_plan": loaded_plan,
+        "in_flight": in_flight,
+        "chat_elapsed": chat_elapsed,
+    }
+
+
+def test_latency_flat_under_llm_load(temporary_artifacts):
+    """Test that /health and /plan are unaffected by in-flight /ai/chat calls"""
+    print("Testing request latency while /ai/chat calls are in flight...")
+
+    results = asyncio.run(_run())
+
+    for name in ("health", "plan"):
+        baseline = statistics.median(results[f"baseline_{name}"])
+        loaded = results[f"loaded_{name}"]
+        print(f"   /{name}: baseline median {baseline * 1000:.1f}ms, "
+              f"loaded median {statistics.median(loaded) * 1000:.1f}ms, max {max(loaded) * 1000:.1f}ms")
+        # A blocked loop would hold each request for at least one LLM call
+        assert max(loaded) < LLM_DELAY_SECONDS / 2
+
+    print(f"   {results['in_flight']} chats still in flight after sampling")
+    print(f"   {CHAT_REQUESTS} chats completed in {results['chat_elapsed']:.2f}s")
+
+    assert results["in_flight"] > 0
+    # Chats overlap instead of running back to back
+    assert results["chat_elapsed"] < CHAT_REQUESTS * LLM_DELAY_SECONDS / 4
+
+    print("✅ Latency stays flat while LLM calls are in flight")
+
+
+if __name__ == "__main__":
+    with artifacts_in_tempdir() as tmp:
+        test_latency_flat_under_llm_load(tmp)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Consent ledger test
+
+Grants consents from many threads and checks that none is lost, that
+verify_consent answers from the index (scope, expiry, unknown IDs), that a
+new process rebuilds the index from the snapshot plus the lines after it,
+that a grant made by another process is found, that an old
+consent_ledger.json is converted, and that the kept summary counts match a
+recount as consents expire.
+"""
+
+import json
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from app.utils import audit_writer, consent_ledger
+from app.utils.audit import log_consent, verify_consent, verify_journey_consent
+from app.utils.audit_writer import AuditWriter
+from app.utils.consent_ledger import ConsentLedger, consent_expiry
+
+
+def test_append_only_ledger():
+    """Test that grants are appended, indexed and rebuilt"""
+    print("Testing the append-only consent ledger...")
+
+    previous = audit_writer._audit_writer, consent_ledger._consent_ledger
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "consent_ledger.jsonl"
+        audit_writer._audit_writer = AuditWriter(str(Path(tmp) / "audit.log"), window_ms=1)
+        ledger = consent_ledger._consent_ledger = ConsentLedger(str(path), snapshot_every=50)
+        try:
+            granted = []
+            lock = threading.Lock()
+
+            def worker(n: int):
+                for i in range(20):
+                    consent_id = log_consent(f"journey_{n}_{i}", ["birth_registration"], "user", ttl_days=30)
+                    with lock:
+                        granted.append(consent_id)
+
+            threads = [threading.Thread(target=worker, args=(n,)) for n in range(6)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            # No grant lost to a concurrent one
+            assert len(path.read_text().splitlines()) == 120
+            assert all(verify_consent(consent_id, "birth_registration") for consent_id in granted)
+            assert not verify_consent(granted[0], "medicare_enrolment")
+            assert not verify_consent("unknown", "birth_registration")
+            assert verify_journey_consent("journey_3_7", "birth_registration")
+            assert not verify_journey_consent("journey_unknown", "birth_registration")
+
+            expired = log_consent("journey_expired", ["birth_registration"], "user", ttl_days=0)
+            assert not verify_consent(expired, "birth_registration")
+            assert ledger.verify(granted[0], "birth_registration", now=datetime.utcnow() + timedelta(days=31)) is False
+
+            # A new process: snapshot plus the lines after it
+            assert ledger.snapshot_path.exists()
+            snapshot = json.loads(ledger.snapshot_path.read_text())
+            assert 0 < snapshot["offset"] < path.stat().st_size
+            rebuilt = ConsentLedger(str(path))
+            assert all(rebuilt.verify(consent_id, "birth_registration") for consent_id in granted)
+            assert len(list(rebuilt.consents())) == 121
+
+            # Another process's grant is found on a miss
+            other = ConsentLedger(str(path))
+            other.grant({
+                "consent_id": "from_other_worker", "journey_id": "journey_other",
+                "consent_scope": ["birth_registration"], "granted_at": datetime.utcnow().isoformat(), "ttl_days": 1
+            })
+            other.close()
+            assert verify_consent("from_other_worker", "birth_registration")
+            rebuilt.close()
+
+            # An old single-file ledger is converted on first use
+            legacy_dir = Path(tmp) / "legacy"
+            legacy_dir.mkdir()
+            (legacy_dir / "consent_ledger.json").write_text(json.dumps({"consents": [{
+                "consent_id": "legacy", "journey_id": "journey_legacy",
+                "consent_scope": ["birth_registration"], "granted_at": datetime.utcnow().isoformat() + "Z", "ttl_days": 30
+            }]}))
+            converted = ConsentLedger(str(legacy_dir / "consent_ledger.jsonl"))
+            assert converted.verify("legacy", "birth_registration")
+            assert (legacy_dir / "consent_ledger.jsonl").exists()
+        finally:
+            audit_writer._audit_writer.close()
+            consent_ledger._consent_ledger.close()
+            audit_writer._audit_writer, consent_ledger._consent_ledger = previous
+
+    print("✅ Consents are appended, indexed and rebuilt from a snapshot")
+
+
+def test_incremental_summary():
+    """Test that the kept counts match a recount as consents expire"""
+    print("Testing the incremental consent summary...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = ConsentLedger(str(Path(tmp) / "consent_ledger.jsonl"))
+        now = datetime.utcnow()
+        for i in range(30):
+            ledger.grant({
+                "consent_id": f"consent_{i}", "journey_id": f"journey_{i}",
+                "consent_scope": ["birth_registration"] + (["medicare_enrolment"] if i % 3 == 0 else []),
+                "granted_at": (now - timedelta(days=i)).isoformat(), "ttl_days": 10
+            })
+
+        def recount(at: datetime) -> dict:
+            consents = list(ledger.consents())
+            active = [c for c in consents if at < consent_expiry(c)]
+            return {"active_consents": len(active), "expired_consents": len(consents) - len(active)}
+
+        for days in (0, 5, 25):
+            at = now + timedelta(days=days)
+            summary = ledger.summary(at)
+            assert {key: summary[key] for key in ("active_consents", "expired_consents")} == recount(at), (days, summary)
+            assert summary["total_consents"] == 30
+        assert summary == {
+            "total_consents": 30, "active_consents": 0, "expired_consents": 30,
+            "scope_breakdown": {"birth_registration": 30, "medicare_enrolment": 10},
+            "active_scope_breakdown": {}
+        }
+        print(f"   {ledger.summary(now + timedelta(days=25))}")
+        ledger.close()
+
+    print("✅ Consent summary counts follow grants and expiry")
+
+
+if __name__ == "__main__":
+    test_append_only_ledger()
+    test_incremental_summary()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Form registry test
+
+Loads versioned schemas from a temporary forms directory and checks that
+the latest version is served unless one is asked for, that a state schema
+overrides the national one only in its state, that a broken edit keeps the
+previous version in service while a fixed one replaces it, and that every
+step of every journey template has a schema in app/forms.
+"""
+
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from app.forms.journeys import get_journey_templates
+from app.forms.registry import NATIONAL, FormRegistry, get_form_registry
+
+
+def _schema(path: Path, form_id: str, step_id: str = "birth_reg", source: str = "baby.dob"):
+    path.write_text(
+        f"id: {form_id}\n"
+        f"step_id: {step_id}\n"
+        f"title: {form_id}\n"
+        f"description: {form_id}\n"
+        "fields:\n"
+        "  - id: baby_dob\n"
+        "    label: Baby's Date of Birth\n"
+        "    required: true\n"
+        f"    source: {source}\n"
+        "review_text: Review\n"
+    )
+
+
+def _touch(path: Path):
+    # Make the edit visible to the registry's mtime check on coarse clocks
+    later = time.time() + 2
+    os.utime(path, (later, later))
+
+
+def test_registry_versions_and_overrides():
+    """Test version selection, state overrides and reloads that keep the last good version"""
+    print("Testing the form registry...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        forms = Path(tmp)
+        _schema(forms / "birth_registry.v1.yml", "birth_national_v1")
+        _schema(forms / "birth_registry.v2.yml", "birth_national_v2")
+        _schema(forms / "birth_registry.nsw.v1.yml", "birth_nsw_v1")
+        registry = FormRegistry(forms)
+
+        assert len(registry) == 3
+        assert sorted(registry.keys()) == [("birth_reg", "AU", 1), ("birth_reg", "AU", 2), ("birth_reg", "NSW", 1)]
+
+        # Latest version unless asked for
+        assert registry.get("birth_reg").id == "birth_national_v2"
+        assert registry.get("birth_reg", version=1).id == "birth_national_v1"
+        assert registry.get("birth_reg", "VIC").id == "birth_national_v2"
+
+        # A state schema overrides the national one, case-insensitively, in that state only
+        assert registry.get("birth_reg", "NSW").id == "birth_nsw_v1"
+        assert registry.get("birth_reg", "nsw").id == "birth_nsw_v1"
+        assert registry.get("birth_reg", "NSW", version=2).id == "birth_national_v2"
+        assert registry.get("birth_reg", "NSW", version=3) is None
+        assert registry.get("unknown_step") is None
+
+        # A broken edit is logged and the previous version stays in service
+        broken = forms / "birth_registry.nsw.v1.yml"
+        _schema(broken, "birth_nsw_broken", source="baby..dob")
+        _touch(broken)
+        assert registry.refresh() == []
+        assert registry.get("birth_reg", "NSW").id == "birth_nsw_v1"
+
+        # Fixing it replaces the version in service
+        _schema(broken, "birth_nsw_fixed")
+        _touch(broken)
+        assert registry.refresh() == [broken]
+        assert registry.get("birth_reg", "NSW").id == "birth_nsw_fixed"
+
+        # A new version takes over; deleting it falls back to the one before
+        newer = forms / "birth_registry.nsw.v2.yml"
+        _schema(newer, "birth_nsw_v2")
+        registry.refresh()
+        assert registry.get("birth_reg", "NSW").id == "birth_nsw_v2"
+        newer.unlink()
+        registry.refresh()
+        assert registry.get("birth_reg", "NSW").id == "birth_nsw_fixed"
+
+    print("✅ Versions, state overrides and failed reloads resolve as expected")
+
+
+def test_every_journey_step_has_a_schema():
+    """Test that app/forms covers every step of every journey template"""
+    registry = get_form_registry()
+    templates = get_journey_templates()
+    checked = 0
+    for life_event in templates.life_events:
+        for jurisdiction, steps in life_event.journeys.items():
+            # A national template applies in states without their own
+            for state in ([jurisdiction] if jurisdiction != NATIONAL else [NATIONAL, "VIC", "QLD"]):
+                for step in steps:
+                    assert registry.get(step["id"], state) is not None, (life_event.id, state, step["id"])
+                    checked += 1
+
+    print(f"✅ All {checked} journey steps have a form schema")
+
+
+if __name__ == "__main__":
+    test_registry_versions_and_overrides()
+    test_every_journey_step_has_a_schema()
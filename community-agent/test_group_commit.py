@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Group-commit writer test
+
+Submits writes from many threads at once and checks that they share
+batches, land whole with no temp files left behind, that the later of two
+writes to one path wins, and that a failing write fails only its own future.
+"""
+
+import tempfile
+import threading
+from pathlib import Path
+
+from app.utils.writer import GroupCommitWriter
+
+
+def test_concurrent_writes_share_batches():
+    """Test that concurrent durable writes are committed in groups"""
+    print("Testing group-commit writes...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = GroupCommitWriter(window_ms=20)
+        futures = []
+        lock = threading.Lock()
+
+        def submit(n: int):
+            future = writer.write(str(Path(tmp) / f"journey_{n}" / "intake.json"), f'{{"n": {n}}}'.encode())
+            with lock:
+                futures.append(future)
+
+        threads = [threading.Thread(target=submit, args=(n,)) for n in range(50)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for future in futures:
+            future.result(timeout=10)
+
+        print(f"   50 writes in {writer.batches} batches")
+        assert writer.files_written == 50
+        assert writer.batches < 50
+        assert (Path(tmp) / "journey_7" / "intake.json").read_text() == '{"n": 7}'
+
+        path = str(Path(tmp) / "ledger.json")
+        first = writer.write(path, b"first")
+        second = writer.write(path, b"second")
+        (Path(tmp) / "blocker").write_text("not a directory")
+        broken = writer.write_many([(path, b"third"), (str(Path(tmp) / "blocker" / "x.json"), b"x")])
+        first.result(timeout=10)
+        second.result(timeout=10)
+        try:
+            broken.result(timeout=10)
+        except OSError:
+            pass
+        else:
+            raise AssertionError("Write under a file did not fail")
+        assert Path(path).read_text() == "second"
+
+        writer.close()
+        assert not list(Path(tmp).rglob("*.tmp"))
+
+    print("✅ Writes are atomic, grouped and fail independently")
+
+
+if __name__ == "__main__":
+    test_concurrent_writes_share_batches()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Intake batch test for the Agentic Community Assistant API
+
+Streams an NDJSON batch of 250 intakes, a few of them broken, through
+POST /intake/batch and checks that every line gets exactly one result line
+carrying its index, that unparseable and invalid lines are reported without
+aborting the rest, and that the valid intakes are planned in chunks of
+BATCH_CHUNK_SIZE.
+"""
+
+import json
+import os
+
+os.environ.setdefault("JOURNEY_STORE", "memory")
+
+from fastapi.testclient import TestClient
+
+from conftest import artifacts_in_tempdir
+
+RECORDS = 250
+# Line index -> what is wrong with it
+BROKEN = {3: "{not json", 120: json.dumps({"parent1": {"full_name": "No Birthday"}}), 249: "[1, 2"}
+
+
+def _line(index: int) -> str:
+    if index in BROKEN:
+        return BROKEN[index]
+    return json.dumps({
+        "parent1": {"full_name": f"Batch Parent {index}", "dob": "1990-01-01"},
+        "baby": {"dob": "2025-01-01", "parents": []},
+    })
+
+
+def test_ndjson_batch_streams_per_line_results(temporary_artifacts):
+    """Test that every NDJSON line is answered and bad lines do not abort the batch"""
+    print("Testing NDJSON intake batches...")
+
+    from app import main
+
+    chunks = []
+    create = main._create_journey_batch
+
+    def recording_create(chunk):
+        chunks.append(len(chunk))
+        return create(chunk)
+
+    main._create_journey_batch = recording_create
+    try:
+        with TestClient(main.app) as client:
+            body = "\n".join(_line(i) for i in range(RECORDS)) + "\n"
+            response = client.post("/intake/batch", content=body, headers={"Content-Type": "application/x-ndjson"})
+            assert response.status_code == 200, response.text
+            assert response.headers["content-type"].startswith("application/x-ndjson")
+            results = [json.loads(line) for line in response.text.splitlines()]
+
+            assert sorted(result["index"] for result in results) == list(range(RECORDS))
+            errors = {result["index"]: result["error"] for result in results if "error" in result}
+            assert sorted(errors) == sorted(BROKEN)
+            assert errors[3].startswith("Invalid JSON") and errors[249].startswith("Invalid JSON")
+            assert errors[120][0]["loc"] == ["parent1", "dob"]
+
+            planned = [result for result in results if "journey_id" in result]
+            assert len({result["journey_id"] for result in planned}) == RECORDS - len(BROKEN)
+            for result in planned[:5]:
+                assert client.get(f"/plan/{result['journey_id']}").json()["id"] == result["journey_id"]
+    finally:
+        main._create_journey_batch = create
+
+    print(f"   {RECORDS} lines, {len(BROKEN)} errors, planned in chunks of {chunks}")
+    assert sorted(chunks, reverse=True) == [100, 100, RECORDS - len(BROKEN) - 200]
+
+    print("✅ NDJSON batches answer every line and plan in chunks")
+
+
+if __name__ == "__main__":
+    with artifacts_in_tempdir() as tmp:
+        test_ndjson_batch_streams_per_line_results(tmp)
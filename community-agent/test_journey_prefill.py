@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Journey prefill test for the Agentic Community Assistant API
+
+Checks that POST /prefill/{journey_id} prefills every step of a journey in
+one call, the same as prefilling the steps one by one, that it writes all
+prefill artifacts as one batch, and that a step without a form schema is
+reported in unavailable_steps instead of failing the call.
+"""
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+os.environ.setdefault("JOURNEY_STORE", "memory")
+
+from fastapi.testclient import TestClient
+
+from conftest import artifacts_in_tempdir
+
+INTAKE = {
+    "parent1": {"full_name": "Prefill Test", "dob": "1990-01-01", "email": "prefill@example.com"},
+    "baby": {"dob": "2025-01-01", "name": "Baby Test", "parents": []},
+}
+
+
+def test_journey_prefill_in_one_call(temporary_artifacts):
+    """Test that one call prefills every step and writes one batch of artifacts"""
+    print("Testing whole-journey prefill...")
+
+    from app import orchestrator as orchestrator_module
+    from app.forms.registry import FormRegistry
+    from app.main import app, orchestrator
+    from app.utils.storage import load_artifact
+
+    batches = []
+    save_artifacts = orchestrator_module.save_artifacts
+
+    def recording_save(artifacts):
+        artifacts = list(artifacts)
+        batches.append([path for path, _, _ in artifacts])
+        return save_artifacts(artifacts)
+
+    registry = orchestrator.form_registry
+    orchestrator_module.save_artifacts = recording_save
+    try:
+        with TestClient(app) as client:
+            journey = client.post("/intake", json=INTAKE).json()
+            journey_id = journey["journey_id"]
+            steps = [step["id"] for step in journey["plan"]["steps"]]
+
+            response = client.post(f"/prefill/{journey_id}")
+            assert response.status_code == 200, response.text
+            result = response.json()
+            assert result["journey_id"] == journey_id
+            assert sorted(result["prefills"]) == sorted(steps) and result["unavailable_steps"] == []
+            assert len(batches) == 1 and len(batches[0]) == len(steps)
+            for path in batches[0]:
+                assert load_artifact(path)["data"]["journey_id"] == journey_id
+
+            # The same forms as prefilling step by step
+            for step_id in steps:
+                single = client.post(f"/prefill/{journey_id}/{step_id}").json()
+                assert single["data"] == result["prefills"][step_id]["data"]
+                assert single["form_id"] == result["prefills"][step_id]["form_id"]
+            assert result["prefills"]["birth_reg"]["data"]["baby_name"] == "Baby Test"
+
+            # A step whose form is missing is reported, not fatal
+            with tempfile.TemporaryDirectory() as forms:
+                shutil.copy(Path(registry.forms_dir) / "medicare_newborn.v1.yml", forms)
+                orchestrator.form_registry = FormRegistry(Path(forms))
+                batches.clear()
+                result = client.post(f"/prefill/{journey_id}").json()
+            assert list(result["prefills"]) == ["medicare_enrolment"]
+            assert result["unavailable_steps"] == ["birth_reg"]
+            assert len(batches) == 1 and len(batches[0]) == 1
+
+            assert client.post("/prefill/journey_missing").status_code == 404
+    finally:
+        orchestrator_module.save_artifacts = save_artifacts
+        orchestrator.form_registry = registry
+
+    print("✅ One call prefills every step with one batch of artifacts")
+
+
+if __name__ == "__main__":
+    with artifacts_in_tempdir() as tmp:
+        test_journey_prefill_in_one_call(tmp)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Journey template test
+
+Checks that life events are detected in the order journeys.yml lists them,
+that an intake matching none falls back to default_life_event, that a
+journey id depends only on the life event's journey_id_fields, that states
+without a template of their own get the AU steps, and that malformed
+template files fail when they load.
+"""
+
+import tempfile
+from datetime import date
+from pathlib import Path
+
+from app.forms.journeys import JourneyTemplates, get_journey_templates
+from app.models import Address, Baby, Disaster, Employment, Intake, Person
+from app.orchestrator import JourneyOrchestrator
+
+PARENT = Person(full_name="Template Parent", dob=date(1990, 1, 1))
+BABY = Baby(dob=date(2025, 1, 1), parents=[])
+APPLICANT = Person(full_name="Template Applicant", dob=date(1985, 6, 1))
+EMPLOYMENT = Employment(last_employer="Acme", last_work_date=date(2025, 7, 1))
+DISASTER = Disaster(type="Flood", date=date(2025, 8, 15))
+
+
+def test_detection_order_and_default():
+    """Test that the first matching life event wins and the default covers the rest"""
+    templates = get_journey_templates()
+
+    assert templates.detect(Intake(parent1=PARENT, baby=BABY)) == ("baby_just_born", True)
+    assert templates.detect(Intake(applicant=APPLICANT, employment=EMPLOYMENT)) == ("job_loss", True)
+    assert templates.detect(Intake(applicant=APPLICANT, disaster=DISASTER)) == ("disaster_recovery", True)
+
+    # Listed order decides between several matches
+    everything = Intake(parent1=PARENT, baby=BABY, applicant=APPLICANT, employment=EMPLOYMENT, disaster=DISASTER)
+    assert templates.detect(everything) == ("baby_just_born", True)
+    assert templates.detect(Intake(applicant=APPLICANT, employment=EMPLOYMENT, disaster=DISASTER)) == ("job_loss", True)
+
+    # Every required section must be present; carer_support has none and is never detected
+    assert templates.detect(Intake(baby=BABY)) == (templates.default_life_event, False)
+    assert templates.detect(Intake(applicant=APPLICANT)) == (templates.default_life_event, False)
+    assert templates.detect(Intake()) == ("baby_just_born", False)
+
+    print("✅ Life events are detected in template order with a default")
+
+
+def test_journey_ids_and_jurisdictions():
+    """Test journey id stability and the AU fallback for states without templates"""
+    orchestrator = JourneyOrchestrator()
+
+    intake = Intake(parent1=PARENT, baby=BABY)
+    journey = orchestrator._build_journey(intake, "NSW")
+    # Only baby.dob and the parents' names identify the journey
+    same = Intake(
+        parent1=PARENT.model_copy(update={"email": "new@example.com"}), baby=BABY.model_copy(update={"name": "Named"}),
+        address=Address(line1="1 Test St", suburb="Dubbo", state="NSW", postcode="2830")
+    )
+    assert orchestrator._build_journey(same, "VIC").id == journey.id
+    assert orchestrator._build_journey(intake.model_copy(update={"parent2": APPLICANT}), "NSW").id != journey.id
+    later_baby = BABY.model_copy(update={"dob": date(2025, 1, 2)})
+    assert orchestrator._build_journey(intake.model_copy(update={"baby": later_baby}), "NSW").id != journey.id
+    assert orchestrator.journey_templates.journey_id_input(intake, "baby_just_born") == "2025-01-01Template Parent"
+
+    job_loss = Intake(applicant=APPLICANT, employment=EMPLOYMENT)
+    assert orchestrator._build_journey(job_loss, "NSW").id == orchestrator._build_journey(job_loss, "QLD").id
+    assert orchestrator._build_journey(job_loss, "NSW").id != journey.id
+
+    # NSW has its own birth template, other states get AU's
+    assert [step.title for step in journey.steps] == ["Birth Registration (NSW)", "Medicare Newborn Enrolment"]
+    for state in ("VIC", "qld", "AU"):
+        steps = orchestrator._build_journey(intake, state).steps
+        assert [step.title for step in steps] == ["Birth Registration", "Medicare Newborn Enrolment"]
+        assert all(step.status == "pending" for step in steps)
+
+    steps = orchestrator._build_journey(job_loss, "NSW").steps
+    assert [step.id for step in steps] == ["unemployment_centrelink", "job_service_provider"]
+    assert steps[1].depends_on == ["unemployment_centrelink"]
+
+    templates = orchestrator.journey_templates
+    assert templates.steps("no_such_event", "NSW") == templates.steps(templates.default_life_event, "NSW")
+
+    print("✅ Journey ids are stable and states fall back to AU steps")
+
+
+def test_malformed_templates_fail_to_load():
+    """Test that an unknown default or a dependency cycle fails at load time"""
+    broken = {
+        "unknown default": "default_life_event: nothing\nlife_events:\n"
+                           "  - id: one\n    journeys:\n      AU:\n        - {id: a, title: A}\n",
+        "cycle": "default_life_event: one\nlife_events:\n"
+                 "  - id: one\n    journeys:\n      AU:\n"
+                 "        - {id: a, title: A, depends_on: [b]}\n        - {id: b, title: B, depends_on: [a]}\n",
+        "no journeys": "default_life_event: one\nlife_events:\n  - id: one\n",
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for problem, text in broken.items():
+            path = Path(tmp) / "journeys.yml"
+            path.write_text(text)
+            try:
+                JourneyTemplates(path)
+            except ValueError as e:
+                print(f"   {problem}: {e}")
+            else:
+                raise AssertionError(f"Template with {problem} loaded")
+
+    print("✅ Malformed journey templates fail at load time")
+
+
+if __name__ == "__main__":
+    test_detection_order_and_default()
+    test_journey_ids_and_jurisdictions()
+    test_malformed_templates_fail_to_load()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Journey repository test
+
+Runs the same saves, updates, lookups, listings and deletes against the
+in-memory and SQLite repositories and checks that they answer alike, that
+SQLite keeps journeys across a reopen, and that the repository and job
+store interfaces cannot be instantiated without their storage methods.
+"""
+
+import tempfile
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from app.jobs import SubmissionJobStore
+from app.models import Baby, Intake, Journey, JourneyStep, Person
+from app.repository import InMemoryJourneyRepository, JourneyRepository, SQLiteJourneyRepository
+
+
+def _journey(i: int, life_event: str, created_at: datetime) -> Journey:
+    return Journey(
+        id=f"journey_{i:012d}",
+        life_event=life_event,
+        jurisdiction="NSW" if i % 2 else "VIC",
+        steps=[JourneyStep(id="birth_reg", title="Birth Registration")],
+        created_at=created_at,
+    )
+
+
+def _intake(i: int) -> Intake:
+    parent = Person(full_name=f"Parent {i}", dob=date(1990, 1, 1 + i % 28))
+    return Intake(parent1=parent, baby=Baby(dob=date(2025, 1, 1), parents=[parent]))
+
+
+def _exercise(repository: JourneyRepository) -> list:
+    """Apply one sequence of operations and return everything the repository answered"""
+    start = datetime(2025, 1, 1)
+    journeys = [
+        _journey(i, "job_loss" if i % 3 == 0 else "baby_just_born", start + timedelta(minutes=i))
+        for i in range(12)
+    ]
+    answers = []
+
+    repository.save(journeys[0], _intake(0))
+    repository.save_many((journey, _intake(i) if i % 4 else None) for i, journey in enumerate(journeys[1:], 1))
+    answers.append(repository.count())
+
+    # Updating without an intake keeps the one stored before
+    updated = journeys[0].model_copy(deep=True)
+    updated.steps[0].status = "completed"
+    repository.save(updated)
+
+    for i in (0, 1, 4, 11, 99):
+        journey_id = f"journey_{i:012d}"
+        journey = repository.get_journey(journey_id)
+        intake = repository.get_intake(journey_id)
+        answers.append((
+            repository.exists(journey_id),
+            journey.model_dump(mode="json") if journey else None,
+            intake.model_dump(mode="json") if intake else None,
+        ))
+
+    # Journeys handed out are not the stored ones
+    repository.get_journey("journey_000000000002").steps[0].status = "failed"
+    answers.append(repository.get_journey("journey_000000000002").steps[0].status)
+
+    for life_event, limit in (("baby_just_born", 100), ("baby_just_born", 3), ("job_loss", 100), ("none", 10)):
+        answers.append([journey.id for journey in repository.list_by_life_event(life_event, limit)])
+
+    repository.delete("journey_000000000001")
+    repository.delete("journey_missing")
+    answers.append((repository.count(), repository.exists("journey_000000000001"), repository.get_intake("journey_000000000001")))
+    repository.save_many([])
+    answers.append(repository.count())
+    return answers
+
+
+def test_sqlite_and_memory_repositories_agree():
+    """Test that both backends give the same answers to the same operations"""
+    print("Testing repository backend parity...")
+
+    memory = _exercise(InMemoryJourneyRepository())
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "journeys.db")
+        sqlite = _exercise(SQLiteJourneyRepository(db_path))
+
+        for step, (expected, actual) in enumerate(zip(memory, sqlite)):
+            assert expected == actual, (step, expected, actual)
+        assert len(memory) == len(sqlite)
+
+        reopened = SQLiteJourneyRepository(db_path)
+        assert reopened.count() == 11
+        assert reopened.get_journey("journey_000000000000").steps[0].status == "completed"
+
+    print(f"✅ In-memory and SQLite repositories agree on {len(memory)} answers")
+
+
+def test_interfaces_are_abstract():
+    """Test that a store missing its storage methods cannot be created"""
+    for interface in (JourneyRepository, SubmissionJobStore):
+        try:
+            type("Incomplete", (interface,), {})()
+        except TypeError as e:
+            print(f"   {interface.__name__}: {e}")
+        else:
+            raise AssertionError(f"{interface.__name__} subclass without methods was instantiated")
+
+
+if __name__ == "__main__":
+    test_sqlite_and_memory_repositories_agree()
+    test_interfaces_are_abstract()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Retention test
+
+Writes journeys into a temporary vault and checks that the expiry index
+starts each journey's retention with its first artifact, that consent
+ttl_days replaces it, and that the sweeper removes only expired journeys,
+in bounded batches, from the vault, the index and the caller's records.
+"""
+
+import asyncio
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from app.retention import RetentionSweeper
+from app.utils import storage
+from app.utils.storage import ArtifactIndex, save_artifact, set_journey_retention
+
+
+def test_sweeper_follows_consent_ttl():
+    """Test that expired journeys are swept in batches and consent extends retention"""
+    print("Testing retention sweeps driven by the expiry index...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        artifacts_dir = Path(tmp) / "_artifacts"
+        index = ArtifactIndex(str(Path(tmp) / "index.db"), artifacts_dir, default_ttl_days=30)
+        previous, storage._artifact_index = storage._artifact_index, index
+        try:
+            journeys = [f"journey_{i:012d}" for i in range(25)]
+            for journey_id in journeys:
+                save_artifact(
+                    str(artifacts_dir / "vault" / journey_id / "intake" / "intake.json"),
+                    {"journey_id": journey_id},
+                    "intake"
+                )
+
+            created = datetime.fromisoformat(index.get_expiry(journeys[0])) - timedelta(days=30)
+            assert abs(datetime.utcnow() - created) < timedelta(minutes=1)
+
+            # Twenty journeys are past retention; one of them had consent for longer
+            past = datetime.utcnow() - timedelta(days=60)
+            for journey_id in journeys[:20]:
+                set_journey_retention(journey_id, 30, granted_at=past)
+            set_journey_retention(journeys[0], 365, granted_at=past)
+
+            swept = []
+            sweeper = RetentionSweeper(swept.extend, interval=0, batch_size=4, max_batches=3)
+            first = asyncio.run(sweeper.sweep())
+            assert first == {"removed_journeys": 12, "more": True}
+            second = asyncio.run(sweeper.sweep())
+            assert second == {"removed_journeys": 7, "more": False}
+
+            assert sorted(swept) == journeys[1:20]
+            remaining = {path.name for path in (artifacts_dir / "vault").iterdir()}
+            assert remaining == {journeys[0], *journeys[20:]}
+            assert index.stats()["total_journeys"] == 6
+            assert index.get_expiry(journeys[1]) is None
+        finally:
+            storage._artifact_index = previous
+
+    print("✅ Sweeper removes expired journeys in batches and honours consent ttl_days")
+
+
+if __name__ == "__main__":
+    test_sweeper_follows_consent_ttl()
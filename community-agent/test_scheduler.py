@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Scheduler test for journey steps
+
+Runs journeys through the DAG executor with a slow stand-in step and checks
+that independent steps overlap, declared dependencies are respected, and a
+failed step blocks only the steps that depend on it.
+"""
+
+import asyncio
+import time
+
+from app.models import Journey, JourneyStep
+from app.scheduler import execute_journey, topological_order, StepDependencyError
+
+STEP_SECONDS = 0.2
+
+
+def _journey(*steps) -> Journey:
+    return Journey(id="journey_scheduler_test", steps=[JourneyStep(**step) for step in steps])
+
+
+async def _slow_step(step: JourneyStep) -> str:
+    await asyncio.sleep(STEP_SECONDS)
+    if step.id == "broken":
+        raise RuntimeError("submission rejected")
+    return step.id
+
+
+def test_independent_steps_run_concurrently():
+    """Test that journey wall-clock time follows the longest dependency chain"""
+    print("Testing DAG execution of journey steps...")
+
+    journey = _journey(
+        {"id": "birth_reg", "title": "Birth Registration"},
+        {"id": "medicare_enrolment", "title": "Medicare Newborn Enrolment"},
+        {"id": "child_care_subsidy", "title": "Child Care Subsidy", "depends_on": ["medicare_enrolment"]},
+    )
+
+    start = time.perf_counter()
+    results = asyncio.run(execute_journey(journey, _slow_step))
+    elapsed = time.perf_counter() - start
+    print(f"   3 steps, longest chain 2, finished in {elapsed:.2f}s")
+
+    assert results == {step.id: step.id for step in journey.steps}
+    assert all(step.status == "completed" for step in journey.steps)
+    # Two chained steps, not three back to back
+    assert elapsed < 2.5 * STEP_SECONDS
+
+    birth, medicare, subsidy = journey.steps
+    assert birth.started_at < medicare.finished_at and medicare.started_at < birth.finished_at
+    assert subsidy.started_at >= medicare.finished_at
+
+    print("✅ Independent steps overlap and dependencies are respected")
+
+
+def test_failed_step_blocks_dependents():
+    """Test that a failure blocks its dependents but not unrelated steps"""
+    journey = _journey(
+        {"id": "broken", "title": "Broken Step"},
+        {"id": "after_broken", "title": "Depends On Broken", "depends_on": ["broken"]},
+        {"id": "unrelated", "title": "Unrelated Step"},
+    )
+
+    results = asyncio.run(execute_journey(journey, _slow_step))
+
+    assert isinstance(results["broken"], RuntimeError)
+    assert isinstance(results["after_broken"], StepDependencyError)
+    assert results["unrelated"] == "unrelated"
+    assert [step.status for step in journey.steps] == ["failed", "pending", "completed"]
+    assert journey.steps[1].started_at is None
+
+    # A dependency completed in an earlier run is not the one named as failed
+    journey = _journey(
+        {"id": "done", "title": "Done Step", "status": "completed"},
+        {"id": "broken", "title": "Broken Step"},
+        {"id": "after_both", "title": "Depends On Both", "depends_on": ["done", "broken"]},
+    )
+
+    results = asyncio.run(execute_journey(journey, _slow_step))
+
+    assert str(results["after_both"]) == "Step after_both is blocked by broken"
+
+    print("✅ Failed steps block only their dependents")
+
+
+def test_invalid_dependencies_rejected():
+    """Test that unknown dependencies and cycles are rejected"""
+    for steps in (
+        [JourneyStep(id="a", title="A", depends_on=["missing"])],
+        [JourneyStep(id="a", title="A", depends_on=["b"]), JourneyStep(id="b", title="B", depends_on=["a"])],
+    ):
+        try:
+            topological_order(steps)
+        except ValueError:
+            continue
+        raise AssertionError("Invalid dependencies were accepted")
+
+    print("✅ Unknown dependencies and cycles are rejected")
+
+
+if __name__ == "__main__":
+    test_independent_steps_run_concurrently()
+    test_failed_step_blocks_dependents()
+    test_invalid_dependencies_rejected()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Submission job test for the Agentic Community Assistant API
+
+Replaces the portal submission with a slow stand-in and checks that
+POST /submit answers 202 straight away, that the job can be long-polled for
+its receipt, that /execute submits its steps through the same queue, and
+that the durable SQLite queue retries failed attempts, never hands one job
+to two workers and ignores a worker whose lease expired.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+os.environ.setdefault("JOURNEY_STORE", "memory")
+
+from fastapi.testclient import TestClient
+
+from app.jobs import SQLiteSubmissionJobStore
+from app.models import SubmissionResponse
+from conftest import artifacts_in_tempdir
+
+PORTAL_SECONDS = 1.0
+
+INTAKE = {
+    "parent1": {"full_name": "Submission Test", "dob": "1990-01-01"},
+    "baby": {"dob": "2025-01-01", "parents": []},
+}
+
+
+def test_submit_returns_before_portal(temporary_artifacts):
+    """Test that /submit queues a job and the receipt arrives via long-poll"""
+    print("Testing queued submissions against a slow portal...")
+
+    from app.main import app, submission_jobs
+
+    submit = submission_jobs.submit
+
+    def slow_portal(journey_id, step_id, form_data):
+        time.sleep(PORTAL_SECONDS)
+        return submit(journey_id, step_id, form_data)
+
+    submission_jobs.submit = slow_portal
+    try:
+        with TestClient(app) as client:
+            journey_id = client.post("/intake", json=INTAKE).json()["journey_id"]
+
+            start = time.perf_counter()
+            response = client.post(f"/submit/{journey_id}/birth_reg", json={"baby_name": "Test"})
+            elapsed = time.perf_counter() - start
+            print(f"   POST /submit answered {response.status_code} in {elapsed * 1000:.1f}ms")
+
+            assert response.status_code == 202, response.text
+            assert elapsed < PORTAL_SECONDS / 4
+            job = response.json()
+            assert job["status"] in ("queued", "running")
+            assert response.headers["Location"] == f"/submit/jobs/{job['job_id']}"
+
+            job = client.get(f"/submit/jobs/{job['job_id']}", params={"wait": 10}).json()
+            assert job["status"] == "succeeded", job
+            assert job["receipt"]["reference"].startswith("BI-")
+
+            assert client.post("/submit/journey_missing/birth_reg").status_code == 404
+            assert client.get("/submit/jobs/job_missing").status_code == 404
+    finally:
+        submission_jobs.submit = submit
+
+    print("✅ Submissions return 202 immediately and receipts arrive by long-poll")
+
+
+def test_execute_submits_through_queue(temporary_artifacts):
+    """Test that /execute submits each step as a job, in dependency order"""
+    from app.main import app, submission_jobs
+
+    submit = submission_jobs.submit
+    submitted = []
+
+    def recording_portal(journey_id, step_id, form_data):
+        submitted.append(step_id)
+        return submit(journey_id, step_id, form_data)
+
+    submission_jobs.submit = recording_portal
+    try:
+        with TestClient(app) as client:
+            journey = client.post("/intake", json=INTAKE).json()
+            response = client.post(f"/execute/{journey['journey_id']}")
+            assert response.status_code == 200, response.text
+            result = response.json()
+    finally:
+        submission_jobs.submit = submit
+
+    print(f"   /execute submitted {submitted}")
+    assert sorted(submitted) == sorted(result["submissions"]) and submitted, result
+    steps = {step["id"]: step for step in result["journey"]["steps"]}
+    for step_id in submitted:
+        for dependency in steps[step_id].get("depends_on") or []:
+            assert submitted.index(dependency) < submitted.index(step_id)
+
+    print("✅ /execute submits every step through the job queue")
+
+
+def test_sqlite_queue_claims_once_and_retries():
+    """Test that concurrent claims never share a job and failures are requeued"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteSubmissionJobStore(str(Path(tmp) / "jobs.db"))
+        job_ids = {store.enqueue("journey_test", f"step_{i}", {"i": i}).job_id for i in range(200)}
+
+        claimed = {}
+        lock = threading.Lock()
+
+        def drain():
+            while True:
+                item = store.claim()
+                if item is None:
+                    return
+                job, _, lease = item
+                with lock:
+                    claimed[job.job_id] = lease
+
+        threads = [threading.Thread(target=drain) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(claimed) == sorted(job_ids)
+
+        job_id, lease = next(iter(claimed.items()))
+        assert store.fail(job_id, lease, "portal down", retry=True)
+        job, form_data, lease = store.claim()
+        assert job.job_id == job_id and job.attempts == 2 and job.error == "portal down"
+
+        receipt = SubmissionResponse(reference="BI-test", form_id=job.step_id, submitted_at="2025-01-01T00:00:00")
+        assert store.complete(job_id, lease, receipt)
+        assert store.get(job_id).receipt == receipt
+
+        # A worker that died mid-submission loses its lease
+        store.enqueue("journey_test", "step_crashed", {})
+        crashed, _, crashed_lease = store.claim(lease_seconds=0)
+        reclaimed, _, lease = store.claim()
+        assert reclaimed.job_id == crashed.job_id and reclaimed.attempts == 2
+
+        # ... and cannot record an outcome when it comes back
+        assert not store.complete(crashed.job_id, crashed_lease, receipt)
+        assert not store.fail(crashed.job_id, crashed_lease, "portal down", retry=False)
+        assert store.get(crashed.job_id).status == "running"
+        assert store.complete(reclaimed.job_id, lease, receipt)
+        assert not store.complete(reclaimed.job_id, lease, receipt)
+
+        # A job that kept killing its worker fails once it is out of attempts
+        store.enqueue("journey_test", "step_poison", {})
+        poison, _, _ = store.claim(lease_seconds=0, max_attempts=2)
+        poison, _, _ = store.claim(lease_seconds=0, max_attempts=2)
+        assert poison.attempts == 2
+        assert store.claim(max_attempts=2) is None
+        failed = store.get(poison.job_id)
+        assert failed.status == "failed" and failed.error == "Lease expired after 2 attempts"
+
+    print("✅ SQLite queue claims each job once, retries and reclaims expired leases up to max attempts")
+
+
+if __name__ == "__main__":
+    with artifacts_in_tempdir() as tmp:
+        test_submit_returns_before_portal(tmp)
+    with artifacts_in_tempdir() as tmp:
+        test_execute_submits_through_queue(tmp)
+    test_sqlite_queue_claims_once_and_retries()
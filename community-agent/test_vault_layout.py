@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Vault layout test
+
+Checks that journeys are filed under two-level hash shards, that a flat
+vault is migrated into the shards with progress reports and its index
+entries repointed, and that the old flat paths stay readable.
+"""
+
+import json
+import os
+import tempfile
+import uuid
+from pathlib import Path
+
+from app.utils import storage
+from app.utils.storage import (
+    ArtifactIndex, _journey_id_from_path, get_vault_path, load_artifact, migrate_vault_layout, save_artifact,
+    vault_shard
+)
+
+
+def test_sharded_paths():
+    """Test that vault paths are sharded by the journey hash"""
+    print("Testing the sharded vault layout...")
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # get_vault_path creates the shard directories under _artifacts/
+        os.chdir(tmp)
+        try:
+            journey_id = f"journey_{uuid.uuid4().hex[:12]}"
+            path = get_vault_path(journey_id)
+            assert path.parts[-4:] == ("vault", journey_id[8:10], journey_id[10:12], journey_id)
+            assert _journey_id_from_path(path / "intake" / "intake.json") == journey_id
+            assert _journey_id_from_path(Path("_artifacts/vault/journey_0d27aa7c3268/intake/intake.json")) == "journey_0d27aa7c3268"
+
+            # IDs without a hash suffix are hashed
+            assert len(set(vault_shard(f"test_journey_{i}") for i in range(100))) > 90
+        finally:
+            os.chdir(cwd)
+
+    print("✅ Journeys are filed under vault/ab/cd/")
+
+
+def test_migrate_flat_vault():
+    """Test that a flat vault moves into shards and old paths stay readable"""
+    with tempfile.TemporaryDirectory() as tmp:
+        vault = Path(tmp) / "_artifacts" / "vault"
+        for i in range(25):
+            journey_id = f"journey_{i:012x}"
+            (vault / journey_id / "intake").mkdir(parents=True)
+            (vault / journey_id / "intake" / "intake.json").write_text(
+                json.dumps({"type": "intake", "created_at": "2025-01-01T00:00:00", "data": {"journey_id": journey_id, "n": i}})
+            )
+        index = ArtifactIndex(str(Path(tmp) / "index.db"), vault.parent)
+
+        previous, storage._artifact_index = storage._artifact_index, index
+        try:
+            # Journey 3 was saved again after sharding was switched on
+            sharded = vault / Path(*vault_shard("journey_000000000003")) / "journey_000000000003"
+            save_artifact(
+                str(sharded / "intake" / "intake.json"), {"journey_id": "journey_000000000003", "n": "newer"}, "intake"
+            )
+            before = index.stats()
+
+            reports = []
+            result = migrate_vault_layout(batch_size=10, progress=lambda moved, total: reports.append((moved, total)))
+            assert reports == [(10, 25), (20, 25), (25, 25)]
+            assert result == {"journeys": 25, "files": 25}
+
+            assert not [path for path in vault.iterdir() if path.name.startswith("journey_")]
+            assert index.stats()["total_artifacts"] == 25
+            assert index.stats()["total_journeys"] == before["total_journeys"] == 25
+            paths = [entry["path"] for entry in index.list(limit=100)[0]]
+            assert all(_journey_id_from_path(Path(path)) in path.split("/")[-3] for path in paths)
+            assert all(Path(path).exists() for path in paths)
+
+            flat_path = vault / "journey_000000000007" / "intake" / "intake.json"
+            assert load_artifact(str(flat_path))["data"]["n"] == 7
+            assert load_artifact(str(vault / "journey_000000000003" / "intake" / "intake.json"))["data"]["n"] == "newer"
+
+            assert migrate_vault_layout() == {"journeys": 0, "files": 0}
+        finally:
+            storage._artifact_index = previous
+
+    print("✅ Flat vault migrated into shards; flat paths still load")
+
+
+if __name__ == "__main__":
+    test_sharded_paths()
+    test_migrate_flat_vault()